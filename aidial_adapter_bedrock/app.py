@@ -1,23 +1,42 @@
+from contextlib import asynccontextmanager
+
 from aidial_sdk import DIALApp
-from aidial_sdk.telemetry.types import TelemetryConfig
 
 from aidial_adapter_bedrock.chat_completion import BedrockChatCompletion
+from aidial_adapter_bedrock.deployment_config import validate_deployments_config
 from aidial_adapter_bedrock.deployments import (
     ChatCompletionDeployment,
     EmbeddingsDeployment,
 )
 from aidial_adapter_bedrock.dial_api.response import ModelObject, ModelsResponse
 from aidial_adapter_bedrock.embeddings import BedrockEmbeddings
+from aidial_adapter_bedrock.server.embeddings import add_embeddings
 from aidial_adapter_bedrock.server.exceptions import dial_exception_decorator
+from aidial_adapter_bedrock.server.telemetry import get_telemetry_config
+from aidial_adapter_bedrock.utils.client_pool import close_client_pools
 from aidial_adapter_bedrock.utils.env import get_aws_default_region
 from aidial_adapter_bedrock.utils.log_config import configure_loggers
+from aidial_adapter_bedrock.warm_up import warm_up
 
 AWS_DEFAULT_REGION = get_aws_default_region()
 
+validate_deployments_config()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # The server doesn't accept requests (including health checks)
+    # until the warm-up is finished.
+    await warm_up()
+    yield
+    await close_client_pools()
+
+
 app = DIALApp(
     description="AWS Bedrock adapter for DIAL API",
-    telemetry_config=TelemetryConfig(),
+    telemetry_config=get_telemetry_config(),
     add_healthcheck=True,
+    lifespan=lifespan,
 )
 
 # NOTE: configuring logger after the DIAL telemetry is initialized,
@@ -41,4 +60,4 @@ for deployment in ChatCompletionDeployment:
     app.add_chat_completion(deployment.deployment_id, BedrockChatCompletion())
 
 for deployment in EmbeddingsDeployment:
-    app.add_embeddings(deployment.deployment_id, BedrockEmbeddings())
+    add_embeddings(app, deployment.deployment_id, BedrockEmbeddings())
@@ -1,12 +1,26 @@
+import asyncio
+import hashlib
 import os
+import time
+from typing import Dict, Tuple
 
-import boto3
 from aidial_sdk.embeddings import Request
 from pydantic import BaseModel
 
 from aidial_adapter_bedrock.utils.concurrency import make_async
 from aidial_adapter_bedrock.utils.env import get_aws_default_region
 from aidial_adapter_bedrock.utils.json import remove_nones
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+
+# The assumed role credentials are refreshed in background
+# when they are about to expire in the given number of seconds.
+AWS_ASSUME_ROLE_REFRESH_WINDOW = float(
+    os.getenv("AWS_ASSUME_ROLE_REFRESH_WINDOW", "300")
+)
+
+# The credentials which expire sooner than in the given number of seconds
+# aren't used anymore, the request waits for the refreshed credentials.
+_MIN_CREDENTIALS_VALIDITY = 30.0
 
 
 class AWSClientCredentials(BaseModel):
@@ -19,6 +33,23 @@ class AWSClientConfig(BaseModel):
     region: str
     credentials: AWSClientCredentials | None = None
 
+    def get_cache_key(self) -> str:
+        """
+        The digest of the region and credentials.
+        Identifies the clients which could be shared between requests.
+        """
+        return hashlib.sha256(self.json().encode()).hexdigest()
+
+    def get_account_digest(self) -> str:
+        """
+        The digest of the account credentials, which is safe to expose
+        in logs and metrics. Bedrock quotas are enforced per account.
+        """
+        if self.credentials is None:
+            return "default"
+        key_id = self.credentials.aws_access_key_id
+        return hashlib.sha256(key_id.encode()).hexdigest()[:8]
+
     def get_boto_client_kwargs(self) -> dict:
         client_kwargs = {"region_name": self.region}
 
@@ -42,6 +73,108 @@ class AWSClientConfig(BaseModel):
         return client_kwargs
 
 
+class TemporaryCredentials(BaseModel):
+    credentials: AWSClientCredentials
+    expiration: float
+    """Unix timestamp of the credentials expiration"""
+
+    def expires_in(self) -> float:
+        return self.expiration - time.time()
+
+
+def _assume_role(
+    role_arn: str, region: str, session_name: str
+) -> TemporaryCredentials:
+    import boto3
+
+    sts_client = boto3.Session().client("sts", region_name=region)
+
+    assumed_role_object = sts_client.assume_role(
+        RoleArn=role_arn,
+        RoleSessionName=session_name,
+    )
+
+    credentials = assumed_role_object["Credentials"]
+
+    return TemporaryCredentials(
+        credentials=AWSClientCredentials(
+            aws_access_key_id=credentials["AccessKeyId"],
+            aws_secret_access_key=credentials["SecretAccessKey"],
+            aws_session_token=credentials["SessionToken"],
+        ),
+        expiration=credentials["Expiration"].timestamp(),
+    )
+
+
+class AssumedRoleCredentialsCache:
+    """
+    Temporary credentials of the assumed roles keyed by role ARN and region.
+
+    The credentials close to expiration are still returned,
+    while the fresh ones are fetched in background.
+    Concurrent refreshes of the same credentials share a single STS call,
+    which is made outside of the event loop.
+    """
+
+    session_name: str
+    _credentials: Dict[Tuple[str, str], TemporaryCredentials]
+    _refreshes: Dict[Tuple[str, str], "asyncio.Task[TemporaryCredentials]"]
+
+    def __init__(self, session_name: str):
+        self.session_name = session_name
+        self._credentials = {}
+        self._refreshes = {}
+
+    async def get(self, role_arn: str, region: str) -> AWSClientCredentials:
+        key = (role_arn, region)
+        cached = self._credentials.get(key)
+
+        if cached is not None:
+            expires_in = cached.expires_in()
+            if expires_in > AWS_ASSUME_ROLE_REFRESH_WINDOW:
+                return cached.credentials
+            if expires_in > _MIN_CREDENTIALS_VALIDITY:
+                self._refresh(key)
+                return cached.credentials
+
+        fresh = await asyncio.shield(self._refresh(key))
+        return fresh.credentials
+
+    def _refresh(
+        self, key: Tuple[str, str]
+    ) -> "asyncio.Task[TemporaryCredentials]":
+        task = self._refreshes.get(key)
+        if task is None:
+            task = self._refreshes[key] = asyncio.create_task(
+                self._assume_role(key)
+            )
+
+            def _on_done(task: asyncio.Task) -> None:
+                self._refreshes.pop(key, None)
+                # The failure of a background refresh is already logged
+                if not task.cancelled():
+                    task.exception()
+
+            task.add_done_callback(_on_done)
+        return task
+
+    async def _assume_role(self, key: Tuple[str, str]) -> TemporaryCredentials:
+        role_arn, region = key
+        try:
+            credentials = await make_async(
+                lambda: _assume_role(role_arn, region, self.session_name)
+            )
+        except Exception:
+            log.exception(f"failed to assume role {role_arn!r}")
+            raise
+
+        self._credentials[key] = credentials
+        return credentials
+
+    def clear(self) -> None:
+        self._credentials.clear()
+
+
 class UpstreamConfig(BaseModel):
     region: str = get_aws_default_region()
     aws_access_key_id: str | None = None
@@ -53,8 +186,17 @@ class AWSClientConfigFactory:
     UPSTREAM_CONFIG_HEADER_NAME = "x-upstream-extra-data"
     BEDROCK_ACCESS_SESSION_NAME = "BedrockAccessSession"
 
-    def __init__(self, request):
-        self.upstream_config = self._get_upstream_config(request)
+    def __init__(
+        self, request=None, upstream_config: UpstreamConfig | None = None
+    ):
+        self.upstream_config = upstream_config or self._get_upstream_config(
+            request
+        )
+
+    def with_region(self, region: str) -> "AWSClientConfigFactory":
+        return AWSClientConfigFactory(
+            upstream_config=self.upstream_config.copy(update={"region": region})
+        )
 
     async def get_client_config(self) -> AWSClientConfig:
         return AWSClientConfig(
@@ -80,21 +222,14 @@ class AWSClientConfigFactory:
             return await self._get_assumed_role_tmp_credentials()
 
     async def _get_assumed_role_tmp_credentials(self) -> AWSClientCredentials:
-        sts_client = await make_async(
-            lambda: boto3.Session().client(
-                "sts", region_name=self.upstream_config.region
-            )
-        )
+        role_arn = self.upstream_config.aws_assume_role_arn
+        assert role_arn is not None
 
-        assumed_role_object = sts_client.assume_role(
-            RoleArn=self.upstream_config.aws_assume_role_arn,
-            RoleSessionName=self.BEDROCK_ACCESS_SESSION_NAME,
+        return await _assumed_role_credentials.get(
+            role_arn, self.upstream_config.region
         )
 
-        assumed_role_credentials = assumed_role_object["Credentials"]
 
-        return AWSClientCredentials(
-            aws_access_key_id=assumed_role_credentials["AccessKeyId"],
-            aws_secret_access_key=assumed_role_credentials["SecretAccessKey"],
-            aws_session_token=assumed_role_credentials["SessionToken"],
-        )
+_assumed_role_credentials = AssumedRoleCredentialsCache(
+    session_name=AWSClientConfigFactory.BEDROCK_ACCESS_SESSION_NAME
+)
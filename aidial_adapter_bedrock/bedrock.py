@@ -1,7 +1,8 @@
-import json
+import asyncio
+import os
 from abc import ABC
 from logging import DEBUG
-from typing import Any, AsyncIterator, Mapping, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, List, Mapping, Optional, Tuple
 
 import boto3
 from botocore.eventstream import EventStream
@@ -9,62 +10,182 @@ from botocore.response import StreamingBody
 from pydantic import BaseModel, Field
 
 from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.bedrock_runtime.client import BedrockRuntimeClient
+from aidial_adapter_bedrock.deployment_config import get_deployment_config
 from aidial_adapter_bedrock.dial_api.token_usage import TokenUsage
+from aidial_adapter_bedrock.hedging import HedgingPolicy, get_hedging_policy
+from aidial_adapter_bedrock.retry import RetryPolicy, get_retry_policy
+from aidial_adapter_bedrock.utils.client_pool import ClientPool
 from aidial_adapter_bedrock.utils.concurrency import (
     make_async,
-    to_async_iterator,
+    to_async_batches,
 )
 from aidial_adapter_bedrock.utils.json import json_dumps_short
+from aidial_adapter_bedrock.utils.json_codec import json_codec
 from aidial_adapter_bedrock.utils.log_config import bedrock_logger as log
 
 Body = dict
 Headers = Mapping[str, str]
 
+BEDROCK_CLIENT_POOL_SIZE = int(os.getenv("BEDROCK_CLIENT_POOL_SIZE", "32"))
+
+# Boto3 clients are thread-safe, so the clients are shared across
+# the requests to reuse their HTTP connection pools.
+_client_pool: ClientPool[Any] = ClientPool(
+    "bedrock_client_pool",
+    BEDROCK_CLIENT_POOL_SIZE,
+    close=lambda client: make_async(client.close),
+)
+
+_native_client_pool: ClientPool[BedrockRuntimeClient] = ClientPool(
+    "bedrock_native_client_pool",
+    BEDROCK_CLIENT_POOL_SIZE,
+    close=lambda client: client.close(),
+)
+
+
+async def warm_up_connections(connections: int) -> None:
+    """
+    Opens the given number of keep-alive connections
+    for each of the pooled native clients.
+    """
+
+    pings: List[Awaitable[None]] = [
+        native_client.ping()
+        for _ in range(connections)
+        for native_client in _native_client_pool.clients()
+    ]
+
+    for result in await asyncio.gather(*pings, return_exceptions=True):
+        if isinstance(result, Exception):
+            log.warning(f"failed to open a connection to Bedrock: {result}")
+
 
 class Bedrock:
+    """
+    Calls Bedrock runtime API via boto3 client in the shared thread pool.
+    """
+
     client: Any
+    retry_policy: RetryPolicy
+    hedging_policy: HedgingPolicy
 
-    def __init__(self, client: Any):
+    def __init__(
+        self,
+        client: Any,
+        retry_policy: RetryPolicy,
+        hedging_policy: HedgingPolicy,
+    ):
         self.client = client
+        self.retry_policy = retry_policy
+        self.hedging_policy = hedging_policy
 
     @classmethod
-    async def acreate(cls, aws_client_config: AWSClientConfig) -> "Bedrock":
+    async def acreate(
+        cls, aws_client_config: AWSClientConfig, deployment_id: str
+    ) -> "Bedrock":
+        """
+        Creates the client with the transport
+        configured for the given deployment.
+        """
+
+        conf = get_deployment_config(deployment_id)
+        retry_policy = get_retry_policy(deployment_id)
+        hedging_policy = get_hedging_policy(deployment_id)
+        key = aws_client_config.get_cache_key()
+        if conf.endpoint_url:
+            key += f"/{conf.endpoint_url}"
+
+        if conf.transport == "native":
+            native_client = await _native_client_pool.get(
+                f"{key}/{conf.native_client.json()}",
+                lambda: BedrockRuntimeClient.acreate(
+                    aws_client_config, conf.native_client, conf.endpoint_url
+                ),
+            )
+            return NativeBedrock(native_client, retry_policy, hedging_policy)
+
         client_kwargs = aws_client_config.get_boto_client_kwargs()
         client_kwargs["service_name"] = "bedrock-runtime"
-        client = await make_async(
-            lambda: boto3.Session().client(**client_kwargs)
+        client_kwargs["config"] = conf.botocore_client.to_botocore_config()
+        if conf.endpoint_url:
+            client_kwargs["endpoint_url"] = conf.endpoint_url
+
+        async def _create_client() -> Any:
+            return await make_async(
+                lambda: boto3.Session().client(**client_kwargs)
+            )
+
+        client = await _client_pool.get(
+            f"{key}/{conf.botocore_client.json()}", _create_client
         )
-        return cls(client)
+        return Bedrock(client, retry_policy, hedging_policy)
 
-    def _create_invoke_params(self, model: str, body: dict) -> dict:
+    def _create_invoke_params(self, model: str, body: bytes) -> dict:
         return {
             "modelId": model,
-            "body": json.dumps(body),
+            "body": body,
             "accept": "application/json",
             "contentType": "application/json",
         }
 
-    async def ainvoke_non_streaming(
-        self, model: str, args: dict
-    ) -> Tuple[Body, Headers]:
+    async def _invoke_model(
+        self, model: str, body: bytes
+    ) -> Tuple[bytes, Headers]:
+        params = self._create_invoke_params(model, body)
+        response = await make_async(lambda: self.client.invoke_model(**params))
 
         if log.isEnabledFor(DEBUG):
-            log.debug(
-                f"request: {json_dumps_short({'model': model, 'args': args})}"
-            )
+            log.debug(f"response: {json_dumps_short(response)}")
 
-        params = self._create_invoke_params(model, args)
-        response = await make_async(lambda: self.client.invoke_model(**params))
+        response_body: StreamingBody = response["body"]
+        response_headers = response.get("ResponseMetadata", {}).get(
+            "HTTPHeaders", {}
+        )
+        return await make_async(response_body.read), response_headers
+
+    async def _invoke_model_with_response_stream(
+        self, model: str, body: bytes
+    ) -> AsyncIterator[List[bytes]]:
+        params = self._create_invoke_params(model, body)
+        response = await make_async(
+            lambda: self.client.invoke_model_with_response_stream(**params)
+        )
 
         if log.isEnabledFor(DEBUG):
             log.debug(f"response: {json_dumps_short(response)}")
 
-        body: StreamingBody = response["body"]
-        body_dict = json.loads(await make_async(lambda: body.read()))
+        stream: EventStream = response["body"]
 
-        response_headers = response.get("ResponseMetadata", {}).get(
-            "HTTPHeaders", {}
+        async for events in to_async_batches(iter(stream), close=stream.close):
+            chunks: List[bytes] = []
+            for event in events:
+                chunk = event.get("chunk")
+                if chunk:
+                    chunks.append(chunk.get("bytes"))
+            if chunks:
+                yield chunks
+
+    async def ainvoke_non_streaming(
+        self, model: str, args: dict, latency_class: str = ""
+    ) -> Tuple[Body, Headers]:
+        """
+        `latency_class` groups the calls with similar latencies
+        for the hedging of the slow calls.
+        """
+
+        if log.isEnabledFor(DEBUG):
+            log.debug(
+                f"request: {json_dumps_short({'model': model, 'args': args})}"
+            )
+
+        request_body = json_codec.dumps(args)
+        body, response_headers = await self.retry_policy.call(
+            lambda: self.hedging_policy.call(
+                lambda: self._invoke_model(model, request_body), latency_class
+            )
         )
+        body_dict = json_codec.loads(body)
 
         if log.isEnabledFor(DEBUG):
             log.debug(f"response['body']: {json_dumps_short(body_dict)}")
@@ -74,28 +195,54 @@ class Bedrock:
     async def ainvoke_streaming(
         self, model: str, args: dict
     ) -> AsyncIterator[dict]:
+        async for chunks in self.ainvoke_streaming_batches(model, args):
+            for chunk in chunks:
+                yield chunk
+
+    async def ainvoke_streaming_batches(
+        self, model: str, args: dict
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Yields the chunks of the streaming response in batches.
+        A batch contains all the chunks received by the time
+        the previous batch was processed.
+        """
+
         if log.isEnabledFor(DEBUG):
             log.debug(
                 f"request: {json_dumps_short({'model': model, 'args': args})}"
             )
 
-        params = self._create_invoke_params(model, args)
-        response = await make_async(
-            lambda: self.client.invoke_model_with_response_stream(**params)
-        )
+        request_body = json_codec.dumps(args)
+        async for batch in self.retry_policy.stream(
+            lambda: self._invoke_model_with_response_stream(model, request_body)
+        ):
+            chunks: List[dict] = []
+            for chunk in batch:
+                chunk_dict = json_codec.loads(chunk)
+                if log.isEnabledFor(DEBUG):
+                    log.debug(f"chunk: {json_dumps_short(chunk_dict)}")
+                chunks.append(chunk_dict)
+            yield chunks
 
-        if log.isEnabledFor(DEBUG):
-            log.debug(f"response: {json_dumps_short(response)}")
 
-        body: EventStream = response["body"]
+class NativeBedrock(Bedrock):
+    """
+    Calls Bedrock runtime API via the asyncio client,
+    so no threads are occupied by the requests.
+    """
 
-        async for event in to_async_iterator(iter(body)):
-            chunk = event.get("chunk")
-            if chunk:
-                chunk_dict = json.loads(chunk.get("bytes").decode())
-                if log.isEnabledFor(DEBUG):
-                    log.debug(f"chunk: {json_dumps_short(chunk_dict)}")
-                yield chunk_dict
+    client: BedrockRuntimeClient
+
+    async def _invoke_model(
+        self, model: str, body: bytes
+    ) -> Tuple[bytes, Headers]:
+        return await self.client.invoke_model(model, body)
+
+    def _invoke_model_with_response_stream(
+        self, model: str, body: bytes
+    ) -> AsyncIterator[List[bytes]]:
+        return self.client.invoke_model_with_response_stream(model, body)
 
 
 class InvocationMetrics(BaseModel):
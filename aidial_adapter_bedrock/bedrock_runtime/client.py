@@ -0,0 +1,306 @@
+"""
+Asyncio client of the Bedrock runtime API.
+
+Unlike boto3, the client doesn't occupy a thread per request,
+so a single worker may serve thousands of concurrent streams.
+Only InvokeModel and InvokeModelWithResponseStream are supported.
+"""
+
+import base64
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import aiohttp
+from botocore.credentials import Credentials as BotocoreCredentials
+from botocore.credentials import RefreshableCredentials
+from botocore.exceptions import ClientError, EventStreamError
+from botocore.session import get_session
+from multidict import CIMultiDict
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.bedrock_runtime.eventstream import (
+    EventStreamDecoder,
+    EventStreamMessage,
+)
+from aidial_adapter_bedrock.bedrock_runtime.sigv4 import (
+    Credentials,
+    SigV4Signer,
+)
+from aidial_adapter_bedrock.deployment_config import NativeClientConfig
+from aidial_adapter_bedrock.utils.concurrency import make_async
+from aidial_adapter_bedrock.utils.json_codec import json_codec
+
+
+class CredentialsProvider:
+    """
+    Static credentials or the credentials resolved by
+    the botocore default chain (env, profile, container, instance metadata).
+    """
+
+    _static: Optional[Credentials]
+    _botocore: Optional[BotocoreCredentials]
+
+    def __init__(
+        self,
+        static: Optional[Credentials] = None,
+        botocore: Optional[BotocoreCredentials] = None,
+    ):
+        self._static = static
+        self._botocore = botocore
+
+    @classmethod
+    async def acreate(
+        cls, aws_client_config: AWSClientConfig
+    ) -> "CredentialsProvider":
+        if creds := aws_client_config.credentials:
+            return cls(
+                static=Credentials(
+                    access_key=creds.aws_access_key_id,
+                    secret_key=creds.aws_secret_access_key,
+                    token=creds.aws_session_token,
+                )
+            )
+
+        botocore = await make_async(lambda: get_session().get_credentials())
+        if botocore is None:
+            raise ValueError("Unable to locate AWS credentials")
+        return cls(botocore=botocore)
+
+    async def get(self) -> Credentials:
+        if self._static is not None:
+            return self._static
+
+        creds = self._botocore
+        assert creds is not None
+
+        # Refreshing may involve a network call, so it's done off the loop
+        if isinstance(creds, RefreshableCredentials) and creds.refresh_needed():
+            frozen = await make_async(creds.get_frozen_credentials)
+        else:
+            frozen = creds.get_frozen_credentials()
+
+        return Credentials(
+            access_key=frozen.access_key,
+            secret_key=frozen.secret_key,
+            token=frozen.token,
+        )
+
+
+class BedrockRuntimeClient:
+    endpoint_url: str
+    config: NativeClientConfig
+
+    _signer: SigV4Signer
+    _credentials: CredentialsProvider
+    _session: Optional[aiohttp.ClientSession]
+
+    def __init__(
+        self,
+        region: str,
+        credentials: CredentialsProvider,
+        config: NativeClientConfig,
+        endpoint_url: Optional[str] = None,
+    ):
+        self.endpoint_url = (
+            endpoint_url or f"https://bedrock-runtime.{region}.amazonaws.com"
+        ).rstrip("/")
+        self.config = config
+        self._signer = SigV4Signer(region)
+        self._credentials = credentials
+        self._session = None
+
+    @classmethod
+    async def acreate(
+        cls,
+        aws_client_config: AWSClientConfig,
+        config: NativeClientConfig,
+        endpoint_url: Optional[str] = None,
+    ) -> "BedrockRuntimeClient":
+        return cls(
+            aws_client_config.region,
+            await CredentialsProvider.acreate(aws_client_config),
+            config,
+            endpoint_url,
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily, since the session is bound to the running loop
+        if self._session is None or self._session.closed:
+            conf = self.config
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=conf.max_connections,
+                    keepalive_timeout=conf.keepalive_timeout,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    connect=conf.connect_timeout,
+                    sock_read=conf.read_timeout,
+                ),
+                auto_decompress=False,
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def ping(self) -> None:
+        """Opens a keep-alive connection to the endpoint"""
+        async with self._get_session().get(self.endpoint_url) as response:
+            await response.read()
+
+    async def _post(
+        self,
+        operation: str,
+        path: str,
+        body: bytes,
+        accept: str,
+    ) -> aiohttp.ClientResponse:
+        url = self.endpoint_url + path
+        headers = self._signer.sign(
+            "POST",
+            url,
+            {
+                "Content-Type": "application/json",
+                "X-Amzn-Bedrock-Accept": "application/json",
+                "Accept": accept,
+            },
+            body,
+            await self._credentials.get(),
+        )
+
+        response = await self._get_session().post(
+            url, data=body, headers=headers
+        )
+
+        if response.status >= 300:
+            try:
+                content = await response.read()
+            finally:
+                response.release()
+            raise _to_client_error(
+                operation, response.status, response.headers, content
+            )
+
+        return response
+
+    async def invoke_model(
+        self, model_id: str, body: bytes
+    ) -> Tuple[bytes, Dict[str, str]]:
+        response = await self._post(
+            "InvokeModel",
+            f"/model/{quote(model_id, safe='')}/invoke",
+            body,
+            "application/json",
+        )
+        async with response:
+            return await response.read(), _lower_keys(response.headers)
+
+    async def invoke_model_with_response_stream(
+        self, model_id: str, body: bytes
+    ) -> AsyncIterator[List[bytes]]:
+        """
+        Yields the payloads of the response chunks in batches.
+        A batch contains all the chunks decoded from a single network read.
+        """
+
+        operation = "InvokeModelWithResponseStream"
+        response = await self._post(
+            operation,
+            f"/model/{quote(model_id, safe='')}/invoke-with-response-stream",
+            body,
+            "application/vnd.amazon.eventstream",
+        )
+
+        decoder = EventStreamDecoder()
+        async with response:
+            async for data in response.content.iter_any():
+                chunks: List[bytes] = []
+                for message in decoder.feed(data):
+                    try:
+                        chunk = _get_chunk(operation, message)
+                    except EventStreamError:
+                        # The chunks preceding the exception are delivered
+                        if chunks:
+                            yield chunks
+                        raise
+                    if chunk is not None:
+                        chunks.append(chunk)
+                if chunks:
+                    yield chunks
+
+        if decoder.pending:
+            raise EventStreamError(
+                _error_response(
+                    "IncompleteStream", "The stream ended unexpectedly"
+                ),
+                operation,
+            )
+
+
+def _get_chunk(operation: str, message: EventStreamMessage) -> bytes | None:
+    headers = message.headers
+    match headers.get(":message-type"):
+        case "event":
+            if headers.get(":event-type") != "chunk":
+                return None
+            return base64.b64decode(json_codec.loads(message.payload)["bytes"])
+        case "exception":
+            raise EventStreamError(
+                _error_response(
+                    headers.get(":exception-type", "Unknown"),
+                    _get_message(message.payload),
+                ),
+                operation,
+            )
+        case _:
+            raise EventStreamError(
+                _error_response(
+                    headers.get(":error-code", "Unknown"),
+                    headers.get(":error-message", ""),
+                ),
+                operation,
+            )
+
+
+def _get_message(content: bytes) -> str:
+    try:
+        body = json_codec.loads(content)
+    except ValueError:
+        return content.decode(errors="replace")
+    if isinstance(body, dict):
+        return body.get("message") or body.get("Message") or ""
+    return ""
+
+
+def _lower_keys(headers: Mapping[str, str]) -> Dict[str, str]:
+    # Similar to the headers in the boto3 response metadata
+    return {name.lower(): value for name, value in headers.items()}
+
+
+def _error_response(code: str, message: str) -> dict:
+    return {"Error": {"Code": code, "Message": message}}
+
+
+def _to_client_error(
+    operation: str,
+    status: int,
+    headers: Mapping[str, str],
+    content: bytes,
+) -> ClientError:
+    headers = CIMultiDict(headers)
+
+    # The error type may be suffixed with the namespace:
+    # "ValidationException:http://internal.amazon.com/coral/com.amazon.bedrock/"
+    code = headers.get("x-amzn-ErrorType", "").split(":")[0] or str(status)
+    message = _get_message(content)
+
+    response = _error_response(code, message)
+    response["message"] = message
+    response["ResponseMetadata"] = {
+        "HTTPStatusCode": status,
+        "HTTPHeaders": _lower_keys(headers),
+    }
+    return ClientError(response, operation)  # type: ignore
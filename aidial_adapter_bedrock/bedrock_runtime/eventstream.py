@@ -0,0 +1,153 @@
+"""
+Incremental decoder of the `application/vnd.amazon.eventstream` frames.
+
+Each frame has the following layout (integers are big-endian):
+
+    total length (4) | headers length (4) | prelude CRC32 (4) |
+    headers | payload | message CRC32 (4)
+
+https://docs.aws.amazon.com/transcribe/latest/dg/streaming-setting-up.html#streaming-event-stream
+"""
+
+import struct
+import uuid
+import zlib
+from typing import Any, Dict, List, Tuple
+
+_PRELUDE_LENGTH = 12
+_CRC_LENGTH = 4
+_MIN_MESSAGE_LENGTH = _PRELUDE_LENGTH + _CRC_LENGTH
+
+# The limits are the same as in botocore
+_MAX_MESSAGE_LENGTH = 16 * 1024**2
+_MAX_HEADERS_LENGTH = 128 * 1024
+
+
+class EventStreamError(Exception):
+    pass
+
+
+class EventStreamMessage:
+    headers: Dict[str, Any]
+    payload: bytes
+
+    def __init__(self, headers: Dict[str, Any], payload: bytes):
+        self.headers = headers
+        self.payload = payload
+
+    def __repr__(self) -> str:
+        return f"EventStreamMessage({self.headers!r}, {self.payload!r})"
+
+
+def _decode_headers(data: memoryview) -> Dict[str, Any]:
+    headers: Dict[str, Any] = {}
+    offset = 0
+    while offset < len(data):
+        name_length = data[offset]
+        offset += 1
+        name = str(data[offset : offset + name_length], "utf-8")
+        offset += name_length
+        value_type = data[offset]
+        offset += 1
+
+        value: Any
+        match value_type:
+            case 0:
+                value = True
+            case 1:
+                value = False
+            case 2:
+                (value,) = struct.unpack_from(">b", data, offset)
+                offset += 1
+            case 3:
+                (value,) = struct.unpack_from(">h", data, offset)
+                offset += 2
+            case 4:
+                (value,) = struct.unpack_from(">i", data, offset)
+                offset += 4
+            case 5 | 8:
+                # 8 is a timestamp in milliseconds since the epoch
+                (value,) = struct.unpack_from(">q", data, offset)
+                offset += 8
+            case 6 | 7:
+                (length,) = struct.unpack_from(">H", data, offset)
+                offset += 2
+                raw = data[offset : offset + length]
+                value = bytes(raw) if value_type == 6 else str(raw, "utf-8")
+                offset += length
+            case 9:
+                value = uuid.UUID(bytes=bytes(data[offset : offset + 16]))
+                offset += 16
+            case _:
+                raise EventStreamError(f"Unknown header type: {value_type}")
+
+        headers[name] = value
+
+    return headers
+
+
+class EventStreamDecoder:
+    """
+    Splits the incoming bytes into messages.
+
+    The bytes are accumulated in a single buffer which is parsed
+    via memoryview, so the only copy made is the one of the payload.
+    """
+
+    _buffer: bytearray
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[EventStreamMessage]:
+        self._buffer += data
+
+        messages: List[EventStreamMessage] = []
+        offset = 0
+        with memoryview(self._buffer) as view:
+            while True:
+                message, length = self._decode(view[offset:])
+                if message is None:
+                    break
+                messages.append(message)
+                offset += length
+
+        if offset:
+            del self._buffer[:offset]
+
+        return messages
+
+    @property
+    def pending(self) -> int:
+        """Number of bytes of an incomplete message"""
+        return len(self._buffer)
+
+    @staticmethod
+    def _decode(view: memoryview) -> Tuple[EventStreamMessage | None, int]:
+        if len(view) < _PRELUDE_LENGTH:
+            return None, 0
+
+        total_length, headers_length, prelude_crc = struct.unpack_from(
+            ">III", view
+        )
+
+        if zlib.crc32(view[:8]) != prelude_crc:
+            raise EventStreamError("Prelude checksum mismatch")
+        if not _MIN_MESSAGE_LENGTH <= total_length <= _MAX_MESSAGE_LENGTH:
+            raise EventStreamError(f"Invalid message length: {total_length}")
+        if headers_length > _MAX_HEADERS_LENGTH:
+            raise EventStreamError(f"Invalid headers length: {headers_length}")
+
+        if len(view) < total_length:
+            return None, 0
+
+        crc_offset = total_length - _CRC_LENGTH
+        (message_crc,) = struct.unpack_from(">I", view, crc_offset)
+        if zlib.crc32(view[:crc_offset]) != message_crc:
+            raise EventStreamError("Message checksum mismatch")
+
+        payload_offset = _PRELUDE_LENGTH + headers_length
+        headers = _decode_headers(view[_PRELUDE_LENGTH:payload_offset])
+        payload = bytes(view[payload_offset:crc_offset])
+
+        return EventStreamMessage(headers, payload), total_length
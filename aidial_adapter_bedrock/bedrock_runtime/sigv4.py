@@ -0,0 +1,129 @@
+"""
+AWS Signature Version 4 signing of the Bedrock runtime requests.
+
+https://docs.aws.amazon.com/IAM/latest/UserGuide/create-signed-request.html
+"""
+
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Mapping, Optional
+from urllib.parse import quote, urlsplit
+
+from pydantic import BaseModel
+
+_ALGORITHM = "AWS4-HMAC-SHA256"
+
+# Headers which may be changed by proxies
+_UNSIGNED_HEADERS = {"expect", "user-agent", "x-amzn-trace-id"}
+
+
+class Credentials(BaseModel):
+    access_key: str
+    secret_key: str
+    token: Optional[str] = None
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+@lru_cache(maxsize=256)
+def _signing_key(
+    secret_key: str, date: str, region: str, service: str
+) -> bytes:
+    """
+    The signing key depends only on the date, so it's derived
+    once a day instead of four HMAC computations per request.
+    """
+    k_date = _hmac(f"AWS4{secret_key}".encode(), date)
+    k_region = _hmac(k_date, region)
+    k_service = _hmac(k_region, service)
+    return _hmac(k_service, "aws4_request")
+
+
+class SigV4Signer:
+    region: str
+    service: str
+
+    def __init__(self, region: str, service: str = "bedrock"):
+        self.region = region
+        self.service = service
+
+    def sign(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        body: bytes,
+        credentials: Credentials,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, str]:
+        """
+        Returns the given headers supplemented with
+        the date, security token and authorization headers.
+
+        The path of the URL is expected to be percent-encoded already.
+        """
+
+        now = now or datetime.now(timezone.utc)
+        timestamp = now.strftime("%Y%m%dT%H%M%SZ")
+        date = timestamp[:8]
+
+        parts = urlsplit(url)
+
+        ret = dict(headers)
+        ret["X-Amz-Date"] = timestamp
+        if credentials.token:
+            ret["X-Amz-Security-Token"] = credentials.token
+
+        signed = {
+            name.lower(): " ".join(value.split())
+            for name, value in ret.items()
+            if name.lower() not in _UNSIGNED_HEADERS
+        }
+        signed.setdefault("host", parts.netloc)
+        names = sorted(signed)
+        signed_headers = ";".join(names)
+
+        canonical_request = "\n".join(
+            [
+                method.upper(),
+                quote(parts.path or "/", safe="/~"),
+                _canonical_query(parts.query),
+                "".join(f"{name}:{signed[name]}\n" for name in names),
+                signed_headers,
+                hashlib.sha256(body).hexdigest(),
+            ]
+        )
+
+        scope = f"{date}/{self.region}/{self.service}/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                _ALGORITHM,
+                timestamp,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+
+        key = _signing_key(
+            credentials.secret_key, date, self.region, self.service
+        )
+        signature = hmac.new(
+            key, string_to_sign.encode(), hashlib.sha256
+        ).hexdigest()
+
+        ret["Authorization"] = (
+            f"{_ALGORITHM} Credential={credentials.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return ret
+
+
+def _canonical_query(query: str) -> str:
+    if not query:
+        return ""
+    pairs = [pair.partition("=") for pair in query.split("&")]
+    return "&".join(f"{key}={value}" for key, _, value in sorted(pairs))
@@ -1,5 +1,5 @@
 import asyncio
-from typing import List, Optional, assert_never
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, assert_never
 
 from aidial_sdk.chat_completion import ChatCompletion, Request, Response
 from aidial_sdk.chat_completion.request import ChatCompletionRequest
@@ -23,35 +23,85 @@ from aidial_sdk.deployment.truncate_prompt import (
 from aidial_sdk.exceptions import ResourceNotFoundError
 from typing_extensions import override
 
-from aidial_adapter_bedrock.aws_client_config import AWSClientConfigFactory
+from aidial_adapter_bedrock.aws_client_config import (
+    AWSClientConfig,
+    AWSClientConfigFactory,
+)
+from aidial_adapter_bedrock.coalescing import coalesce
+from aidial_adapter_bedrock.concurrency_limiter import limit_concurrency
+from aidial_adapter_bedrock.deployment_config import (
+    RoutingTarget,
+    get_deployment_config,
+)
 from aidial_adapter_bedrock.deployments import ChatCompletionDeployment
-from aidial_adapter_bedrock.dial_api.request import ModelParameters
+from aidial_adapter_bedrock.dial_api.request import (
+    ModelParameters,
+    estimate_prompt_tokens,
+    get_request_digest,
+)
 from aidial_adapter_bedrock.dial_api.token_usage import TokenUsage
 from aidial_adapter_bedrock.llm.chat_model import (
     ChatCompletionAdapter,
     TextCompletionAdapter,
 )
-from aidial_adapter_bedrock.llm.consumer import ChoiceConsumer
+from aidial_adapter_bedrock.llm.consumer import (
+    ChoiceConsumer,
+    Consumer,
+    UsageTrackingConsumer,
+)
 from aidial_adapter_bedrock.llm.errors import UserError, ValidationError
-from aidial_adapter_bedrock.llm.model.adapter import get_bedrock_adapter
+from aidial_adapter_bedrock.llm.model.adapter import (
+    get_bedrock_adapter,
+    is_cached_per_api_key,
+)
 from aidial_adapter_bedrock.llm.truncate_prompt import DiscardedMessages
+from aidial_adapter_bedrock.rate_limiter import limit_rate
+from aidial_adapter_bedrock.response_cache import (
+    CachePolicy,
+    cache_response,
+    get_cached_response,
+)
+from aidial_adapter_bedrock.routing import route
 from aidial_adapter_bedrock.server.exceptions import dial_exception_decorator
 from aidial_adapter_bedrock.utils.log_config import app_logger as log
 from aidial_adapter_bedrock.utils.not_implemented import is_implemented
 
 
+def _get_request_digest(request: Request) -> str:
+    deployment = ChatCompletionDeployment.from_deployment_id(
+        request.deployment_id
+    )
+    # The attachments are uploaded to the caller's bucket
+    scope = request.api_key if is_cached_per_api_key(deployment) else None
+    return get_request_digest(request, scope)
+
+
+async def _estimate_prompt_tokens(request: Request) -> int:
+    return estimate_prompt_tokens(request)
+
+
 class BedrockChatCompletion(ChatCompletion):
-    async def _get_model(
-        self, request: FromRequestDeploymentMixin
-    ) -> ChatCompletionAdapter:
+    async def _get_target(
+        self,
+        request: FromRequestDeploymentMixin,
+        target: RoutingTarget | None = None,
+    ) -> Tuple[ChatCompletionDeployment, AWSClientConfig]:
         deployment = ChatCompletionDeployment.from_deployment_id(
-            request.deployment_id
+            (target and target.deployment) or request.deployment_id
         )
 
-        aws_client_config = await AWSClientConfigFactory(
-            request=request,
-        ).get_client_config()
+        factory = AWSClientConfigFactory(request=request)
+        if target is not None:
+            factory = factory.with_region(target.region)
+
+        return deployment, await factory.get_client_config()
 
+    async def _get_model(
+        self,
+        request: FromRequestDeploymentMixin,
+        target: RoutingTarget | None = None,
+    ) -> ChatCompletionAdapter:
+        deployment, aws_client_config = await self._get_target(request, target)
         return await get_bedrock_adapter(
             deployment=deployment,
             api_key=request.api_key,
@@ -60,9 +110,86 @@ class BedrockChatCompletion(ChatCompletion):
 
     @dial_exception_decorator
     async def chat_completion(self, request: Request, response: Response):
-        model = await self._get_model(request)
         params = ModelParameters.create(request)
 
+        conf = get_deployment_config(request.deployment_id)
+        cache_policy = CachePolicy.create(conf.response_cache, request.headers)
+
+        request_digest = (
+            _get_request_digest(request)
+            if (conf.request_coalescing or cache_policy)
+            and params.is_deterministic
+            else None
+        )
+
+        # The model of the request sets up the consumers, no call is made
+        model = await self._get_model(request)
+
+        # The entry is taken once, so it can't expire before it's replayed
+        recording = get_cached_response(request_digest, cache_policy)
+        if recording is not None:
+            log.debug(f"replaying the cached response: {request_digest}")
+            # No call is made to the model,
+            # so the routing and the limits are bypassed
+            await self._chat_completion(
+                model, request, response, params, recording.replay
+            )
+            return
+
+        async def call_model(consumer: Consumer) -> None:
+            async with route(request.deployment_id) as target:
+                deployment, aws_client_config = await self._get_target(
+                    request, target
+                )
+                model = await get_bedrock_adapter(
+                    deployment=deployment,
+                    api_key=request.api_key,
+                    aws_client_config=aws_client_config,
+                )
+                async with limit_rate(
+                    deployment.deployment_id,
+                    deployment.model_id,
+                    aws_client_config,
+                    lambda: _estimate_prompt_tokens(request),
+                ) as reservation:
+                    consumer = UsageTrackingConsumer(consumer)
+                    async with limit_concurrency(
+                        deployment.deployment_id,
+                        deployment.model_id,
+                        aws_client_config,
+                    ):
+                        await cache_response(
+                            request_digest,
+                            cache_policy,
+                            consumer,
+                            lambda consumer: model.chat(
+                                consumer, params, request.messages
+                            ),
+                        )
+                    reservation.reconcile(consumer.usage.total_tokens)
+
+        # The coalesced requests make no call to the model,
+        # so they are neither routed nor limited
+        await self._chat_completion(
+            model,
+            request,
+            response,
+            params,
+            lambda consumer: coalesce(
+                request_digest if conf.request_coalescing else None,
+                consumer,
+                call_model,
+            ),
+        )
+
+    async def _chat_completion(
+        self,
+        model: ChatCompletionAdapter,
+        request: Request,
+        response: Response,
+        params: ModelParameters,
+        generate: Callable[[Consumer], Awaitable[Any]],
+    ) -> TokenUsage:
         discarded_messages: Optional[DiscardedMessages] = None
 
         async def generate_response(usage: TokenUsage) -> None:
@@ -76,7 +203,7 @@ class BedrockChatCompletion(ChatCompletion):
                     )
 
                 try:
-                    await model.chat(consumer, params, request.messages)
+                    await generate(consumer)
                 except UserError as e:
                     await e.report_usage(choice)
                     await response.aflush()
@@ -97,6 +224,8 @@ class BedrockChatCompletion(ChatCompletion):
         if discarded_messages is not None:
             response.set_discarded_messages(discarded_messages)
 
+        return usage
+
     @override
     @dial_exception_decorator
     async def tokenize(self, request: TokenizeRequest) -> TokenizeResponse:
@@ -0,0 +1,103 @@
+"""
+Coalescing of identical concurrent chat completion requests.
+
+When the sampling is deterministic (zero temperature), identical
+requests produce the same response, so the concurrent duplicates
+(e.g. sent by evaluation pipelines, retrying clients or `n` > 1)
+share a single call to the model: the first request starts the call,
+while all of them receive the replay of its response as it's generated.
+
+The requests are coalesced before they are routed and limited,
+so only the shared call takes the rate limits and the concurrency
+of the model.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from aidial_adapter_bedrock.llm.consumer import Consumer
+from aidial_adapter_bedrock.llm.consumer_recording import (
+    ConsumerRecording,
+    RecordingConsumer,
+)
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+from aidial_adapter_bedrock.utils.metrics import observe_counter
+
+
+class _Flight:
+    """The shared call to the model and the requests subscribed to it"""
+
+    recording: ConsumerRecording
+    task: asyncio.Task
+    subscribers: int
+
+    def __init__(
+        self, key: str, generate: Callable[[Consumer], Awaitable[None]]
+    ):
+        self.recording = ConsumerRecording()
+        self.subscribers = 0
+        self.task = asyncio.create_task(self._run(key, generate))
+
+    async def _run(
+        self, key: str, generate: Callable[[Consumer], Awaitable[None]]
+    ) -> None:
+        try:
+            await generate(RecordingConsumer(None, self.recording))
+        except BaseException as e:
+            # The error is raised to the subscribers by the replay
+            self.recording.finish(e)
+        else:
+            self.recording.finish()
+        finally:
+            if _flights.get(key) is self:
+                del _flights[key]
+
+
+_flights: Dict[str, _Flight] = {}
+
+
+@dataclass
+class CoalescingStats:
+    coalesced: int = 0
+
+
+coalescing_stats = CoalescingStats()
+
+observe_counter("coalescing.coalesced", lambda: coalescing_stats.coalesced)
+
+
+async def coalesce(
+    key: Optional[str],
+    consumer: Consumer,
+    generate: Callable[[Consumer], Awaitable[None]],
+) -> None:
+    """
+    Generates the response to the consumer or replays the response
+    of the identical request in flight.
+    No coalescing is done when the key is None.
+
+    The shared call is made in a task of its own, so it isn't cancelled
+    when the request which started it is.
+    It's cancelled once all the requests subscribed to it are.
+    """
+    if key is None:
+        await generate(consumer)
+        return
+
+    if (flight := _flights.get(key)) is not None:
+        coalescing_stats.coalesced += 1
+        log.debug(f"coalescing the request with the request in flight: {key}")
+    else:
+        flight = _flights[key] = _Flight(key, generate)
+
+    flight.subscribers += 1
+    try:
+        await flight.recording.replay(consumer)
+    finally:
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.task.done():
+            # The cancelled call isn't shared with the subsequent requests
+            if _flights.get(key) is flight:
+                del _flights[key]
+            flight.task.cancel()
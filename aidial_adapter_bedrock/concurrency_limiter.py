@@ -0,0 +1,195 @@
+"""
+Adaptive limit of the concurrent requests to Bedrock.
+
+Bedrock quotas are enforced per model, region and AWS account.
+A burst of requests above the quota ends up in a storm of throttling errors.
+Instead, the adapter learns the concurrency the quota allows (AIMD):
+the limit grows additively while the requests succeed and shrinks
+multiplicatively on throttling. The requests above the limit
+wait in a queue for a free slot for a while before they are rejected.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, Tuple
+
+from aidial_sdk.exceptions import HTTPException as DialException
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.deployment_config import (
+    ConcurrencyLimiterConfig,
+    get_deployment_config,
+)
+from aidial_adapter_bedrock.server.exceptions import is_throttling
+from aidial_adapter_bedrock.utils.client_pool import ClientPool
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+from aidial_adapter_bedrock.utils.metrics import observe_gauges
+
+CONCURRENCY_LIMITERS_SIZE = int(os.getenv("CONCURRENCY_LIMITERS_SIZE", "1024"))
+
+
+class ConcurrencyLimitExceeded(DialException):
+    def __init__(self, message: str):
+        super().__init__(
+            message=message, status_code=429, type="rate_limit_exceeded"
+        )
+
+
+class AdaptiveConcurrencyLimiter:
+    config: ConcurrencyLimiterConfig
+    attributes: Dict[str, str]
+    """Identifies the limiter in the metrics"""
+
+    limit: float
+    inflight: int
+    _waiters: Deque["asyncio.Future[None]"]
+    _last_decrease: float
+
+    def __init__(
+        self, config: ConcurrencyLimiterConfig, attributes: Dict[str, str]
+    ):
+        self.config = config
+        self.attributes = attributes
+        self.limit = float(config.initial_limit)
+        self.inflight = 0
+        self._waiters = deque()
+        self._last_decrease = float("-inf")
+
+    @property
+    def queue_size(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _has_free_slot(self) -> bool:
+        return self.inflight < max(1, int(self.limit))
+
+    def _wake_up_waiters(self) -> None:
+        while self._waiters and self._has_free_slot():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot is passed to the waiter
+                self.inflight += 1
+                waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        if not self._waiters and self._has_free_slot():
+            self.inflight += 1
+            return
+
+        if self.queue_size >= self.config.max_queue_size:
+            raise ConcurrencyLimitExceeded("The request queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.config.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was passed just before the cancellation
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise ConcurrencyLimitExceeded(
+                    f"No free slot in {self.config.queue_timeout} seconds"
+                )
+            raise
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._wake_up_waiters()
+
+    def on_success(self) -> None:
+        self.limit = min(
+            float(self.config.max_limit),
+            self.limit + self.config.increase / self.limit,
+        )
+        self._wake_up_waiters()
+
+    def on_throttling(self, started_at: float) -> None:
+        # The requests started before the previous decrease were sent
+        # under the higher limit, so they don't decrease the limit again.
+        if started_at < self._last_decrease:
+            return
+
+        self._last_decrease = time.monotonic()
+        self.limit = max(
+            float(self.config.min_limit),
+            self.limit * self.config.decrease_factor,
+        )
+        log.warning(
+            f"concurrency limit decreased to {int(self.limit)}: {self.attributes}"
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        started_at = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_throttling(e):
+                self.on_throttling(started_at)
+            raise
+        else:
+            self.on_success()
+        finally:
+            self.release()
+
+
+_limiters: ClientPool[AdaptiveConcurrencyLimiter] = ClientPool(
+    name="concurrency_limiters", max_size=CONCURRENCY_LIMITERS_SIZE
+)
+
+
+@asynccontextmanager
+async def limit_concurrency(
+    deployment_id: str, model_id: str, aws_client_config: AWSClientConfig
+) -> AsyncIterator[None]:
+    """
+    Occupies a slot of the limiter of the model in the region
+    on behalf of the account for the duration of the request.
+    No-op when the limiter isn't enabled for the deployment.
+    """
+    config = get_deployment_config(deployment_id).concurrency_limiter
+    if not config.enabled:
+        yield
+        return
+
+    attributes = {
+        "model": model_id,
+        "region": aws_client_config.region,
+        "account": aws_client_config.get_account_digest(),
+    }
+
+    async def _create() -> AdaptiveConcurrencyLimiter:
+        return AdaptiveConcurrencyLimiter(config, attributes)
+
+    key = "/".join(attributes.values())
+    limiter = await _limiters.get(key, _create)
+
+    async with limiter.slot():
+        yield
+
+
+def _observe(
+    get_value: Callable[[AdaptiveConcurrencyLimiter], int | float]
+) -> Iterable[Tuple[int | float, Dict[str, str]]]:
+    return [
+        (get_value(limiter), limiter.attributes)
+        for limiter in _limiters.clients()
+    ]
+
+
+observe_gauges(
+    "concurrency_limiter.limit",
+    lambda: _observe(lambda limiter: int(limiter.limit)),
+)
+observe_gauges(
+    "concurrency_limiter.inflight",
+    lambda: _observe(lambda limiter: limiter.inflight),
+)
+observe_gauges(
+    "concurrency_limiter.queue_size",
+    lambda: _observe(lambda limiter: limiter.queue_size),
+)
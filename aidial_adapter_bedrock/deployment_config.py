@@ -0,0 +1,388 @@
+"""
+Per-deployment tuning of the adapter.
+
+The configuration is read from the `DEPLOYMENTS_CONFIG` env variable.
+It's a JSON object which maps deployment ids to the deployment settings, e.g.
+
+{
+    "*": {"anthropic_client": {"max_connections": 200}},
+    "anthropic.claude-3-haiku*": {"anthropic_client": {"read_timeout": 60}},
+    "meta.llama3-1-405b*": {"botocore_client": {"read_timeout": 300}}
+}
+
+The keys are glob patterns, so a single key may configure a whole
+model family. The settings of all the keys matching a deployment id
+are merged in the order of their appearance in the JSON object,
+thus more specific patterns should follow less specific ones.
+"""
+
+import json
+import os
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+from aidial_adapter_bedrock.deployments import (
+    ChatCompletionDeployment,
+    EmbeddingsDeployment,
+    is_claude3_deployment,
+)
+
+if TYPE_CHECKING:
+    from botocore.config import Config
+
+
+class AnthropicClientConfig(BaseModel):
+    """
+    Settings of the HTTP client which calls Claude 3 models.
+    The defaults match the defaults of the Anthropic SDK.
+    """
+
+    max_connections: int = 1000
+    max_keepalive_connections: int = 100
+    keepalive_expiry: float = 5.0
+    """Seconds an idle keep-alive connection is kept in the pool"""
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 600.0
+    """Timeout for read, write and connection pool acquisition in seconds"""
+
+    max_retries: int = 2
+
+
+class BotocoreClientConfig(BaseModel):
+    """
+    Settings of the boto3 client which calls the models other than Claude 3
+    when the deployment is configured with the boto3 transport.
+    """
+
+    max_pool_connections: int = 100
+    """
+    Botocore default is 10 connections, which caps the number
+    of concurrent requests served by a single client.
+    """
+
+    connect_timeout: float = 60.0
+    read_timeout: float = 60.0
+    """Timeout for reading a portion of the response in seconds"""
+
+    tcp_keepalive: bool = True
+
+    retry_mode: Literal["legacy", "standard", "adaptive"] = "standard"
+    max_attempts: int = 3
+    """Total number of attempts including the initial one"""
+
+    def to_botocore_config(self) -> "Config":
+        from botocore.config import Config
+
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tcp_keepalive=self.tcp_keepalive,
+            retries={
+                "mode": self.retry_mode,
+                "total_max_attempts": self.max_attempts,
+            },
+        )
+
+
+class NativeClientConfig(BaseModel):
+    """
+    Settings of the asyncio Bedrock runtime client
+    used when the deployment is configured with the native transport.
+    """
+
+    max_connections: int = 1000
+    keepalive_timeout: float = 15.0
+    """Seconds an idle keep-alive connection is kept in the pool"""
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 600.0
+    """Timeout for reading a portion of the response in seconds"""
+
+
+class ConcurrencyLimiterConfig(BaseModel):
+    """
+    Adaptive (AIMD) limit of the concurrent requests to a model
+    in a region on behalf of an AWS account.
+    """
+
+    enabled: bool = False
+
+    initial_limit: int = 16
+    min_limit: int = 1
+    max_limit: int = 1000
+
+    increase: float = 1.0
+    """
+    Additive increase of the limit per round trip, i.e. per `limit`
+    successful requests.
+    """
+
+    decrease_factor: float = 0.7
+    """Multiplicative decrease of the limit on throttling"""
+
+    queue_timeout: float = 10.0
+    """
+    Seconds a request waits for a free slot
+    before it's rejected with 429 status code.
+    """
+
+    max_queue_size: int = 1000
+
+
+class RateLimitConfig(BaseModel):
+    """
+    Local token buckets mirroring Bedrock quotas of a model
+    in a region for an AWS account.
+    The limits are per worker process, so the quotas
+    should be divided by the number of workers and adapter replicas.
+    """
+
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+
+    max_wait: float = 1.0
+    """
+    Seconds a request may wait for the quota to replenish.
+    The request which would wait longer is rejected with 429 status code.
+    """
+
+
+class RetryConfig(BaseModel):
+    """
+    Retries of the calls to Bedrock failed due to throttling,
+    model timeouts, server or network errors.
+    The retries are made on top of the retries of boto3 and Anthropic SDK
+    (see `botocore_client.max_attempts` and `anthropic_client.max_retries`).
+    """
+
+    enabled: bool = False
+
+    max_attempts: int = 3
+    """Total number of attempts including the initial one"""
+
+    base_delay: float = 0.1
+    max_delay: float = 5.0
+    """Bounds of the delay between the attempts in seconds"""
+
+    budget_ratio: float = 0.1
+    """Maximum number of retries per call in the long run"""
+
+    budget_capacity: float = 10.0
+    """Maximum number of retries in a burst"""
+
+
+class HedgingConfig(BaseModel):
+    """
+    Hedging of the non-streaming calls to Bedrock: an identical call is sent
+    when the call takes longer than the given percentile of the latencies
+    of the recent calls, the response of the first completed call is taken.
+    Requires the native transport, since the boto3 calls can't be cancelled.
+    """
+
+    enabled: bool = False
+
+    percentile: float = 0.95
+    """Percentile of the latencies after which the call is hedged"""
+
+    min_delay: float = 0.0
+    """Minimal delay of the hedged call in seconds"""
+
+    window: int = 1000
+    """Number of the recent calls the percentile is computed over"""
+
+    min_samples: int = 100
+    """Number of the calls made before the hedging starts"""
+
+    max_rate: float = 0.05
+    """Maximum share of the hedged calls in the long run"""
+
+    budget_capacity: float = 10.0
+    """Maximum number of the hedged calls in a burst"""
+
+
+class ResponseCacheConfig(BaseModel):
+    """
+    Cache of the responses to the chat completion requests
+    with zero temperature.
+    """
+
+    enabled: bool = False
+
+    ttl: float = 3600.0
+    """Seconds a cached response is kept"""
+
+
+class EmbeddingsCacheConfig(BaseModel):
+    """
+    Cache of the embeddings of the individual inputs.
+    """
+
+    enabled: bool = False
+
+    ttl: float = 86400.0
+    """Seconds a cached embedding is kept"""
+
+
+class EmbeddingsBatchingConfig(BaseModel):
+    """
+    Splitting of the inputs of the embeddings requests to the models
+    which support batched inputs (Cohere) into the batches.
+    """
+
+    max_texts: int = 96
+    """Maximum number of the texts in a batch. Cohere models accept up to 96 texts."""
+
+    min_texts: int = 8
+    """Minimum number of the texts in a batch the adaptive batch size is reduced to"""
+
+    max_bytes: int = 500_000
+    """Maximum total size of the texts in a batch in UTF-8 bytes"""
+
+    target_latency: Optional[float] = 10.0
+    """
+    Seconds a batch is expected to be embedded in.
+    The batch size is halved when a batch takes longer
+    and is increased by one text otherwise.
+    The batch size is fixed to `max_texts` when not set.
+    """
+
+
+class RoutingTarget(BaseModel):
+    region: str
+
+    deployment: Optional[str] = None
+    """
+    Deployment called in the region, e.g. a cross-region inference profile
+    of the model. Defaults to the routed deployment itself.
+    """
+
+    weight: float = 1.0
+    """Relative share of the requests the target receives when all targets are equally healthy"""
+
+
+class RoutingConfig(BaseModel):
+    """
+    Routing of the requests to a deployment across several regions.
+    Each request is sent to the target with the lowest cost:
+
+        latency * (in-flight requests + 1) * (1 + error_penalty * error_rate) / weight
+
+    where the latency and error rate are exponentially weighted moving
+    averages of the recent requests to the target.
+    """
+
+    targets: List[RoutingTarget]
+
+    decay_time: float = 10.0
+    """
+    Time in seconds over which the contribution of a request
+    to the moving averages decays by the factor of e.
+    """
+
+    error_penalty: float = 10.0
+
+    exploration: float = 0.02
+    """
+    Share of the requests sent to a random target
+    to keep the statistics of all targets up to date.
+    """
+
+
+class DeploymentConfig(BaseModel):
+    transport: Literal["boto3", "native"] = "boto3"
+    """
+    The way Bedrock runtime API is called by the models
+    other than Claude 3: via boto3 in threads or via the asyncio client.
+    """
+
+    endpoint_url: Optional[str] = None
+    """Overrides the Bedrock runtime endpoint, e.g. with a VPC endpoint"""
+
+    botocore_client: BotocoreClientConfig = BotocoreClientConfig()
+    native_client: NativeClientConfig = NativeClientConfig()
+    anthropic_client: AnthropicClientConfig = AnthropicClientConfig()
+
+    concurrency_limiter: ConcurrencyLimiterConfig = ConcurrencyLimiterConfig()
+    rate_limit: RateLimitConfig = RateLimitConfig()
+
+    request_coalescing: bool = False
+    """
+    Whether the identical concurrent requests with zero temperature
+    share a single call to the model.
+    """
+
+    response_cache: ResponseCacheConfig = ResponseCacheConfig()
+    embeddings_cache: EmbeddingsCacheConfig = EmbeddingsCacheConfig()
+
+    embeddings_concurrency: int = 8
+    """
+    Maximum number of the concurrent calls made by an embeddings request:
+    the calls with a single input to the models which don't support
+    batched inputs or the calls with a batch of inputs.
+    """
+
+    embeddings_batching: EmbeddingsBatchingConfig = EmbeddingsBatchingConfig()
+
+    retry: RetryConfig = RetryConfig()
+    hedging: HedgingConfig = HedgingConfig()
+
+    routing: Optional[RoutingConfig] = None
+    """Overrides the region from the upstream config when defined"""
+
+
+def _merge(base: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    ret = dict(base)
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(ret.get(key), dict):
+            ret[key] = _merge(ret[key], value)
+        else:
+            ret[key] = value
+    return ret
+
+
+def _read_deployments_config() -> Dict[str, Dict[str, Any]]:
+    conf = os.getenv("DEPLOYMENTS_CONFIG")
+    if not conf:
+        return {}
+
+    ret = json.loads(conf)
+    if not isinstance(ret, dict):
+        raise ValueError("DEPLOYMENTS_CONFIG must be a JSON object")
+    return ret
+
+
+DEPLOYMENTS_CONFIG = _read_deployments_config()
+
+
+@lru_cache(maxsize=None)
+def get_deployment_config(deployment_id: str) -> DeploymentConfig:
+    conf: Dict[str, Any] = {}
+    for pattern, settings in DEPLOYMENTS_CONFIG.items():
+        if fnmatchcase(deployment_id, pattern):
+            conf = _merge(conf, settings)
+    return DeploymentConfig.parse_obj(conf)
+
+
+def validate_deployments_config() -> None:
+    """
+    Parses the configs of all the deployments on the startup,
+    so that a misconfiguration doesn't fail the requests.
+    """
+    for deployment in [*ChatCompletionDeployment, *EmbeddingsDeployment]:
+        conf = get_deployment_config(deployment.deployment_id)
+
+        # Claude 3 is called via Anthropic SDK which doesn't use boto3
+        if (
+            conf.hedging.enabled
+            and conf.transport != "native"
+            and not is_claude3_deployment(deployment)
+        ):
+            raise ValueError(
+                f"{deployment.deployment_id}: hedging requires "
+                "the native transport, since the boto3 calls can't be cancelled"
+            )
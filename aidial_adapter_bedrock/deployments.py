@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Literal
+from typing import Literal, TypeGuard, get_args
 
 
 class ChatCompletionDeployment(str, Enum):
@@ -83,6 +83,13 @@ Claude3Deployment = Literal[
 ]
 
 
+def is_claude3_deployment(
+    deployment: "ChatCompletionDeployment | EmbeddingsDeployment",
+) -> TypeGuard[Claude3Deployment]:
+    """Claude 3 deployments are called with Anthropic SDK, not with boto3"""
+    return deployment in get_args(Claude3Deployment)
+
+
 class EmbeddingsDeployment(str, Enum):
     AMAZON_TITAN_EMBED_TEXT_V1 = "amazon.titan-embed-text-v1"
     AMAZON_TITAN_EMBED_TEXT_V2 = "amazon.titan-embed-text-v2:0"
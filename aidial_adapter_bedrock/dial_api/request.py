@@ -1,9 +1,12 @@
+import hashlib
+import json
 from typing import List, Optional, TypeGuard, assert_never
 
 from aidial_sdk.chat_completion import (
     MessageContentImagePart,
     MessageContentPart,
     MessageContentTextPart,
+    Request,
 )
 from aidial_sdk.chat_completion.request import ChatCompletionRequest
 from pydantic import BaseModel
@@ -65,6 +68,77 @@ class ModelParameters(BaseModel):
             return self.tool_config.tools_mode
         return None
 
+    @property
+    def is_deterministic(self) -> bool:
+        return self.temperature == 0
+
+    @property
+    def latency_class(self) -> str:
+        """
+        Class of the requests with similar latencies:
+        the streaming mode and max_tokens rounded up to a power of two.
+        """
+        mode = "stream" if self.stream else "non-stream"
+        if self.max_tokens is None:
+            return mode
+        return f"{mode}/{1 << max(self.max_tokens - 1, 0).bit_length()}"
+
+
+# The request fields which don't affect the generated content
+_NON_GENERATIVE_FIELDS = {"stream", "n", "user"}
+
+
+def get_request_digest(request: Request, scope: Optional[str] = None) -> str:
+    """
+    Canonical hash of the deployment and the request fields
+    which affect the generated content.
+    The scope restricts the digest to the caller,
+    when the response is private to the caller (e.g. the URLs
+    of the attachments uploaded to the caller's bucket).
+    """
+    fields = set(ChatCompletionRequest.__fields__) - _NON_GENERATIVE_FIELDS
+    body = request.dict(include=fields, exclude_none=True)
+    canonical = json.dumps(
+        [request.deployment_id, body, scope],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# Rough averages used to estimate the prompt tokens without the tokenizer
+_CHARS_PER_TOKEN = 4
+_TOKENS_PER_IMAGE = 1600
+
+
+def estimate_prompt_tokens(request: ChatCompletionRequest) -> int:
+    """
+    Estimates the prompt tokens by the length of the messages.
+    Unlike the tokenizers of the models, it doesn't need the prompt
+    to be prepared, which involves e.g. downloading of the attachments.
+    """
+    chars, images = 0, 0
+    for message in request.messages:
+        match message.content:
+            case str(text):
+                chars += len(text)
+            case list(parts):
+                for part in parts:
+                    if isinstance(part, MessageContentTextPart):
+                        chars += len(part.text)
+                    else:
+                        images += 1
+        for call in message.tool_calls or []:
+            chars += len(call.function.arguments)
+        if message.function_call is not None:
+            chars += len(message.function_call.arguments)
+        if message.custom_content is not None:
+            images += len(message.custom_content.attachments or [])
+
+    return chars // _CHARS_PER_TOKEN + images * _TOKENS_PER_IMAGE
+
 
 def collect_text_content(
     content: MessageContentSpecialized, delimiter: str = "\n\n"
@@ -1,10 +1,15 @@
-from typing import List, Literal
+from typing import TYPE_CHECKING, List, Literal, Sequence
 
 from aidial_sdk.embeddings import Embedding
 from aidial_sdk.embeddings import Response as EmbeddingsResponse
 from aidial_sdk.embeddings import Usage
 from pydantic import BaseModel
 
+from aidial_adapter_bedrock.utils.json_codec import json_codec
+
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class ModelObject(BaseModel):
     object: Literal["model"] = "model"
@@ -17,12 +22,44 @@ class ModelsResponse(BaseModel):
 
 
 def make_embeddings_response(
-    model: str, vectors: List[List[float] | str], usage: Usage
+    model: str,
+    vectors: "np.ndarray | Sequence[List[float] | str]",
+    usage: Usage,
 ) -> EmbeddingsResponse:
 
+    # The vectors produced by the adapter are valid by construction,
+    # so the validation of each float is skipped.
+    # The rows of a matrix are kept as numpy arrays
+    # and serialized by `serialize_embeddings_response`.
     data: List[Embedding] = [
-        Embedding(index=index, embedding=embedding)
+        Embedding.construct(index=index, embedding=embedding)
         for index, embedding in enumerate(vectors)
     ]
 
-    return EmbeddingsResponse(model=model, data=data, usage=usage)
+    return EmbeddingsResponse.construct(model=model, data=data, usage=usage)
+
+
+def serialize_embeddings_response(response: EmbeddingsResponse) -> bytes:
+    """
+    Serializes the response to the same JSON as `response.dict()`,
+    but without copying the vectors: the rows of the matrix
+    are serialized from its buffer.
+    """
+    obj = {
+        "data": [
+            {
+                "embedding": embedding.embedding,
+                "index": embedding.index,
+                "object": embedding.object,
+            }
+            for embedding in response.data
+        ],
+        "model": response.model,
+        "object": response.object,
+        "usage": {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "total_tokens": response.usage.total_tokens,
+        },
+    }
+
+    return json_codec.dumps(obj)
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import hashlib
 import io
@@ -9,8 +10,25 @@ from urllib.parse import unquote, urljoin
 import aiohttp
 from pydantic import BaseModel
 
+from aidial_adapter_bedrock.utils.client_pool import ClientPool
+from aidial_adapter_bedrock.utils.json_codec import json_codec
 from aidial_adapter_bedrock.utils.log_config import app_logger as log
 
+# The session is shared across the requests
+# to keep alive the connections to DIAL.
+# It's shared by the requests of different users as well,
+# so it doesn't keep the cookies.
+_session_pool: ClientPool[aiohttp.ClientSession] = ClientPool(
+    "dial_session_pool", 1, close=lambda session: session.close()
+)
+
+
+async def get_session() -> aiohttp.ClientSession:
+    async def _create() -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar())
+
+    return await _session_pool.get("default", _create)
+
 
 class FileMetadata(TypedDict):
     name: str
@@ -40,7 +58,7 @@ class FileStorage(BaseModel):
                 headers=self.auth_headers,
             ) as response:
                 response.raise_for_status()
-                self.bucket = await response.json()
+                self.bucket = json_codec.loads(await response.read())
                 log.debug(f"bucket: {self.bucket}")
 
         return self.bucket
@@ -70,24 +88,24 @@ class FileStorage(BaseModel):
     async def upload(
         self, filename: str, content_type: str, content: bytes
     ) -> FileMetadata:
-        async with aiohttp.ClientSession() as session:
-            bucket = await self._get_bucket(session)
+        session = await get_session()
+        bucket = await self._get_bucket(session)
 
-            appdata = bucket["appdata"]
-            ext = mimetypes.guess_extension(content_type) or ""
-            url = f"{self.dial_url}/v1/files/{appdata}/{filename}{ext}"
+        appdata = bucket["appdata"]
+        ext = mimetypes.guess_extension(content_type) or ""
+        url = f"{self.dial_url}/v1/files/{appdata}/{filename}{ext}"
 
-            data = FileStorage._to_form_data(filename, content_type, content)
+        data = FileStorage._to_form_data(filename, content_type, content)
 
-            async with session.put(
-                url=url,
-                data=data,
-                headers=self.auth_headers,
-            ) as response:
-                response.raise_for_status()
-                meta = await response.json()
-                log.debug(f"Uploaded file: url={url}, metadata={meta}")
-                return meta
+        async with session.put(
+            url=url,
+            data=data,
+            headers=self.auth_headers,
+        ) as response:
+            response.raise_for_status()
+            meta = json_codec.loads(await response.read())
+            log.debug(f"Uploaded file: url={url}, metadata={meta}")
+            return meta
 
     async def upload_file_as_base64(
         self, upload_dir: str, data: str, content_type: str
@@ -118,8 +136,7 @@ class FileStorage(BaseModel):
         if link.startswith("public/"):
             bucket = "public"
         else:
-            async with aiohttp.ClientSession() as session:
-                bucket = await self._get_user_bucket(session)
+            bucket = await self._get_user_bucket(await get_session())
 
         link = link.removeprefix(f"{bucket}/")
         decoded_link = unquote(link)
@@ -127,10 +144,10 @@ class FileStorage(BaseModel):
 
 
 async def download_file(url: str, headers: Mapping[str, str] = {}) -> bytes:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            response.raise_for_status()
-            return await response.read()
+    session = await get_session()
+    async with session.get(url, headers=headers) as response:
+        response.raise_for_status()
+        return await response.read()
 
 
 def compute_hash_digest(file_content: str) -> str:
@@ -140,6 +157,25 @@ def compute_hash_digest(file_content: str) -> str:
 DIAL_URL = os.getenv("DIAL_URL")
 
 
+async def warm_up_connections(connections: int) -> None:
+    """Opens the given number of keep-alive connections to DIAL"""
+    if DIAL_URL is None:
+        return
+
+    session = await get_session()
+
+    async def _ping() -> None:
+        async with session.get(DIAL_URL) as response:
+            await response.read()
+
+    results = await asyncio.gather(
+        *(_ping() for _ in range(connections)), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            log.warning(f"failed to open a connection to DIAL: {result}")
+
+
 def create_file_storage(api_key: str) -> Optional[FileStorage]:
     if DIAL_URL is None:
         return None
@@ -1,18 +1,27 @@
-from typing import List, Tuple
+from typing import Tuple
 
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, validator
 
 from aidial_adapter_bedrock.bedrock import Bedrock
 
 
 class AmazonResponse(BaseModel):
+    class Config:
+        arbitrary_types_allowed = True
+
     inputTextTokenCount: int
-    embedding: List[float]
+    embedding: np.ndarray
+
+    @validator("embedding", pre=True)
+    def parse_embedding(cls, value):
+        # Converted at once instead of validating the floats one by one
+        return np.asarray(value, dtype="float32")
 
 
 async def call_embedding_model(
     client: Bedrock, model: str, request: dict
-) -> Tuple[List[float], int]:
+) -> Tuple[np.ndarray, int]:
     response_dict, _headers = await client.ainvoke_non_streaming(model, request)
     response = AmazonResponse.parse_obj(response_dict)
     return response.embedding, response.inputTextTokenCount
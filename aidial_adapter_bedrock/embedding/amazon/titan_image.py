@@ -5,7 +5,9 @@ See official cookbook for usage instructions:
 https://github.com/aws-samples/amazon-bedrock-samples/blob/5752afb78e7fab49cfd42d38bb09d40756bf0ea0/multimodal/Titan/titan-multimodal-embeddings/rag/1_multimodal_rag.ipynb
 """
 
-from typing import AsyncIterator, List, Self
+import asyncio
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, List, Self
 
 from aidial_sdk.chat_completion import Attachment
 from aidial_sdk.embeddings import Response as EmbeddingsResponse
@@ -14,6 +16,7 @@ from aidial_sdk.embeddings.request import EmbeddingsRequest
 from pydantic import BaseModel
 
 from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import EmbeddingsCacheConfig
 from aidial_adapter_bedrock.dial_api.embedding_inputs import (
     EMPTY_INPUT_LIST_ERROR,
     collect_embedding_inputs,
@@ -27,14 +30,21 @@ from aidial_adapter_bedrock.dial_api.storage import (
 from aidial_adapter_bedrock.embedding.amazon.response import (
     call_embedding_model,
 )
+from aidial_adapter_bedrock.embedding.cache import (
+    EmbeddingResult,
+    EmbeddingsLookup,
+    get_embedding_key,
+)
 from aidial_adapter_bedrock.embedding.embeddings_adapter import (
     EmbeddingsAdapter,
 )
-from aidial_adapter_bedrock.embedding.encoding import vector_to_base64
+from aidial_adapter_bedrock.embedding.encoding import encode_vectors
+from aidial_adapter_bedrock.embedding.fan_out import EmbeddingCalls
 from aidial_adapter_bedrock.embedding.validation import (
     validate_embeddings_request,
 )
 from aidial_adapter_bedrock.llm.errors import UserError, ValidationError
+from aidial_adapter_bedrock.utils.concurrency import gather_bounded
 from aidial_adapter_bedrock.utils.json import remove_nones
 
 IMAGE_MEDIA_TYPES = ["image/png"]
@@ -73,9 +83,13 @@ def _validate_content_type(content_type: str, supported_types: List[str]):
         )
 
 
+DeferredRequest = Callable[[], Awaitable[AmazonRequest]]
+"""Creates the request once its image is downloaded"""
+
+
 def get_requests(
     file_storage: FileStorage | None, request: EmbeddingsRequest
-) -> AsyncIterator[AmazonRequest]:
+) -> AsyncIterator[DeferredRequest]:
     async def download_image(attachment: Attachment) -> str:
         resource = await AttachmentResource(attachment=attachment).download(
             file_storage
@@ -83,36 +97,40 @@ def get_requests(
         _validate_content_type(resource.type, IMAGE_MEDIA_TYPES)
         return resource.data_base64
 
-    async def on_text(text: str) -> AmazonRequest:
-        return AmazonRequest(inputText=text)
+    async def create_request(
+        text: str | None, attachment: Attachment | None
+    ) -> AmazonRequest:
+        return AmazonRequest(
+            inputText=text,
+            inputImage=(
+                None if attachment is None else await download_image(attachment)
+            ),
+        )
+
+    async def on_text(text: str) -> DeferredRequest:
+        return partial(create_request, text, None)
 
-    async def on_attachment(attachment: Attachment) -> AmazonRequest:
-        return AmazonRequest(inputImage=await download_image(attachment))
+    async def on_attachment(attachment: Attachment) -> DeferredRequest:
+        return partial(create_request, None, attachment)
 
-    async def on_text_or_attachment(text: str | Attachment) -> AmazonRequest:
+    async def on_text_or_attachment(text: str | Attachment) -> DeferredRequest:
         if isinstance(text, str):
             return await on_text(text)
         else:
             return await on_attachment(text)
 
-    async def on_mixed(inputs: List[str | Attachment]) -> AmazonRequest:
+    async def on_mixed(inputs: List[str | Attachment]) -> DeferredRequest:
         if len(inputs) == 0:
             raise EMPTY_INPUT_LIST_ERROR
         elif len(inputs) == 1:
             return await on_text_or_attachment(inputs[0])
         elif len(inputs) == 2:
             if isinstance(inputs[0], str) and isinstance(inputs[1], Attachment):
-                return AmazonRequest(
-                    inputText=inputs[0],
-                    inputImage=await download_image(inputs[1]),
-                )
+                return partial(create_request, inputs[0], inputs[1])
             elif isinstance(inputs[0], Attachment) and isinstance(
                 inputs[1], str
             ):
-                return AmazonRequest(
-                    inputText=inputs[1],
-                    inputImage=await download_image(inputs[0]),
-                )
+                return partial(create_request, inputs[1], inputs[0])
             else:
                 raise ValidationError(
                     "The first element of a custom_input list element must be a string and the second element must be an image attachment or vice versa"
@@ -130,20 +148,30 @@ def get_requests(
     )
 
 
-class AmazonResponse(BaseModel):
-    inputTextTokenCount: int
-    embedding: List[float]
-
-
 class AmazonTitanImageEmbeddings(EmbeddingsAdapter):
     model: str
     client: Bedrock
     storage: FileStorage | None
+    cache: EmbeddingsCacheConfig
+    concurrency: int
 
     @classmethod
-    def create(cls, client: Bedrock, model: str, api_key: str) -> Self:
+    def create(
+        cls,
+        client: Bedrock,
+        model: str,
+        api_key: str,
+        cache: EmbeddingsCacheConfig,
+        concurrency: int,
+    ) -> Self:
         storage = create_file_storage(api_key)
-        return cls(client=client, model=model, storage=storage)
+        return cls(
+            client=client,
+            model=model,
+            storage=storage,
+            cache=cache,
+            concurrency=concurrency,
+        )
 
     async def embeddings(
         self, request: EmbeddingsRequest
@@ -155,31 +183,59 @@ class AmazonTitanImageEmbeddings(EmbeddingsAdapter):
             supports_dimensions=True,
         )
 
-        vectors: List[List[float] | str] = []
-        token_count = 0
+        deferred_requests = [
+            deferred_request
+            async for deferred_request in get_requests(self.storage, request)
+        ]
 
-        # NOTE: Amazon Titan doesn't support batched inputs
-        # TODO: create multiple tasks
-        async for sub_request in get_requests(self.storage, request):
+        async def embed(sub_request: AmazonRequest) -> EmbeddingResult:
             embedding, text_tokens = await call_embedding_model(
                 self.client,
                 self.model,
                 create_titan_request(sub_request, request.dimensions),
             )
-
             image_tokens = sub_request.get_image_tokens()
-
-            vector = (
-                vector_to_base64(embedding)
-                if request.encoding_format == "base64"
-                else embedding
+            return EmbeddingResult(embedding, text_tokens + image_tokens)
+
+        # NOTE: Amazon Titan doesn't support batched inputs,
+        # so each input is downloaded and then embedded on its own.
+        # The downloads and the embedding calls of the different inputs
+        # overlap, each stage is limited by the request concurrency.
+        downloads = asyncio.Semaphore(self.concurrency)
+        calls = EmbeddingCalls(self.concurrency)
+        lookup = EmbeddingsLookup(self.cache)
+
+        async def download_and_embed(
+            deferred_request: DeferredRequest,
+        ) -> EmbeddingResult:
+            async with downloads:
+                sub_request = await deferred_request()
+
+            key = get_embedding_key(
+                self.model,
+                [sub_request.inputText, sub_request.inputImage],
+                request.dimensions,
+                None,
+            )
+            return await lookup.get(
+                key, lambda: calls.call(partial(embed, sub_request))
             )
 
-            vectors.append(vector)
-            token_count += text_tokens + image_tokens
+        embeddings = await gather_bounded(
+            [
+                partial(download_and_embed, deferred_request)
+                for deferred_request in deferred_requests
+            ],
+            limit=2 * self.concurrency,
+        )
+
+        token_count = sum(embedding.tokens for embedding in embeddings)
 
         return make_embeddings_response(
             model=self.model,
-            vectors=vectors,
+            vectors=encode_vectors(
+                [embedding.vector for embedding in embeddings],
+                request.encoding_format,
+            ),
             usage=Usage(prompt_tokens=token_count, total_tokens=token_count),
         )
@@ -5,6 +5,7 @@ See official cookbook for usage instructions:
 https://github.com/aws-samples/amazon-bedrock-samples/blob/5752afb78e7fab49cfd42d38bb09d40756bf0ea0/multimodal/Titan/embeddings/v2/Titan-V2-Embeddings.ipynb
 """
 
+from functools import partial
 from typing import AsyncIterator, List, Self
 
 from aidial_sdk.embeddings import Response as EmbeddingsResponse
@@ -12,6 +13,7 @@ from aidial_sdk.embeddings import Usage
 from aidial_sdk.embeddings.request import EmbeddingsRequest
 
 from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import EmbeddingsCacheConfig
 from aidial_adapter_bedrock.dial_api.embedding_inputs import (
     EMPTY_INPUT_LIST_ERROR,
     collect_embedding_inputs_without_attachments,
@@ -20,10 +22,16 @@ from aidial_adapter_bedrock.dial_api.response import make_embeddings_response
 from aidial_adapter_bedrock.embedding.amazon.response import (
     call_embedding_model,
 )
+from aidial_adapter_bedrock.embedding.cache import (
+    EmbeddingResult,
+    get_embedding_key,
+    get_embeddings,
+)
 from aidial_adapter_bedrock.embedding.embeddings_adapter import (
     EmbeddingsAdapter,
 )
-from aidial_adapter_bedrock.embedding.encoding import vector_to_base64
+from aidial_adapter_bedrock.embedding.encoding import encode_vectors
+from aidial_adapter_bedrock.embedding.fan_out import fan_out
 from aidial_adapter_bedrock.embedding.validation import (
     validate_embeddings_request,
 )
@@ -55,13 +63,24 @@ class AmazonTitanTextEmbeddings(EmbeddingsAdapter):
     model: str
     client: Bedrock
     supports_dimensions: bool
+    cache: EmbeddingsCacheConfig
+    concurrency: int
 
     @classmethod
     def create(
-        cls, client: Bedrock, model: str, supports_dimensions: bool
+        cls,
+        client: Bedrock,
+        model: str,
+        supports_dimensions: bool,
+        cache: EmbeddingsCacheConfig,
+        concurrency: int,
     ) -> Self:
         return cls(
-            client=client, model=model, supports_dimensions=supports_dimensions
+            client=client,
+            model=model,
+            supports_dimensions=supports_dimensions,
+            cache=cache,
+            concurrency=concurrency,
         )
 
     async def embeddings(
@@ -74,27 +93,36 @@ class AmazonTitanTextEmbeddings(EmbeddingsAdapter):
             supports_dimensions=self.supports_dimensions,
         )
 
-        vectors: List[List[float] | str] = []
-        token_count = 0
+        text_inputs = [text async for text in get_text_inputs(request)]
 
-        # NOTE: Amazon Titan doesn't support batched inputs
-        async for text_input in get_text_inputs(request):
-            sub_request = create_titan_request(text_input, request.dimensions)
+        async def embed_text(text: str) -> EmbeddingResult:
+            sub_request = create_titan_request(text, request.dimensions)
             embedding, tokens = await call_embedding_model(
                 self.client, self.model, sub_request
             )
-
-            vector = (
-                vector_to_base64(embedding)
-                if request.encoding_format == "base64"
-                else embedding
+            return EmbeddingResult(embedding, tokens)
+
+        async def embed(indices: List[int]) -> List[EmbeddingResult]:
+            # NOTE: Amazon Titan doesn't support batched inputs,
+            # so the inputs are sent in the concurrent calls
+            return await fan_out(
+                [partial(embed_text, text_inputs[index]) for index in indices],
+                self.concurrency,
             )
 
-            vectors.append(vector)
-            token_count += tokens
+        keys = [
+            get_embedding_key(self.model, text, request.dimensions, None)
+            for text in text_inputs
+        ]
+        embeddings = await get_embeddings(self.cache, keys, embed)
+
+        token_count = sum(embedding.tokens for embedding in embeddings)
 
         return make_embeddings_response(
             model=self.model,
-            vectors=vectors,
+            vectors=encode_vectors(
+                [embedding.vector for embedding in embeddings],
+                request.encoding_format,
+            ),
             usage=Usage(prompt_tokens=token_count, total_tokens=token_count),
         )
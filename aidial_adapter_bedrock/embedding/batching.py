@@ -0,0 +1,90 @@
+"""
+Splitting of the inputs of an embeddings request into the batches
+for the models which support batched inputs (Cohere).
+
+A batch is limited by the number of the texts and their total size.
+The number of the texts adapts to the upstream latency (AIMD):
+it's halved when a batch takes longer than the target latency
+and increased by one text when a full batch is embedded in time.
+"""
+
+from typing import Dict, List
+
+from aidial_adapter_bedrock.deployment_config import (
+    EmbeddingsBatchingConfig,
+    get_deployment_config,
+)
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+from aidial_adapter_bedrock.utils.metrics import observe_gauges
+
+
+class AdaptiveBatchSize:
+    config: EmbeddingsBatchingConfig
+    value: int
+
+    def __init__(self, config: EmbeddingsBatchingConfig):
+        self.config = config
+        self.value = config.max_texts
+
+    def observe(self, batch_size: int, latency: float) -> None:
+        target_latency = self.config.target_latency
+        if target_latency is None:
+            return
+
+        if latency > target_latency:
+            # The concurrent batches of the same size halve it only once
+            value = max(self.config.min_texts, min(self.value, batch_size // 2))
+            if value < self.value:
+                log.debug(
+                    f"batch of {batch_size} texts took {latency:.2f}s, "
+                    f"reducing the batch size to {value}"
+                )
+            self.value = value
+        elif batch_size >= self.value:
+            self.value = min(self.config.max_texts, self.value + 1)
+
+
+_batch_sizes: Dict[str, AdaptiveBatchSize] = {}
+
+
+def get_batch_size(deployment_id: str) -> AdaptiveBatchSize:
+    if (batch_size := _batch_sizes.get(deployment_id)) is None:
+        config = get_deployment_config(deployment_id).embeddings_batching
+        batch_size = _batch_sizes[deployment_id] = AdaptiveBatchSize(config)
+    return batch_size
+
+
+observe_gauges(
+    "embeddings_batching.batch_size",
+    lambda: [
+        (batch_size.value, {"deployment": deployment_id})
+        for deployment_id, batch_size in list(_batch_sizes.items())
+    ],
+)
+
+
+def create_batches(
+    texts: List[str], max_texts: int, max_bytes: int
+) -> List[List[int]]:
+    """
+    Splits the texts into the consecutive batches of the text indices.
+    A text exceeding `max_bytes` on its own makes a batch of its own.
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_bytes = 0
+
+    for index, text in enumerate(texts):
+        text_bytes = len(text.encode("utf-8"))
+        if batch and (
+            len(batch) >= max_texts or batch_bytes + text_bytes > max_bytes
+        ):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(index)
+        batch_bytes += text_bytes
+
+    if batch:
+        batches.append(batch)
+
+    return batches
@@ -0,0 +1,150 @@
+"""
+Cache of the embeddings of the individual inputs.
+
+The embedding of an input is cached by the digest of the model,
+the input (text and/or image), the dimensions and the input type.
+The vectors are kept as float32 arrays along with the number
+of the input tokens, so the usage of a request served from the cache
+is the same as the usage of the request served by the model.
+
+The duplicate inputs within a request are embedded once
+regardless of whether the cache is enabled.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from aidial_adapter_bedrock.deployment_config import EmbeddingsCacheConfig
+from aidial_adapter_bedrock.utils.lru_cache import LRUCache
+from aidial_adapter_bedrock.utils.metrics import (
+    observe_cache_stats,
+    observe_counter,
+    observe_gauge,
+)
+
+EMBEDDINGS_CACHE_SIZE = int(os.getenv("EMBEDDINGS_CACHE_SIZE", "10000"))
+
+
+class EmbeddingResult(NamedTuple):
+    vector: np.ndarray
+    """float32 array"""
+
+    tokens: int
+    """Number of the input tokens"""
+
+
+@dataclass
+class EmbeddingsCacheStats:
+    deduplicated: int = 0
+
+
+_cache: LRUCache[str, EmbeddingResult] = LRUCache(EMBEDDINGS_CACHE_SIZE)
+embeddings_cache_stats = EmbeddingsCacheStats()
+
+
+def _get_hit_ratio() -> float:
+    lookups = _cache.stats.hits + _cache.stats.misses
+    return _cache.stats.hits / lookups if lookups else 0.0
+
+
+observe_cache_stats("embeddings_cache", _cache.stats)
+observe_gauge("embeddings_cache.hit_ratio", _get_hit_ratio)
+observe_counter(
+    "embeddings_cache.deduplicated",
+    lambda: embeddings_cache_stats.deduplicated,
+)
+
+
+def get_embedding_key(
+    model: str,
+    input: Any,
+    dimensions: Optional[int],
+    input_type: Optional[str],
+) -> str:
+    canonical = json.dumps(
+        [model, input, dimensions, input_type],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def get_embeddings(
+    config: EmbeddingsCacheConfig,
+    keys: List[str],
+    embed: Callable[[List[int]], Awaitable[List[EmbeddingResult]]],
+) -> List[EmbeddingResult]:
+    """
+    Returns the embeddings of the inputs with the given keys.
+    `embed` is called with the indices of the distinct inputs
+    missing in the cache and returns their embeddings in the same order.
+    """
+    results: Dict[str, EmbeddingResult] = {}
+    missing: Dict[str, int] = {}
+
+    for index, key in enumerate(keys):
+        if key in results or key in missing:
+            embeddings_cache_stats.deduplicated += 1
+        elif config.enabled and (result := _cache.get(key)) is not None:
+            results[key] = result
+        else:
+            missing[key] = index
+
+    if missing:
+        embedded = await embed(list(missing.values()))
+        for key, result in zip(missing.keys(), embedded, strict=True):
+            results[key] = result
+            if config.enabled:
+                _cache.put(key, result, ttl=config.ttl)
+
+    return [results[key] for key in keys]
+
+
+class EmbeddingsLookup:
+    """
+    Returns the embeddings of the inputs of a request which become
+    known one by one (e.g. as the images are downloaded).
+    The duplicate inputs share the embedding of the first one.
+    """
+
+    config: EmbeddingsCacheConfig
+    _pending: Dict[str, asyncio.Future[EmbeddingResult]]
+
+    def __init__(self, config: EmbeddingsCacheConfig):
+        self.config = config
+        self._pending = {}
+
+    async def get(
+        self, key: str, embed: Callable[[], Awaitable[EmbeddingResult]]
+    ) -> EmbeddingResult:
+        if (future := self._pending.get(key)) is not None:
+            embeddings_cache_stats.deduplicated += 1
+            return await asyncio.shield(future)
+
+        future = self._pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            if not self.config.enabled or (result := _cache.get(key)) is None:
+                result = await embed()
+                if self.config.enabled:
+                    _cache.put(key, result, ttl=self.config.ttl)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # The error is raised here, the duplicates may not retrieve it
+            future.exception()
+            raise
+
+        future.set_result(result)
+        return result
+
+
+def clear_embeddings_cache() -> None:
+    _cache.clear()
@@ -6,6 +6,8 @@ https://docs.aws.amazon.com/bedrock/latest/userguide/model-parameters-embed.html
 https://docs.cohere.com/reference/embed
 """
 
+import time
+from functools import partial
 from typing import AsyncIterator, List, Self
 
 from aidial_sdk.embeddings import Response as EmbeddingsResponse
@@ -13,18 +15,29 @@ from aidial_sdk.embeddings import Usage
 from aidial_sdk.embeddings.request import EmbeddingsRequest
 
 from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import EmbeddingsCacheConfig
 from aidial_adapter_bedrock.dial_api.embedding_inputs import (
     EMPTY_INPUT_LIST_ERROR,
     collect_embedding_inputs_without_attachments,
 )
 from aidial_adapter_bedrock.dial_api.response import make_embeddings_response
+from aidial_adapter_bedrock.embedding.batching import (
+    AdaptiveBatchSize,
+    create_batches,
+)
+from aidial_adapter_bedrock.embedding.cache import (
+    EmbeddingResult,
+    get_embedding_key,
+    get_embeddings,
+)
 from aidial_adapter_bedrock.embedding.cohere.response import (
     call_embedding_model,
 )
 from aidial_adapter_bedrock.embedding.embeddings_adapter import (
     EmbeddingsAdapter,
 )
-from aidial_adapter_bedrock.embedding.encoding import vector_to_base64
+from aidial_adapter_bedrock.embedding.encoding import encode_vectors
+from aidial_adapter_bedrock.embedding.fan_out import fan_out
 from aidial_adapter_bedrock.embedding.validation import (
     validate_embeddings_request,
 )
@@ -57,13 +70,50 @@ def get_text_inputs(request: EmbeddingsRequest) -> AsyncIterator[str]:
     )
 
 
+def split_tokens(tokens: int, texts: List[str]) -> List[int]:
+    """
+    Bedrock reports the number of the input tokens for the whole batch,
+    so it's split between the texts proportionally to their length.
+    """
+    lengths = [max(len(text), 1) for text in texts]
+    total_length = sum(lengths)
+
+    shares = [tokens * length / total_length for length in lengths]
+    result = [int(share) for share in shares]
+
+    # The remaining tokens go to the texts with the largest remainders
+    by_remainder = sorted(
+        range(len(texts)), key=lambda i: result[i] - shares[i]
+    )
+    for index in by_remainder[: tokens - sum(result)]:
+        result[index] += 1
+
+    return result
+
+
 class CohereTextEmbeddings(EmbeddingsAdapter):
     model: str
     client: Bedrock
+    cache: EmbeddingsCacheConfig
+    concurrency: int
+    batch_size: AdaptiveBatchSize
 
     @classmethod
-    def create(cls, client: Bedrock, model: str) -> Self:
-        return cls(client=client, model=model)
+    def create(
+        cls,
+        client: Bedrock,
+        model: str,
+        cache: EmbeddingsCacheConfig,
+        concurrency: int,
+        batch_size: AdaptiveBatchSize,
+    ) -> Self:
+        return cls(
+            client=client,
+            model=model,
+            cache=cache,
+            concurrency=concurrency,
+            batch_size=batch_size,
+        )
 
     async def embeddings(
         self, request: EmbeddingsRequest
@@ -86,23 +136,51 @@ class CohereTextEmbeddings(EmbeddingsAdapter):
 
         text_inputs = [txt async for txt in get_text_inputs(request)]
 
-        embedding_request = create_cohere_request(text_inputs, input_type)
-
-        embeddings, tokens = await call_embedding_model(
-            self.client, self.model, embedding_request
-        )
+        async def embed_batch(texts: List[str]) -> List[EmbeddingResult]:
+            embedding_request = create_cohere_request(texts, input_type)
 
-        vectors: List[List[float] | str] = [
-            (
-                vector_to_base64(embedding)
-                if request.encoding_format == "base64"
-                else embedding
+            start_time = time.monotonic()
+            embeddings, tokens = await call_embedding_model(
+                self.client, self.model, embedding_request
+            )
+            self.batch_size.observe(len(texts), time.monotonic() - start_time)
+
+            return [
+                EmbeddingResult(embedding, tokens)
+                for embedding, tokens in zip(
+                    embeddings, split_tokens(tokens, texts), strict=True
+                )
+            ]
+
+        async def embed(indices: List[int]) -> List[EmbeddingResult]:
+            texts = [text_inputs[index] for index in indices]
+            batches = create_batches(
+                texts,
+                max_texts=self.batch_size.value,
+                max_bytes=self.batch_size.config.max_bytes,
             )
-            for embedding in embeddings
+            results = await fan_out(
+                [
+                    partial(embed_batch, [texts[index] for index in batch])
+                    for batch in batches
+                ],
+                self.concurrency,
+            )
+            return [result for batch in results for result in batch]
+
+        keys = [
+            get_embedding_key(self.model, text, None, input_type)
+            for text in text_inputs
         ]
+        embeddings = await get_embeddings(self.cache, keys, embed)
+
+        token_count = sum(embedding.tokens for embedding in embeddings)
 
         return make_embeddings_response(
             model=self.model,
-            vectors=vectors,
-            usage=Usage(prompt_tokens=tokens, total_tokens=tokens),
+            vectors=encode_vectors(
+                [embedding.vector for embedding in embeddings],
+                request.encoding_format,
+            ),
+            usage=Usage(prompt_tokens=token_count, total_tokens=token_count),
         )
@@ -1,24 +1,34 @@
 from typing import List, Literal, Tuple
 
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, validator
 
 from aidial_adapter_bedrock.bedrock import Bedrock
 from aidial_adapter_bedrock.utils.log_config import bedrock_logger as log
 
 
 class CohereResponse(BaseModel):
+    class Config:
+        arbitrary_types_allowed = True
+
     id: str
     response_type: Literal["embeddings_floats"]
-    embeddings: List[List[float]]
+    embeddings: np.ndarray
     texts: List[str]
     # According to https://docs.cohere.com/reference/embed
     # input tokens are expected to be returned in the response field `meta`.
     # However, Bedrock moved it to the response headers.
 
+    @validator("embeddings", pre=True)
+    def parse_embeddings(cls, value):
+        # Converted into a single matrix at once
+        # instead of validating the floats one by one
+        return np.asarray(value, dtype="float32")
+
 
 async def call_embedding_model(
     client: Bedrock, model: str, request: dict
-) -> Tuple[List[List[float]], int]:
+) -> Tuple[np.ndarray, int]:
     body, headers = await client.ainvoke_non_streaming(model, request)
     response = CohereResponse.parse_obj(body)
 
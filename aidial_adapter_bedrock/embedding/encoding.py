@@ -1,11 +1,12 @@
 import base64
-from typing import List
+import binascii
+from typing import List, Literal
 
 import numpy as np
 
 
-def vector_to_base64(vector: List[float]) -> str:
-    array = np.array(vector, dtype="float32")
+def vector_to_base64(vector: List[float] | np.ndarray) -> str:
+    array = np.asarray(vector, dtype="float32")
     byte_data = array.tobytes()
     base64_encoded = base64.b64encode(byte_data).decode("utf-8")
     return base64_encoded
@@ -13,3 +14,45 @@ def vector_to_base64(vector: List[float]) -> str:
 
 def base64_to_vector(data: str) -> List[float]:
     return np.frombuffer(base64.b64decode(data), dtype="float32").tolist()
+
+
+def matrix_to_base64(matrix: np.ndarray) -> List[str]:
+    """
+    Encodes the rows of the matrix.
+    Equivalent to calling `vector_to_base64` for each row,
+    but the rows are encoded from a single contiguous buffer without copying.
+    """
+    rows = np.ascontiguousarray(matrix, dtype="float32")
+    if rows.size == 0:
+        return [""] * len(rows)
+
+    buffer = memoryview(rows).cast("B")
+    width = rows.strides[0]
+
+    return [
+        binascii.b2a_base64(
+            buffer[index * width : (index + 1) * width], newline=False
+        ).decode("ascii")
+        for index in range(len(rows))
+    ]
+
+
+def encode_vectors(
+    vectors: List[np.ndarray], encoding_format: Literal["float", "base64"]
+) -> np.ndarray | List[str]:
+    """
+    Encodes the vectors of the same size as a single contiguous matrix.
+    The base64 format encodes float32 values, while the float format
+    returns the matrix itself, which is serialized directly to JSON
+    without converting the values to Python floats.
+    The float32 values are serialized in the shortest form,
+    so the values of the response of the model are returned as they are.
+    """
+    if len({vector.shape for vector in vectors}) > 1:
+        raise ValueError("The vectors have different sizes")
+
+    matrix = np.stack(vectors) if vectors else np.empty((0, 0))
+
+    if encoding_format == "base64":
+        return matrix_to_base64(matrix)
+    return matrix
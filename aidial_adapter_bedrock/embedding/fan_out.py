@@ -0,0 +1,64 @@
+"""
+Concurrent calls to the embedding models made by a request:
+the calls with a single input to the models which don't support
+batched inputs (Amazon Titan) or the calls with a batch of inputs (Cohere).
+
+The number of the concurrent calls is limited per request
+(see `embeddings_concurrency` deployment setting) and per process,
+so that a few large requests don't exhaust the connections
+and the quota of the account.
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from aidial_adapter_bedrock.utils.concurrency import gather_bounded
+from aidial_adapter_bedrock.utils.metrics import observe_gauge
+
+T = TypeVar("T")
+
+EMBEDDINGS_MAX_CONCURRENCY = int(os.getenv("EMBEDDINGS_MAX_CONCURRENCY", "256"))
+
+_semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # The semaphore is bound to the event loop it's first used in
+    global _semaphore
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore[0] is not loop:
+        _semaphore = (loop, asyncio.Semaphore(EMBEDDINGS_MAX_CONCURRENCY))
+    return _semaphore[1]
+
+
+def _get_active() -> int:
+    if _semaphore is None:
+        return 0
+    return EMBEDDINGS_MAX_CONCURRENCY - _semaphore[1]._value
+
+
+observe_gauge("embeddings_fan_out.active", _get_active)
+
+
+class EmbeddingCalls:
+    """Limits the concurrent calls made by a request"""
+
+    _semaphore: asyncio.Semaphore
+
+    def __init__(self, concurrency: int):
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        async with self._semaphore, _get_semaphore():
+            return await func()
+
+
+async def fan_out(
+    funcs: List[Callable[[], Awaitable[T]]], concurrency: int
+) -> List[T]:
+    """
+    Makes the calls with the given concurrency
+    and returns the results in the order of the calls.
+    """
+    return await gather_bounded(funcs, concurrency, _get_semaphore())
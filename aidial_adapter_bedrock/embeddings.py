@@ -1,22 +1,44 @@
 from aidial_sdk.embeddings import Embeddings, Request, Response
 
 from aidial_adapter_bedrock.aws_client_config import AWSClientConfigFactory
+from aidial_adapter_bedrock.concurrency_limiter import limit_concurrency
 from aidial_adapter_bedrock.deployments import EmbeddingsDeployment
 from aidial_adapter_bedrock.llm.model.adapter import get_embeddings_model
+from aidial_adapter_bedrock.rate_limiter import limit_rate
+from aidial_adapter_bedrock.routing import route
 from aidial_adapter_bedrock.server.exceptions import dial_exception_decorator
 
 
 class BedrockEmbeddings(Embeddings):
     @dial_exception_decorator
     async def embeddings(self, request: Request) -> Response:
+        async with route(request.deployment_id) as target:
+            factory = AWSClientConfigFactory(request=request)
+            if target is not None:
+                factory = factory.with_region(target.region)
+            aws_client_config = await factory.get_client_config()
 
-        aws_client_config = await AWSClientConfigFactory(
-            request=request
-        ).get_client_config()
-        model = await get_embeddings_model(
-            deployment=EmbeddingsDeployment(request.deployment_id),
-            api_key=request.api_key,
-            aws_client_config=aws_client_config,
-        )
+            deployment = EmbeddingsDeployment(
+                (target and target.deployment) or request.deployment_id
+            )
+            model = await get_embeddings_model(
+                deployment=deployment,
+                api_key=request.api_key,
+                aws_client_config=aws_client_config,
+            )
 
-        return await model.embeddings(request)
+            # The input tokens of the embeddings aren't estimated up front,
+            # they are charged once the usage is known.
+            async with limit_rate(
+                deployment.deployment_id,
+                deployment.model_id,
+                aws_client_config,
+            ) as reservation:
+                async with limit_concurrency(
+                    deployment.deployment_id,
+                    deployment.model_id,
+                    aws_client_config,
+                ):
+                    response = await model.embeddings(request)
+                reservation.reconcile(response.usage.total_tokens)
+                return response
@@ -0,0 +1,162 @@
+"""
+Hedged non-streaming calls to Bedrock.
+
+A small share of the calls to Bedrock is much slower than the rest,
+which dominates the tail latency of the short calls (e.g. embeddings).
+When the call takes longer than the given percentile of the recent
+latencies of the calls of the same class to the deployment (e.g. the streaming
+and non-streaming requests with a similar max_tokens), an identical call
+is sent and the response of whichever call completes first is taken,
+the other one is cancelled.
+
+Hedging is allowed only with the native transport: a boto3 call runs
+in a thread, which can't be cancelled, so the losing call would still
+hold the thread and consume the quota until it completes.
+
+The share of the hedged calls is capped by the hedge budget
+of the deployment, so the hedging can't multiply the quota usage.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from aidial_adapter_bedrock.deployment_config import (
+    HedgingConfig,
+    get_deployment_config,
+)
+from aidial_adapter_bedrock.retry import RetryBudget
+from aidial_adapter_bedrock.utils.log_config import bedrock_logger as log
+from aidial_adapter_bedrock.utils.metrics import observe_counter
+
+_T = TypeVar("_T")
+
+# The percentile is recomputed after this number of new samples
+_RECOMPUTE_INTERVAL = 16
+
+
+@dataclass
+class HedgingStats:
+    hedged: int = 0
+    hedge_wins: int = 0
+
+
+hedging_stats = HedgingStats()
+
+observe_counter("hedging.hedged", lambda: hedging_stats.hedged)
+observe_counter("hedging.hedge_wins", lambda: hedging_stats.hedge_wins)
+
+
+class LatencyTracker:
+    """Percentile of the latencies of the recent successful calls"""
+
+    percentile: float
+    min_samples: int
+    samples: Deque[float]
+
+    _value: Optional[float]
+    _new_samples: int
+
+    def __init__(self, percentile: float, window: int, min_samples: int):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+        self._value = None
+        self._new_samples = 0
+
+    def record(self, latency: float) -> None:
+        self.samples.append(latency)
+        self._new_samples += 1
+
+    def get(self) -> Optional[float]:
+        if not self.samples or len(self.samples) < self.min_samples:
+            return None
+
+        if self._value is None or self._new_samples >= _RECOMPUTE_INTERVAL:
+            samples = sorted(self.samples)
+            index = min(len(samples) - 1, int(self.percentile * len(samples)))
+            self._value = samples[index]
+            self._new_samples = 0
+
+        return self._value
+
+
+class HedgingPolicy:
+    config: HedgingConfig
+    latencies: Dict[str, LatencyTracker]
+    """Latencies of the calls by their class"""
+
+    budget: RetryBudget
+
+    def __init__(self, config: HedgingConfig):
+        self.config = config
+        self.latencies = {}
+        self.budget = RetryBudget(config.max_rate, config.budget_capacity)
+
+    def get_latency(self, latency_class: str) -> LatencyTracker:
+        if (latency := self.latencies.get(latency_class)) is None:
+            latency = self.latencies[latency_class] = LatencyTracker(
+                self.config.percentile,
+                self.config.window,
+                self.config.min_samples,
+            )
+        return latency
+
+    def _get_delay(self, latency: LatencyTracker) -> Optional[float]:
+        if not self.config.enabled:
+            return None
+        delay = latency.get()
+        return None if delay is None else max(delay, self.config.min_delay)
+
+    async def call(
+        self, func: Callable[[], Awaitable[_T]], latency_class: str = ""
+    ) -> _T:
+        latency = self.get_latency(latency_class)
+        start = time.monotonic()
+        delay = self._get_delay(latency)
+        if delay is None:
+            result = await func()
+        else:
+            self.budget.deposit()
+            result = await self._hedged_call(func, delay)
+
+        latency.record(time.monotonic() - start)
+        return result
+
+    async def _hedged_call(
+        self, func: Callable[[], Awaitable[_T]], delay: float
+    ) -> _T:
+        first = asyncio.ensure_future(func())
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self.budget.withdraw():
+                return await first
+
+            hedging_stats.hedged += 1
+            log.debug(f"hedging the call after {delay:.3f} seconds")
+            tasks.append(asyncio.ensure_future(func()))
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # A failed call is ignored while the other one is pending
+                succeeded = [t for t in done if t.exception() is None]
+                if succeeded or not pending:
+                    task = (succeeded or list(done))[0]
+                    if task is not first:
+                        hedging_stats.hedge_wins += 1
+                    return task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+@lru_cache(maxsize=None)
+def get_hedging_policy(deployment_id: str) -> HedgingPolicy:
+    return HedgingPolicy(get_deployment_config(deployment_id).hedging)
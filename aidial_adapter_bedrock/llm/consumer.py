@@ -134,3 +134,38 @@ class ChoiceConsumer(Consumer):
         self.choice.create_function_call(
             name=function_call.name, arguments=function_call.arguments
         )
+
+
+class UsageTrackingConsumer(Consumer):
+    """Passes the calls to the consumer and accumulates the token usage"""
+
+    consumer: Consumer
+    usage: TokenUsage
+
+    def __init__(self, consumer: Consumer):
+        self.consumer = consumer
+        self.usage = TokenUsage()
+
+    def append_content(self, content: str):
+        self.consumer.append_content(content)
+
+    def close_content(self, finish_reason: FinishReason | None = None):
+        self.consumer.close_content(finish_reason)
+
+    def add_attachment(self, attachment: Attachment):
+        self.consumer.add_attachment(attachment)
+
+    def add_usage(self, usage: TokenUsage):
+        self.usage.accumulate(usage)
+        self.consumer.add_usage(usage)
+
+    def set_discarded_messages(
+        self, discarded_messages: Optional[DiscardedMessages]
+    ):
+        self.consumer.set_discarded_messages(discarded_messages)
+
+    def create_function_tool_call(self, tool_call: ToolCall):
+        self.consumer.create_function_tool_call(tool_call)
+
+    def create_function_call(self, function_call: FunctionCall):
+        self.consumer.create_function_call(function_call)
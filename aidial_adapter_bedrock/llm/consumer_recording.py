@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+from aidial_sdk.chat_completion import FinishReason, FunctionCall, ToolCall
+
+from aidial_adapter_bedrock.dial_api.token_usage import TokenUsage
+from aidial_adapter_bedrock.llm.consumer import Attachment, Consumer
+from aidial_adapter_bedrock.llm.truncate_prompt import DiscardedMessages
+
+ConsumerCall = Tuple[str, Tuple[Any, ...]]
+"""Name of the consumer method and its arguments"""
+
+
+class ConsumerRecording:
+    """
+    The calls made to a consumer while the response was generated.
+    The recording could be replayed to other consumers
+    while it's being recorded or after it's finished.
+    """
+
+    calls: List[ConsumerCall]
+    done: bool
+    error: Optional[BaseException]
+
+    _updated: asyncio.Event
+
+    def __init__(self):
+        self.calls = []
+        self.done = False
+        self.error = None
+        self._updated = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def record(self, name: str, *args: Any) -> None:
+        self.calls.append((name, args))
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def replay(self, consumer: Consumer) -> int:
+        """
+        Replays the calls to the consumer as they are recorded
+        until the recording is finished.
+        Raises the error the recording was finished with.
+        Returns the number of the replayed calls.
+        """
+        index = 0
+        while True:
+            updated = self._updated
+            for name, args in self.calls[index:]:
+                getattr(consumer, name)(*args)
+            index = len(self.calls)
+
+            if self.done:
+                break
+            await updated.wait()
+
+        if self.error is not None:
+            raise self.error
+        return index
+
+
+class RecordingConsumer(Consumer):
+    """Records the calls and passes them to the consumer if any"""
+
+    consumer: Optional[Consumer]
+    recording: ConsumerRecording
+
+    def __init__(
+        self, consumer: Optional[Consumer], recording: ConsumerRecording
+    ):
+        self.consumer = consumer
+        self.recording = recording
+
+    def _call(self, name: str, *args: Any) -> None:
+        self.recording.record(name, *args)
+        if self.consumer is not None:
+            getattr(self.consumer, name)(*args)
+
+    def append_content(self, content: str):
+        self._call("append_content", content)
+
+    def close_content(self, finish_reason: FinishReason | None = None):
+        self._call("close_content", finish_reason)
+
+    def add_attachment(self, attachment: Attachment):
+        self._call("add_attachment", attachment)
+
+    def add_usage(self, usage: TokenUsage):
+        self._call("add_usage", usage)
+
+    def set_discarded_messages(
+        self, discarded_messages: Optional[DiscardedMessages]
+    ):
+        self._call("set_discarded_messages", discarded_messages)
+
+    def create_function_tool_call(self, tool_call: ToolCall):
+        self._call("create_function_tool_call", tool_call)
+
+    def create_function_call(self, function_call: FunctionCall):
+        self._call("create_function_call", function_call)
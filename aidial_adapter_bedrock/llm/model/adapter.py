@@ -1,95 +1,166 @@
-from typing import assert_never
+import hashlib
+import os
+from typing import TYPE_CHECKING, assert_never
 
 from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
-from aidial_adapter_bedrock.bedrock import Bedrock
 from aidial_adapter_bedrock.deployments import (
     ChatCompletionDeployment,
     EmbeddingsDeployment,
+    is_claude3_deployment,
 )
-from aidial_adapter_bedrock.embedding.amazon.titan_image import (
-    AmazonTitanImageEmbeddings,
-)
-from aidial_adapter_bedrock.embedding.amazon.titan_text import (
-    AmazonTitanTextEmbeddings,
-)
-from aidial_adapter_bedrock.embedding.cohere.embed_text import (
-    CohereTextEmbeddings,
-)
-from aidial_adapter_bedrock.embedding.embeddings_adapter import (
-    EmbeddingsAdapter,
-)
-from aidial_adapter_bedrock.llm.chat_model import ChatCompletionAdapter
-from aidial_adapter_bedrock.llm.model.ai21 import AI21Adapter
-from aidial_adapter_bedrock.llm.model.amazon import AmazonAdapter
-from aidial_adapter_bedrock.llm.model.claude.v1_v2.adapter import (
-    Adapter as Claude_V1_V2,
+from aidial_adapter_bedrock.dial_api import storage
+from aidial_adapter_bedrock.utils.client_pool import ClientPool
+
+if TYPE_CHECKING:
+    from aidial_adapter_bedrock.bedrock import Bedrock
+    from aidial_adapter_bedrock.embedding.embeddings_adapter import (
+        EmbeddingsAdapter,
+    )
+    from aidial_adapter_bedrock.llm.chat_model import ChatCompletionAdapter
+
+# NOTE: the model families and the libraries they depend on
+# (boto3, anthropic, tokenizers, PIL, numpy) are imported
+# on the first use of a deployment to speed up the server startup.
+
+ADAPTER_CACHE_SIZE = int(os.getenv("ADAPTER_CACHE_SIZE", "256"))
+
+# The adapters don't keep any per-request state, so an adapter is shared
+# across the requests to the same deployment with the same client and
+# file storage. It saves the repeated validation of the adapter models
+# and the loading of their tokenizers.
+_chat_adapters: ClientPool["ChatCompletionAdapter"] = ClientPool(
+    "chat_completion_adapter_cache", ADAPTER_CACHE_SIZE
 )
-from aidial_adapter_bedrock.llm.model.claude.v3.adapter import (
-    Adapter as Claude_V3,
+_embeddings_adapters: ClientPool["EmbeddingsAdapter"] = ClientPool(
+    "embeddings_adapter_cache", ADAPTER_CACHE_SIZE
 )
-from aidial_adapter_bedrock.llm.model.cohere import CohereAdapter
-from aidial_adapter_bedrock.llm.model.llama.v2 import llama2_config
-from aidial_adapter_bedrock.llm.model.llama.v3 import llama3_config
-from aidial_adapter_bedrock.llm.model.meta import MetaAdapter
-from aidial_adapter_bedrock.llm.model.stability import StabilityAdapter
+
+_Deployment = ChatCompletionDeployment | EmbeddingsDeployment
+
+
+def _uses_storage(deployment: _Deployment) -> bool:
+    if is_claude3_deployment(deployment):
+        return True
+    match deployment:
+        case (
+            ChatCompletionDeployment.STABILITY_STABLE_DIFFUSION_XL
+            | ChatCompletionDeployment.STABILITY_STABLE_DIFFUSION_XL_V1
+            | EmbeddingsDeployment.AMAZON_TITAN_EMBED_IMAGE_V1
+        ):
+            return True
+        case _:
+            return False
+
+
+def is_cached_per_api_key(deployment: _Deployment) -> bool:
+    return _uses_storage(deployment) and storage.DIAL_URL is not None
+
+
+def _get_adapter_cache_key(
+    deployment: _Deployment, api_key: str, aws_client_config: AWSClientConfig
+) -> str:
+    """
+    The clients are determined by the AWS config and the deployment
+    settings, while the file storage is determined by the API key.
+    """
+    key = f"{deployment.deployment_id}/{aws_client_config.get_cache_key()}"
+    if is_cached_per_api_key(deployment):
+        key += f"/{hashlib.sha256(api_key.encode()).hexdigest()}"
+    return key
+
+
+async def create_clients(
+    deployment: _Deployment, aws_client_config: AWSClientConfig
+) -> None:
+    """
+    Creates the pooled clients used by the adapter of the deployment
+    without creating the adapter itself.
+    """
+    if is_claude3_deployment(deployment):
+        from aidial_adapter_bedrock.llm.model.claude.v3.adapter import (
+            get_anthropic_client,
+        )
+
+        await get_anthropic_client(deployment, aws_client_config)
+    else:
+        from aidial_adapter_bedrock.bedrock import Bedrock
+
+        await Bedrock.acreate(aws_client_config, deployment.deployment_id)
 
 
 async def get_bedrock_adapter(
     deployment: ChatCompletionDeployment,
     api_key: str,
     aws_client_config: AWSClientConfig,
-) -> ChatCompletionAdapter:
+) -> "ChatCompletionAdapter":
+    return await _chat_adapters.get(
+        _get_adapter_cache_key(deployment, api_key, aws_client_config),
+        lambda: _create_bedrock_adapter(deployment, api_key, aws_client_config),
+    )
+
+
+async def _create_bedrock_adapter(
+    deployment: ChatCompletionDeployment,
+    api_key: str,
+    aws_client_config: AWSClientConfig,
+) -> "ChatCompletionAdapter":
     model = deployment.model_id
+
+    async def get_client() -> "Bedrock":
+        from aidial_adapter_bedrock.bedrock import Bedrock
+
+        return await Bedrock.acreate(
+            aws_client_config, deployment.deployment_id
+        )
+
+    if is_claude3_deployment(deployment):
+        from aidial_adapter_bedrock.llm.model.claude.v3.adapter import (
+            Adapter as Claude_V3,
+        )
+
+        return await Claude_V3.create(deployment, api_key, aws_client_config)
+
     match deployment:
-        case (
-            ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_SONNET
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_SONNET_US
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_SONNET_EU
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_5_SONNET
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_5_SONNET_US
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_5_SONNET_EU
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_HAIKU
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_HAIKU_US
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_HAIKU_EU
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_OPUS
-            | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_OPUS_US
-        ):
-            return Claude_V3.create(deployment, api_key, aws_client_config)
         case (
             ChatCompletionDeployment.ANTHROPIC_CLAUDE_INSTANT_V1
             | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V2
             | ChatCompletionDeployment.ANTHROPIC_CLAUDE_V2_1
         ):
-            return await Claude_V1_V2.create(
-                await Bedrock.acreate(aws_client_config), model
+            from aidial_adapter_bedrock.llm.model.claude.v1_v2.adapter import (
+                Adapter as Claude_V1_V2,
             )
+
+            return await Claude_V1_V2.create(await get_client(), model)
         case (
             ChatCompletionDeployment.AI21_J2_JUMBO_INSTRUCT
             | ChatCompletionDeployment.AI21_J2_GRANDE_INSTRUCT
             | ChatCompletionDeployment.AI21_J2_MID_V1
             | ChatCompletionDeployment.AI21_J2_ULTRA_V1
         ):
-            return AI21Adapter.create(
-                await Bedrock.acreate(aws_client_config), model
-            )
+            from aidial_adapter_bedrock.llm.model.ai21 import AI21Adapter
+
+            return AI21Adapter.create(await get_client(), model)
         case (
             ChatCompletionDeployment.STABILITY_STABLE_DIFFUSION_XL
             | ChatCompletionDeployment.STABILITY_STABLE_DIFFUSION_XL_V1
         ):
-            return StabilityAdapter.create(
-                await Bedrock.acreate(aws_client_config), model, api_key
+            from aidial_adapter_bedrock.llm.model.stability import (
+                StabilityAdapter,
             )
+
+            return StabilityAdapter.create(await get_client(), model, api_key)
         case ChatCompletionDeployment.AMAZON_TITAN_TG1_LARGE:
-            return AmazonAdapter.create(
-                await Bedrock.acreate(aws_client_config), model
-            )
+            from aidial_adapter_bedrock.llm.model.amazon import AmazonAdapter
+
+            return AmazonAdapter.create(await get_client(), model)
         case (
             ChatCompletionDeployment.META_LLAMA2_13B_CHAT_V1
             | ChatCompletionDeployment.META_LLAMA2_70B_CHAT_V1
         ):
-            return MetaAdapter.create(
-                await Bedrock.acreate(aws_client_config), model, llama2_config
-            )
+            from aidial_adapter_bedrock.llm.model.llama.v2 import llama2_config
+            from aidial_adapter_bedrock.llm.model.meta import MetaAdapter
+
+            return MetaAdapter.create(await get_client(), model, llama2_config)
         case (
             ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1
             | ChatCompletionDeployment.META_LLAMA3_70B_INSTRUCT_V1
@@ -97,8 +168,11 @@ async def get_bedrock_adapter(
             | ChatCompletionDeployment.META_LLAMA3_1_70B_INSTRUCT_V1
             | ChatCompletionDeployment.META_LLAMA3_1_8B_INSTRUCT_V1
         ):
+            from aidial_adapter_bedrock.llm.model.llama.v3 import llama3_config
+            from aidial_adapter_bedrock.llm.model.meta import MetaAdapter
+
             return MetaAdapter.create(
-                await Bedrock.acreate(aws_client_config),
+                await get_client(),
                 model,
                 llama3_config,
             )
@@ -106,35 +180,93 @@ async def get_bedrock_adapter(
             ChatCompletionDeployment.COHERE_COMMAND_TEXT_V14
             | ChatCompletionDeployment.COHERE_COMMAND_LIGHT_TEXT_V14
         ):
-            return CohereAdapter.create(
-                await Bedrock.acreate(aws_client_config), model
-            )
+            from aidial_adapter_bedrock.llm.model.cohere import CohereAdapter
+
+            return CohereAdapter.create(await get_client(), model)
         case _:
-            assert_never(deployment)
+            # Claude 3 deployments are created above
+            raise ValueError(
+                f"Unsupported deployment: {deployment.deployment_id}"
+            )
 
 
 async def get_embeddings_model(
     deployment: EmbeddingsDeployment,
     api_key: str,
     aws_client_config: AWSClientConfig,
-) -> EmbeddingsAdapter:
+) -> "EmbeddingsAdapter":
+    return await _embeddings_adapters.get(
+        _get_adapter_cache_key(deployment, api_key, aws_client_config),
+        lambda: _create_embeddings_model(
+            deployment, api_key, aws_client_config
+        ),
+    )
+
+
+async def _create_embeddings_model(
+    deployment: EmbeddingsDeployment,
+    api_key: str,
+    aws_client_config: AWSClientConfig,
+) -> "EmbeddingsAdapter":
+    from aidial_adapter_bedrock.bedrock import Bedrock
+    from aidial_adapter_bedrock.deployment_config import get_deployment_config
+
     model = deployment.model_id
-    client = await Bedrock.acreate(aws_client_config)
+    client = await Bedrock.acreate(aws_client_config, deployment.deployment_id)
+    conf = get_deployment_config(deployment.deployment_id)
+    cache = conf.embeddings_cache
     match deployment:
         case EmbeddingsDeployment.AMAZON_TITAN_EMBED_TEXT_V1:
+            from aidial_adapter_bedrock.embedding.amazon.titan_text import (
+                AmazonTitanTextEmbeddings,
+            )
+
             return AmazonTitanTextEmbeddings.create(
-                client, model, supports_dimensions=False
+                client,
+                model,
+                supports_dimensions=False,
+                cache=cache,
+                concurrency=conf.embeddings_concurrency,
             )
         case EmbeddingsDeployment.AMAZON_TITAN_EMBED_TEXT_V2:
+            from aidial_adapter_bedrock.embedding.amazon.titan_text import (
+                AmazonTitanTextEmbeddings,
+            )
+
             return AmazonTitanTextEmbeddings.create(
-                client, model, supports_dimensions=True
+                client,
+                model,
+                supports_dimensions=True,
+                cache=cache,
+                concurrency=conf.embeddings_concurrency,
             )
         case EmbeddingsDeployment.AMAZON_TITAN_EMBED_IMAGE_V1:
-            return AmazonTitanImageEmbeddings.create(client, model, api_key)
+            from aidial_adapter_bedrock.embedding.amazon.titan_image import (
+                AmazonTitanImageEmbeddings,
+            )
+
+            return AmazonTitanImageEmbeddings.create(
+                client,
+                model,
+                api_key,
+                cache=cache,
+                concurrency=conf.embeddings_concurrency,
+            )
         case (
             EmbeddingsDeployment.COHERE_EMBED_ENGLISH_V3
             | EmbeddingsDeployment.COHERE_EMBED_MULTILINGUAL_V3
         ):
-            return CohereTextEmbeddings.create(client, model)
+            from aidial_adapter_bedrock.embedding.batching import get_batch_size
+            from aidial_adapter_bedrock.embedding.cohere.embed_text import (
+                CohereTextEmbeddings,
+            )
+
+            return CohereTextEmbeddings.create(
+                client,
+                model,
+                cache=cache,
+                concurrency=conf.embeddings_concurrency,
+                batch_size=get_batch_size(deployment.deployment_id),
+            )
         case _:
             assert_never(deployment)
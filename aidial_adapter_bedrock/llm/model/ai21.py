@@ -124,7 +124,7 @@ class AI21Adapter(PseudoChatModel):
     ):
         args = create_request(prompt, convert_params(params))
         response, _headers = await self.client.ainvoke_non_streaming(
-            self.model, args
+            self.model, args, params.latency_class
         )
 
         resp = AI21Response.parse_obj(response)
@@ -75,18 +75,21 @@ def create_request(prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
 
 
 async def chunks_to_stream(
-    chunks: AsyncIterator[dict], usage: TokenUsage
+    batches: AsyncIterator[List[dict]], usage: TokenUsage
 ) -> AsyncIterator[str]:
-    async for chunk in chunks:
-        input_tokens = chunk.get("inputTextTokenCount")
-        if input_tokens is not None:
-            usage.prompt_tokens = input_tokens
+    async for chunks in batches:
+        content = ""
+        for chunk in chunks:
+            input_tokens = chunk.get("inputTextTokenCount")
+            if input_tokens is not None:
+                usage.prompt_tokens = input_tokens
 
-        output_tokens = chunk.get("totalOutputTextTokenCount")
-        if output_tokens is not None:
-            usage.completion_tokens = output_tokens
+            output_tokens = chunk.get("totalOutputTextTokenCount")
+            if output_tokens is not None:
+                usage.completion_tokens = output_tokens
 
-        yield chunk["outputText"]
+            content += chunk["outputText"]
+        yield content
 
 
 async def response_to_stream(
@@ -137,11 +140,11 @@ class AmazonAdapter(PseudoChatModel):
         usage = TokenUsage()
 
         if params.stream:
-            chunks = self.client.ainvoke_streaming(self.model, args)
+            chunks = self.client.ainvoke_streaming_batches(self.model, args)
             stream = chunks_to_stream(chunks, usage)
         else:
             response, _headers = await self.client.ainvoke_non_streaming(
-                self.model, args
+                self.model, args, params.latency_class
             )
             stream = response_to_stream(response, usage)
 
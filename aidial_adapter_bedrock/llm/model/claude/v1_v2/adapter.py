@@ -1,4 +1,4 @@
-from typing import Any, AsyncIterator, Dict
+from typing import Any, AsyncIterator, Dict, List
 
 import anthropic
 from anthropic._tokenizers import async_get_tokenizer
@@ -57,10 +57,10 @@ def create_request(prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
 
 
 async def chunks_to_stream(
-    chunks: AsyncIterator[dict],
+    batches: AsyncIterator[List[dict]],
 ) -> AsyncIterator[str]:
-    async for chunk in chunks:
-        yield chunk["completion"]
+    async for chunks in batches:
+        yield "".join(chunk["completion"] for chunk in chunks)
 
 
 async def response_to_stream(response: dict) -> AsyncIterator[str]:
@@ -127,11 +127,11 @@ class Adapter(PseudoChatModel):
         args = create_request(prompt, convert_params(params))
 
         if params.stream:
-            chunks = self.client.ainvoke_streaming(self.model, args)
+            chunks = self.client.ainvoke_streaming_batches(self.model, args)
             stream = chunks_to_stream(chunks)
         else:
             response, _headers = await self.client.ainvoke_non_streaming(
-                self.model, args
+                self.model, args, params.latency_class
             )
             stream = response_to_stream(response)
 
@@ -1,15 +1,20 @@
+import asyncio
 from dataclasses import dataclass
 from logging import DEBUG
-from typing import List, Optional, Tuple, assert_never
+from typing import AsyncIterator, List, Optional, Tuple, assert_never
 
+import httpx
 from aidial_sdk.chat_completion import Message as DialMessage
-from anthropic import NOT_GIVEN, MessageStopEvent, NotGiven
-from anthropic.lib.bedrock import AsyncAnthropicBedrock
-from anthropic.lib.streaming import (
-    AsyncMessageStream,
-    InputJsonEvent,
-    TextEvent,
+from anthropic import (
+    NOT_GIVEN,
+    DefaultAsyncHttpxClient,
+    MessageStopEvent,
+    NotGiven,
 )
+from anthropic.lib.bedrock import AsyncAnthropicBedrock
+from anthropic.lib.streaming import AsyncMessageStream, InputJsonEvent
+from anthropic.lib.streaming import MessageStreamEvent as ClaudeStreamEvent
+from anthropic.lib.streaming import TextEvent
 from anthropic.types import (
     ContentBlockDeltaEvent,
     ContentBlockStartEvent,
@@ -26,6 +31,11 @@ from anthropic.types import (
 from anthropic.types.message_create_params import ToolChoice
 
 from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.bedrock import BEDROCK_CLIENT_POOL_SIZE
+from aidial_adapter_bedrock.deployment_config import (
+    AnthropicClientConfig,
+    get_deployment_config,
+)
 from aidial_adapter_bedrock.deployments import Claude3Deployment
 from aidial_adapter_bedrock.dial_api.request import (
     ModelParameters as DialParameters,
@@ -35,6 +45,7 @@ from aidial_adapter_bedrock.dial_api.storage import (
     create_file_storage,
 )
 from aidial_adapter_bedrock.dial_api.token_usage import TokenUsage
+from aidial_adapter_bedrock.hedging import get_hedging_policy
 from aidial_adapter_bedrock.llm.chat_model import (
     ChatCompletionAdapter,
     keep_last,
@@ -64,9 +75,70 @@ from aidial_adapter_bedrock.llm.truncate_prompt import (
     DiscardedMessages,
     truncate_prompt,
 )
+from aidial_adapter_bedrock.retry import get_retry_policy
+from aidial_adapter_bedrock.utils.client_pool import ClientPool
 from aidial_adapter_bedrock.utils.json import json_dumps_short
 from aidial_adapter_bedrock.utils.log_config import bedrock_logger as log
 
+# The clients are reused across requests in order to reuse
+# the connections kept in their httpx connection pools.
+_client_pool: ClientPool[AsyncAnthropicBedrock] = ClientPool(
+    "anthropic_client_pool",
+    BEDROCK_CLIENT_POOL_SIZE,
+    close=lambda client: client.close(),
+)
+
+
+def _create_client(
+    aws_client_config: AWSClientConfig, conf: AnthropicClientConfig
+) -> AsyncAnthropicBedrock:
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=conf.max_connections,
+            max_keepalive_connections=conf.max_keepalive_connections,
+            keepalive_expiry=conf.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(conf.read_timeout, connect=conf.connect_timeout),
+    )
+
+    return AsyncAnthropicBedrock(
+        **aws_client_config.get_anthropic_bedrock_client_kwargs(),
+        max_retries=conf.max_retries,
+        http_client=http_client,
+    )
+
+
+async def get_anthropic_client(
+    deployment: Claude3Deployment, aws_client_config: AWSClientConfig
+) -> AsyncAnthropicBedrock:
+    conf = get_deployment_config(deployment.deployment_id).anthropic_client
+
+    async def _create() -> AsyncAnthropicBedrock:
+        return _create_client(aws_client_config, conf)
+
+    key = f"{aws_client_config.get_cache_key()}/{conf.json()}"
+    return await _client_pool.get(key, _create)
+
+
+async def warm_up_connections(connections: int) -> None:
+    """
+    Opens the given number of keep-alive connections
+    for each of the pooled clients.
+    """
+
+    async def _ping(client: AsyncAnthropicBedrock) -> None:
+        await client._client.get(str(client.base_url))
+
+    pings = [
+        _ping(client)
+        for _ in range(connections)
+        for client in _client_pool.clients()
+    ]
+
+    for result in await asyncio.gather(*pings, return_exceptions=True):
+        if isinstance(result, Exception):
+            log.warning(f"failed to open a connection to Bedrock: {result}")
+
 
 class UsageEventHandler(AsyncMessageStream):
     prompt_tokens: int = 0
@@ -190,6 +262,7 @@ class Adapter(ChatCompletionAdapter):
                 params.tools_mode,
                 request,
                 discarded_messages,
+                params.latency_class,
             )
 
     async def count_prompt_tokens(
@@ -212,6 +285,17 @@ class Adapter(ChatCompletionAdapter):
         )
         return discarded_messages
 
+    async def _stream_events(
+        self, request: ClaudeRequest
+    ) -> AsyncIterator[ClaudeStreamEvent]:
+        async with self.client.messages.stream(
+            messages=request.messages,
+            model=self.deployment.model_id,
+            **request.params,
+        ) as stream:
+            async for event in stream:
+                yield event
+
     async def invoke_streaming(
         self,
         consumer: Consumer,
@@ -229,53 +313,48 @@ class Adapter(ChatCompletionAdapter):
             )
             log.debug(f"Streaming request: {msg}")
 
-        async with self.client.messages.stream(
-            messages=request.messages,
-            model=self.deployment.model_id,
-            **request.params,
-        ) as stream:
-            prompt_tokens = 0
-            completion_tokens = 0
-            stop_reason = None
-            async for event in stream:
-                match event:
-                    case MessageStartEvent():
-                        prompt_tokens += event.message.usage.input_tokens
-                    case TextEvent():
-                        consumer.append_content(event.text)
-                    case MessageDeltaEvent():
-                        completion_tokens += event.usage.output_tokens
-                    case ContentBlockStopEvent():
-                        if isinstance(event.content_block, ToolUseBlock):
-                            process_tools_block(
-                                consumer, event.content_block, tools_mode
-                            )
-                    case MessageStopEvent():
-                        completion_tokens += event.message.usage.output_tokens
-                        stop_reason = event.message.stop_reason
-                    case (
-                        InputJsonEvent()
-                        | ContentBlockStartEvent()
-                        | ContentBlockDeltaEvent()
-                    ):
-                        pass
-                    case _:
-                        raise ValueError(
-                            f"Unsupported event type! {type(event)}"
+        retry_policy = get_retry_policy(self.deployment.deployment_id)
+
+        prompt_tokens = 0
+        completion_tokens = 0
+        stop_reason = None
+        async for event in retry_policy.stream(
+            lambda: self._stream_events(request)
+        ):
+            match event:
+                case MessageStartEvent():
+                    prompt_tokens += event.message.usage.input_tokens
+                case TextEvent():
+                    consumer.append_content(event.text)
+                case MessageDeltaEvent():
+                    completion_tokens += event.usage.output_tokens
+                case ContentBlockStopEvent():
+                    if isinstance(event.content_block, ToolUseBlock):
+                        process_tools_block(
+                            consumer, event.content_block, tools_mode
                         )
+                case MessageStopEvent():
+                    completion_tokens += event.message.usage.output_tokens
+                    stop_reason = event.message.stop_reason
+                case (
+                    InputJsonEvent()
+                    | ContentBlockStartEvent()
+                    | ContentBlockDeltaEvent()
+                ):
+                    pass
+                case _:
+                    raise ValueError(f"Unsupported event type! {type(event)}")
+
+        consumer.close_content(to_dial_finish_reason(stop_reason, tools_mode))
 
-            consumer.close_content(
-                to_dial_finish_reason(stop_reason, tools_mode)
-            )
-
-            consumer.add_usage(
-                TokenUsage(
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                )
+        consumer.add_usage(
+            TokenUsage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
             )
+        )
 
-            consumer.set_discarded_messages(discarded_messages)
+        consumer.set_discarded_messages(discarded_messages)
 
     async def invoke_non_streaming(
         self,
@@ -283,6 +362,7 @@ class Adapter(ChatCompletionAdapter):
         tools_mode: ToolsMode | None,
         request: ClaudeRequest,
         discarded_messages: DiscardedMessages | None,
+        latency_class: str,
     ):
 
         if log.isEnabledFor(DEBUG):
@@ -294,11 +374,18 @@ class Adapter(ChatCompletionAdapter):
             )
             log.debug(f"Request: {msg}")
 
-        message = await self.client.messages.create(
-            messages=request.messages,
-            model=self.deployment.model_id,
-            **request.params,
-            stream=False,
+        retry_policy = get_retry_policy(self.deployment.deployment_id)
+        hedging_policy = get_hedging_policy(self.deployment.deployment_id)
+        message = await retry_policy.call(
+            lambda: hedging_policy.call(
+                lambda: self.client.messages.create(
+                    messages=request.messages,
+                    model=self.deployment.model_id,
+                    **request.params,
+                    stream=False,
+                ),
+                latency_class=latency_class,
+            )
         )
         for content in message.content:
             if isinstance(content, TextBlock):
@@ -321,16 +408,15 @@ class Adapter(ChatCompletionAdapter):
         consumer.set_discarded_messages(discarded_messages)
 
     @classmethod
-    def create(
+    async def create(
         cls,
         deployment: Claude3Deployment,
         api_key: str,
         aws_client_config: AWSClientConfig,
     ):
         storage: Optional[FileStorage] = create_file_storage(api_key=api_key)
-        client_kwargs = aws_client_config.get_anthropic_bedrock_client_kwargs()
         return cls(
             deployment=deployment,
             storage=storage,
-            client=AsyncAnthropicBedrock(**client_kwargs),
+            client=await get_anthropic_client(deployment, aws_client_config),
         )
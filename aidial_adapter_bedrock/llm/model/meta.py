@@ -58,12 +58,15 @@ def create_request(prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
 
 
 async def chunks_to_stream(
-    chunks: AsyncIterator[dict], usage: TokenUsage
+    batches: AsyncIterator[List[dict]], usage: TokenUsage
 ) -> AsyncIterator[str]:
-    async for chunk in chunks:
-        resp = MetaResponse.parse_obj(chunk)
-        usage.accumulate(resp.usage_by_metrics())
-        yield resp.content()
+    async for chunks in batches:
+        content = ""
+        for chunk in chunks:
+            resp = MetaResponse.parse_obj(chunk)
+            usage.accumulate(resp.usage_by_metrics())
+            content += resp.content()
+        yield content
 
 
 async def response_to_stream(
@@ -109,11 +112,11 @@ class MetaAdapter(PseudoChatModel):
         usage = TokenUsage()
 
         if params.stream:
-            chunks = self.client.ainvoke_streaming(self.model, args)
+            chunks = self.client.ainvoke_streaming_batches(self.model, args)
             stream = chunks_to_stream(chunks, usage)
         else:
             response, _headers = await self.client.ainvoke_non_streaming(
-                self.model, args
+                self.model, args, params.latency_class
             )
             stream = response_to_stream(response, usage)
 
@@ -131,7 +131,7 @@ class StabilityAdapter(TextCompletionAdapter):
     ):
         args = create_request(prompt)
         response, _headers = await self.client.ainvoke_non_streaming(
-            self.model, args
+            self.model, args, params.latency_class
         )
 
         resp = StabilityResponse.parse_obj(response)
@@ -0,0 +1,183 @@
+"""
+Local rate limits mirroring Bedrock quotas.
+
+Bedrock enforces requests-per-minute and tokens-per-minute quotas
+per model, region and AWS account. The adapter keeps a token bucket
+for each configured quota, so that the requests exceeding the quota
+wait for it to replenish or are rejected early, instead of making
+a round trip to Bedrock to be throttled.
+
+The tokens of a request are charged up front by the estimated number
+of prompt tokens. Once the request is completed, the difference
+between the actual token usage and the estimate is charged.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from aidial_sdk.exceptions import HTTPException as DialException
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.deployment_config import (
+    RateLimitConfig,
+    get_deployment_config,
+)
+from aidial_adapter_bedrock.utils.client_pool import ClientPool
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+
+RATE_LIMITERS_SIZE = int(os.getenv("RATE_LIMITERS_SIZE", "1024"))
+
+
+class RateLimitExceeded(DialException):
+    def __init__(self, message: str):
+        super().__init__(
+            message=message, status_code=429, type="rate_limit_exceeded"
+        )
+
+
+class TokenBucket:
+    rate: float
+    """Tokens per second"""
+
+    capacity: float
+    tokens: float
+    """Negative when the tokens are borrowed from the future"""
+
+    updated_at: float
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def get_wait_time(self, amount: float) -> float:
+        """Seconds until the given amount of tokens is available"""
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Takes the tokens, gives them back when the amount is negative"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    config: RateLimitConfig
+    requests: Optional[TokenBucket]
+    tokens: Optional[TokenBucket]
+
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self.requests = (
+            None
+            if config.requests_per_minute is None
+            else TokenBucket(config.requests_per_minute)
+        )
+        self.tokens = (
+            None
+            if config.tokens_per_minute is None
+            else TokenBucket(config.tokens_per_minute)
+        )
+
+    def _get_wait_time(self, tokens: int) -> float:
+        wait_time = 0.0
+        if self.requests is not None:
+            wait_time = max(wait_time, self.requests.get_wait_time(1))
+        if self.tokens is not None:
+            wait_time = max(wait_time, self.tokens.get_wait_time(tokens))
+        return wait_time
+
+    def _take(self, requests: int, tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.take(requests)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Reserves a request and the given number of tokens
+        and waits until the reservation is due.
+        """
+        wait_time = self._get_wait_time(tokens)
+        if wait_time > self.config.max_wait:
+            raise RateLimitExceeded(
+                f"The rate limit is exceeded, retry in {wait_time:.1f} seconds"
+            )
+
+        # The reservation is made before the waiting,
+        # so that the concurrent requests queue up behind it
+        self._take(1, tokens)
+        if wait_time > 0:
+            log.debug(f"waiting {wait_time:.3f} seconds for the rate limit")
+            try:
+                await asyncio.sleep(wait_time)
+            except asyncio.CancelledError:
+                self._take(-1, -tokens)
+                raise
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        if self.tokens is not None:
+            self.tokens.take(actual_tokens - estimated_tokens)
+
+
+class RateLimitReservation:
+    limiter: Optional[RateLimiter]
+    estimated_tokens: int
+
+    def __init__(self, limiter: Optional[RateLimiter], estimated_tokens: int):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+
+    def reconcile(self, actual_tokens: int) -> None:
+        """Charges the difference between the actual and estimated tokens"""
+        if self.limiter is not None:
+            self.limiter.reconcile(self.estimated_tokens, actual_tokens)
+
+
+_limiters: ClientPool[RateLimiter] = ClientPool(
+    name="rate_limiters", max_size=RATE_LIMITERS_SIZE
+)
+
+
+@asynccontextmanager
+async def limit_rate(
+    deployment_id: str,
+    model_id: str,
+    aws_client_config: AWSClientConfig,
+    estimate_tokens: Callable[[], Awaitable[int]] | None = None,
+) -> AsyncIterator[RateLimitReservation]:
+    """
+    Reserves the quota of the model in the region for the account.
+    No-op when the rate limits aren't configured for the deployment.
+    """
+    config = get_deployment_config(deployment_id).rate_limit
+    if config.requests_per_minute is None and config.tokens_per_minute is None:
+        yield RateLimitReservation(None, 0)
+        return
+
+    async def _create() -> RateLimiter:
+        return RateLimiter(config)
+
+    key = "/".join(
+        [model_id, aws_client_config.region]
+        + [aws_client_config.get_account_digest(), config.json()]
+    )
+    limiter = await _limiters.get(key, _create)
+
+    estimated_tokens = 0
+    if config.tokens_per_minute is not None and estimate_tokens is not None:
+        estimated_tokens = await estimate_tokens()
+
+    await limiter.acquire(estimated_tokens)
+    yield RateLimitReservation(limiter, estimated_tokens)
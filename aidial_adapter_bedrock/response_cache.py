@@ -0,0 +1,97 @@
+"""
+Cache of the responses to the deterministic chat completion requests.
+
+The responses to the requests with zero temperature (e.g. RAG grading
+or classification) are cached by the canonical request digest.
+A cached response is the recording of the calls made to the consumer:
+the content, tool calls, attachments and token usage. It's replayed
+to the consumer of the identical request, so the client receives it
+as a regular response (streamed or not).
+
+The responses of the deployments which upload the generated images
+to the caller's bucket contain the URLs private to the caller,
+so they are cached per API key.
+
+The cache could be bypassed per request by the `Cache-Control` header:
+`no-cache` skips the lookup, `no-store` skips the lookup and the storing.
+"""
+
+import os
+from typing import Awaitable, Callable, Mapping, Optional
+
+from aidial_adapter_bedrock.deployment_config import ResponseCacheConfig
+from aidial_adapter_bedrock.llm.consumer import Consumer
+from aidial_adapter_bedrock.llm.consumer_recording import (
+    ConsumerRecording,
+    RecordingConsumer,
+)
+from aidial_adapter_bedrock.utils.lru_cache import LRUCache
+from aidial_adapter_bedrock.utils.metrics import observe_cache_stats
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+
+_cache: LRUCache[str, ConsumerRecording] = LRUCache(RESPONSE_CACHE_SIZE)
+observe_cache_stats("response_cache", _cache.stats)
+
+
+class CachePolicy:
+    lookup: bool
+    store: bool
+    ttl: float
+
+    def __init__(self, lookup: bool, store: bool, ttl: float):
+        self.lookup = lookup
+        self.store = store
+        self.ttl = ttl
+
+    @classmethod
+    def create(
+        cls, config: ResponseCacheConfig, headers: Mapping[str, str]
+    ) -> Optional["CachePolicy"]:
+        if not config.enabled:
+            return None
+
+        cache_control = next(
+            (v for k, v in headers.items() if k.lower() == "cache-control"),
+            "",
+        )
+        directives = {d.strip().lower() for d in cache_control.split(",")}
+
+        store = "no-store" not in directives
+        lookup = store and "no-cache" not in directives
+        return cls(lookup=lookup, store=store, ttl=config.ttl)
+
+
+def get_cached_response(
+    key: Optional[str], policy: Optional[CachePolicy]
+) -> Optional[ConsumerRecording]:
+    """The cached response to replay to the consumer if any"""
+    if key is None or policy is None or not policy.lookup:
+        return None
+    return _cache.get(key)
+
+
+async def cache_response(
+    key: Optional[str],
+    policy: Optional[CachePolicy],
+    consumer: Consumer,
+    generate: Callable[[Consumer], Awaitable[None]],
+) -> None:
+    """
+    Generates the response to the consumer and caches it.
+    The cache isn't looked up: it's done once by `get_cached_response`
+    before the response is generated, so a miss is counted once.
+    No caching is done when the key or policy is None.
+    """
+    if key is None or policy is None or not policy.store:
+        await generate(consumer)
+        return
+
+    recording = ConsumerRecording()
+    await generate(RecordingConsumer(consumer, recording))
+    recording.finish()
+    _cache.put(key, recording, ttl=policy.ttl)
+
+
+def clear_response_cache() -> None:
+    _cache.clear()
@@ -0,0 +1,161 @@
+"""
+Retries of the failed calls to Bedrock.
+
+The calls failed due to throttling, model timeouts, server or network errors
+are retried with exponential backoff and decorrelated jitter:
+
+    delay = min(max_delay, random(base_delay, 3 * previous delay))
+
+so that the retries of the concurrent requests don't arrive in waves.
+
+The retries are capped by the retry budget of the deployment:
+a token bucket which gains `budget_ratio` tokens per call and loses
+a token per retry. Thus the retries can't multiply the load on
+a degraded upstream by more than `1 + budget_ratio` times.
+
+A streaming call is retried only until its first chunk is received,
+since the chunks received after that may already be sent to the client.
+"""
+
+import asyncio
+import random
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from aidial_sdk.exceptions import HTTPException as DialException
+
+from aidial_adapter_bedrock.deployment_config import (
+    RetryConfig,
+    get_deployment_config,
+)
+from aidial_adapter_bedrock.server.exceptions import is_upstream_failure
+from aidial_adapter_bedrock.utils.log_config import bedrock_logger as log
+from aidial_adapter_bedrock.utils.metrics import observe_counter
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class RetryStats:
+    retries: int = 0
+    budget_exhausted: int = 0
+
+
+retry_stats = RetryStats()
+
+observe_counter("retry.retries", lambda: retry_stats.retries)
+observe_counter("retry.budget_exhausted", lambda: retry_stats.budget_exhausted)
+
+
+class RetryBudget:
+    tokens: float
+    ratio: float
+    capacity: float
+
+    def __init__(self, ratio: float, capacity: float):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+
+    def deposit(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+def is_retriable(e: Exception) -> bool:
+    # The errors raised by the adapter itself aren't retried
+    return not isinstance(e, DialException) and is_upstream_failure(e)
+
+
+class RetryPolicy:
+    config: RetryConfig
+    budget: RetryBudget
+    rng: random.Random
+
+    def __init__(
+        self, config: RetryConfig, rng: Optional[random.Random] = None
+    ):
+        self.config = config
+        self.budget = RetryBudget(config.budget_ratio, config.budget_capacity)
+        self.rng = rng or random.Random()
+
+    @property
+    def max_attempts(self) -> int:
+        return self.config.max_attempts if self.config.enabled else 1
+
+    def _next_delay(self, delay: float) -> float:
+        return min(
+            self.config.max_delay,
+            self.rng.uniform(self.config.base_delay, delay * 3),
+        )
+
+    async def _backoff(self, e: Exception, attempt: int, delay: float) -> float:
+        """
+        Sleeps before the next attempt and returns the delay.
+        Re-raises the exception when the call can't be retried.
+        """
+        if attempt >= self.max_attempts or not is_retriable(e):
+            raise e
+
+        if not self.budget.withdraw():
+            retry_stats.budget_exhausted += 1
+            log.warning(f"retry budget is exhausted: {e}")
+            raise e
+
+        retry_stats.retries += 1
+        delay = self._next_delay(delay)
+        log.warning(
+            f"attempt {attempt} failed, retrying in {delay:.2f} seconds: {e}"
+        )
+        await asyncio.sleep(delay)
+        return delay
+
+    async def call(self, func: Callable[[], Awaitable[_T]]) -> _T:
+        self.budget.deposit()
+        attempt, delay = 1, self.config.base_delay
+        while True:
+            try:
+                return await func()
+            except Exception as e:
+                delay = await self._backoff(e, attempt, delay)
+                attempt += 1
+
+    async def stream(
+        self, func: Callable[[], AsyncIterator[_T]]
+    ) -> AsyncIterator[_T]:
+        self.budget.deposit()
+        attempt, delay = 1, self.config.base_delay
+        while True:
+            stream = func()
+            try:
+                first = await stream.__anext__()
+                break
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                await _aclose(stream)
+                delay = await self._backoff(e, attempt, delay)
+                attempt += 1
+
+        try:
+            yield first
+            async for item in stream:
+                yield item
+        finally:
+            await _aclose(stream)
+
+
+async def _aclose(stream: AsyncIterator) -> None:
+    if (aclose := getattr(stream, "aclose", None)) is not None:
+        await aclose()
+
+
+@lru_cache(maxsize=None)
+def get_retry_policy(deployment_id: str) -> RetryPolicy:
+    return RetryPolicy(get_deployment_config(deployment_id).retry)
@@ -0,0 +1,167 @@
+"""
+Latency-aware routing of the requests to a deployment across regions.
+
+A deployment with the `routing` setting (see `RoutingConfig`) is served
+by a weighted set of targets: regions and the deployments called in them,
+e.g. the regional model and its cross-region inference profiles.
+
+The router keeps the moving averages of the latency and error rate
+of each target and sends the request to the target with the lowest cost,
+thus the load drifts away from a degraded or throttled region
+and returns back once the region recovers.
+
+The statistics are kept per worker process.
+"""
+
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional
+
+from aidial_adapter_bedrock.deployment_config import (
+    RoutingConfig,
+    RoutingTarget,
+    get_deployment_config,
+)
+from aidial_adapter_bedrock.server.exceptions import is_upstream_failure
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+
+# Minimal weight of a new sample in the moving averages,
+# so that the samples recorded at the same time aren't ignored
+_MIN_SAMPLE_WEIGHT = 0.1
+
+
+class TargetStats:
+    latency: Optional[float]
+    """Moving average of the latency in seconds"""
+
+    error_rate: float
+    inflight: int
+    updated_at: Optional[float]
+
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.inflight = 0
+        self.updated_at = None
+
+    def _decay(self, now: float, decay_time: float) -> float:
+        """Weight of the previous average"""
+        if self.updated_at is None:
+            return 0.0
+        return math.exp(-max(0.0, now - self.updated_at) / decay_time)
+
+    def record(
+        self, now: float, latency: float, failed: bool, decay_time: float
+    ) -> None:
+        decay = min(self._decay(now, decay_time), 1 - _MIN_SAMPLE_WEIGHT)
+        self.latency = (
+            latency
+            if self.latency is None
+            else decay * self.latency + (1 - decay) * latency
+        )
+        self.error_rate = decay * self.error_rate + (1 - decay) * float(failed)
+        self.updated_at = now
+
+    def current_error_rate(self, now: float, decay_time: float) -> float:
+        """The error rate decays while the target doesn't receive requests"""
+        return self.error_rate * self._decay(now, decay_time)
+
+
+class Router:
+    config: RoutingConfig
+    stats: List[TargetStats]
+
+    def __init__(self, config: RoutingConfig):
+        if not config.targets:
+            raise ValueError("The routing requires at least one target")
+
+        self.config = config
+        self.stats = [TargetStats() for _ in config.targets]
+
+    def _max_latency(self) -> float:
+        return max(
+            (s.latency for s in self.stats if s.latency is not None),
+            default=0.0,
+        )
+
+    def _cost(self, index: int, now: float, default_latency: float) -> float:
+        stats = self.stats[index]
+        latency = default_latency if stats.latency is None else stats.latency
+        error_rate = stats.current_error_rate(now, self.config.decay_time)
+        return (
+            latency
+            * (stats.inflight + 1)
+            * (1 + self.config.error_penalty * error_rate)
+            / self.config.targets[index].weight
+        )
+
+    def _choose(self) -> int:
+        indices = range(len(self.config.targets))
+        weights = [target.weight for target in self.config.targets]
+
+        if random.random() < self.config.exploration:
+            return random.choices(indices, weights)[0]
+
+        now = time.monotonic()
+        # Targets without statistics are assumed to be as slow as
+        # the slowest known target, so they are tried out,
+        # but not in preference to the healthy ones.
+        default_latency = self._max_latency()
+        costs = [self._cost(i, now, default_latency) for i in indices]
+
+        min_cost = min(costs)
+        best = [i for i in indices if costs[i] == min_cost]
+        return random.choices(best, [weights[i] for i in best])[0]
+
+    def _record(self, index: int, start: float, failed: bool) -> None:
+        now = time.monotonic()
+        latency = now - start
+        if failed:
+            # Fast failures (e.g. throttling) must not make
+            # the target look faster than the healthy ones
+            latency = max(latency, self._max_latency())
+
+        self.stats[index].record(now, latency, failed, self.config.decay_time)
+
+    @asynccontextmanager
+    async def route(self) -> AsyncIterator[RoutingTarget]:
+        index = self._choose()
+        target = self.config.targets[index]
+        log.debug(f"routing to {target.json()}")
+
+        stats = self.stats[index]
+        stats.inflight += 1
+        start = time.monotonic()
+        try:
+            yield target
+        except Exception as e:
+            if is_upstream_failure(e):
+                self._record(index, start, failed=True)
+            raise
+        else:
+            self._record(index, start, failed=False)
+        finally:
+            stats.inflight -= 1
+
+
+@lru_cache(maxsize=None)
+def get_router(deployment_id: str) -> Router | None:
+    config = get_deployment_config(deployment_id).routing
+    return None if config is None else Router(config)
+
+
+@asynccontextmanager
+async def route(deployment_id: str) -> AsyncIterator[RoutingTarget | None]:
+    """
+    Yields the target of the request to the deployment
+    or None if the routing isn't configured for the deployment.
+    """
+    router = get_router(deployment_id)
+    if router is None:
+        yield None
+    else:
+        async with router.route() as target:
+            yield target
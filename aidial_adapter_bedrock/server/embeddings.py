@@ -0,0 +1,80 @@
+"""
+Embeddings endpoint with the fast serialization of the response.
+
+The endpoint of `DIALApp.add_embeddings` converts the response to a dict
+and serializes it with the standard JSON encoder, which dominates
+the CPU time of the responses with thousands of vectors.
+This endpoint writes the response body directly and compresses it
+with gzip when the body is large and the client accepts it.
+"""
+
+import gzip
+import os
+from typing import Optional
+
+from aidial_sdk import DIALApp
+from aidial_sdk.embeddings import Embeddings
+from aidial_sdk.embeddings.request import Request as EmbeddingsRequest
+from aidial_sdk.utils.logging import set_log_deployment
+from fastapi import Request
+from fastapi.responses import Response
+
+from aidial_adapter_bedrock.dial_api.response import (
+    serialize_embeddings_response,
+)
+
+
+def _get_gzip_min_size() -> Optional[int]:
+    value = os.getenv("EMBEDDINGS_GZIP_MIN_SIZE")
+    return None if value is None else int(value)
+
+
+EMBEDDINGS_GZIP_MIN_SIZE = _get_gzip_min_size()
+EMBEDDINGS_GZIP_LEVEL = int(os.getenv("EMBEDDINGS_GZIP_LEVEL", "1"))
+
+
+def _accepts_gzip(request: Request) -> bool:
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    return "gzip" in accept_encoding.lower()
+
+
+def create_response(
+    body: bytes, request: Request, gzip_min_size: Optional[int]
+) -> Response:
+    if (
+        gzip_min_size is not None
+        and len(body) >= gzip_min_size
+        and _accepts_gzip(request)
+    ):
+        return Response(
+            content=gzip.compress(body, compresslevel=EMBEDDINGS_GZIP_LEVEL),
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+
+    return Response(content=body, media_type="application/json")
+
+
+def add_embeddings(app: DIALApp, deployment_id: str, impl: Embeddings) -> None:
+    """
+    The replacement of `DIALApp.add_embeddings`
+    with the fast serialization of the response.
+    """
+
+    async def _handler(original_request: Request) -> Response:
+        set_log_deployment(deployment_id)
+        request = await EmbeddingsRequest.from_request(
+            original_request, deployment_id
+        )
+        response = await impl.embeddings(request)
+        return create_response(
+            serialize_embeddings_response(response),
+            original_request,
+            EMBEDDINGS_GZIP_MIN_SIZE,
+        )
+
+    app.add_api_route(
+        f"/openai/deployments/{deployment_id}/embeddings",
+        _handler,
+        methods=["POST"],
+    )
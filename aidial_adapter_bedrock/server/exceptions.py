@@ -17,14 +17,14 @@ to access `response` field of a ClientError instance:
 https://boto3.amazonaws.com/v1/documentation/api/latest/guide/error-handling.html#parsing-error-responses-and-catching-exceptions-from-aws-services
 """
 
+import asyncio
 import json
+import sys
 from enum import Enum
 from functools import wraps
 
 from aidial_sdk.exceptions import HTTPException as DialException
 from aidial_sdk.exceptions import InternalServerError, InvalidRequestError
-from anthropic import APIStatusError
-from botocore.exceptions import ClientError
 
 from aidial_adapter_bedrock.llm.errors import UserError, ValidationError
 from aidial_adapter_bedrock.utils.log_config import app_logger as log
@@ -82,9 +82,69 @@ def _get_content_filter_error(response: dict) -> DialException | None:
     return None
 
 
+def _is_instance(e: Exception, module: str, cls: str) -> bool:
+    """
+    Checks the type of the exception without importing the module
+    of the exception class: the exception couldn't have been raised
+    if the module wasn't imported yet.
+    """
+    return (mod := sys.modules.get(module)) is not None and isinstance(
+        e, getattr(mod, cls)
+    )
+
+
+def get_upstream_status_code(e: Exception) -> int | None:
+    """
+    HTTP status code of the error response of Bedrock
+    or None if the exception isn't an error response.
+    """
+    if _is_instance(e, "botocore.exceptions", "ClientError") and isinstance(
+        response := getattr(e, "response", None), dict
+    ):
+        return _get_response_error_code(response) or _get_meta_status_code(
+            response
+        )
+
+    if _is_instance(e, "anthropic", "APIStatusError"):
+        return e.status_code  # type: ignore
+
+    return None
+
+
+def is_throttling(e: Exception) -> bool:
+    return get_upstream_status_code(e) == 429
+
+
+_NETWORK_ERRORS = [
+    ("botocore.exceptions", "ConnectionError"),
+    ("botocore.exceptions", "HTTPClientError"),
+    ("anthropic", "APIConnectionError"),
+    ("aiohttp", "ClientConnectionError"),
+]
+
+
+def is_upstream_failure(e: Exception) -> bool:
+    """
+    Whether the exception signals a degradation of the upstream
+    (throttling, timeouts, server or network errors)
+    as opposed to an invalid request.
+    """
+    if (code := get_upstream_status_code(e)) is not None:
+        return code in (408, 429) or code >= 500
+
+    # Rejected by the rate limits of the adapter itself
+    if isinstance(e, DialException) and e.status_code == 429:
+        return True
+
+    if isinstance(e, asyncio.TimeoutError):
+        return True
+
+    return any(_is_instance(e, module, cls) for module, cls in _NETWORK_ERRORS)
+
+
 def to_dial_exception(e: Exception) -> DialException:
     if (
-        isinstance(e, ClientError)
+        _is_instance(e, "botocore.exceptions", "ClientError")
         and hasattr(e, "response")
         and isinstance(e.response, dict)
     ):
@@ -104,8 +164,8 @@ def to_dial_exception(e: Exception) -> DialException:
 
         return create_error(status_code, str(e))
 
-    if isinstance(e, APIStatusError):
-        return create_error(e.status_code, e.message)
+    if _is_instance(e, "anthropic", "APIStatusError"):
+        return create_error(e.status_code, e.message)  # type: ignore
 
     if isinstance(e, ValidationError):
         return e.to_dial_exception()
@@ -0,0 +1,252 @@
+"""
+Production entry point of the adapter server:
+
+    python -m aidial_adapter_bedrock.server.runtime
+
+Unlike `uvicorn --workers`, which spawns the workers from scratch,
+the app is imported once in the master process and the workers are forked
+from it, so the imported modules are shared between the workers.
+
+The garbage collector is disabled while the app is imported and the objects
+created by the import are frozen before the fork.
+Otherwise, the collections in the workers would write to the headers of
+these objects and the copy-on-write would duplicate the shared memory pages.
+
+The workers are restarted when they exit unexpectedly.
+The restarts are delayed with exponential backoff, and the server stops
+when the workers exit too often, so that a worker which keeps crashing
+is restarted by the orchestrator instead of looping forever.
+SIGTERM and SIGINT gracefully stop the workers and then the master.
+
+The telemetry is initialized in each worker after the fork
+(see `server/telemetry.py`).
+"""
+
+import gc
+import os
+import signal
+import socket
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+import uvicorn
+from uvicorn.importer import import_from_string
+from uvicorn.main import STARTUP_FAILURE
+
+from aidial_adapter_bedrock.server.telemetry import (
+    defer_telemetry,
+    init_worker_telemetry,
+)
+from aidial_adapter_bedrock.utils.env import get_env_bool
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+
+APP = "aidial_adapter_bedrock.app:app"
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "5000"))
+
+# Same env variable as the one read by uvicorn
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# "auto" picks uvloop and httptools when they are installed
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")
+
+# Maximum number of concurrent connections and requests per worker.
+# The worker responds with 503 to the requests above the limit.
+_limit_concurrency = os.getenv("SERVER_LIMIT_CONCURRENCY")
+SERVER_LIMIT_CONCURRENCY = (
+    int(_limit_concurrency) if _limit_concurrency else None
+)
+
+# Length of the queue of the connections which aren't accepted yet.
+# Capped by the net.core.somaxconn kernel setting.
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "4096"))
+
+SERVER_TIMEOUT_KEEP_ALIVE = int(os.getenv("SERVER_TIMEOUT_KEEP_ALIVE", "5"))
+
+SERVER_GC_FREEZE = get_env_bool("SERVER_GC_FREEZE", True)
+
+# The server stops when the workers exit unexpectedly
+# more than SERVER_RESTART_LIMIT times within SERVER_RESTART_PERIOD seconds
+SERVER_RESTART_LIMIT = int(os.getenv("SERVER_RESTART_LIMIT", "10"))
+SERVER_RESTART_PERIOD = float(os.getenv("SERVER_RESTART_PERIOD", "60"))
+
+# Period of checking the workers' status in seconds
+_WORKERS_CHECK_PERIOD = 0.5
+
+# Bounds of the delay of a worker restart in seconds
+_RESTART_MIN_DELAY = 0.5
+_RESTART_MAX_DELAY = 30.0
+
+
+def create_config() -> uvicorn.Config:
+    return uvicorn.Config(
+        APP,
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        loop=SERVER_LOOP,  # type: ignore
+        http=SERVER_HTTP,  # type: ignore
+        lifespan="on",
+        limit_concurrency=SERVER_LIMIT_CONCURRENCY,
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=SERVER_TIMEOUT_KEEP_ALIVE,
+    )
+
+
+def _run_worker(
+    config: uvicorn.Config, sock: socket.socket, index: int = 0
+) -> int:
+    server = uvicorn.Server(config)
+    try:
+        init_worker_telemetry(import_from_string(APP), index)
+        server.run(sockets=[sock])
+        return 0 if server.started else STARTUP_FAILURE
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        log.exception("worker failed")
+        return 1
+
+
+class Supervisor:
+    config: uvicorn.Config
+    sock: socket.socket
+    workers: int
+
+    _pids: Dict[int, int]
+    """Worker index by pid"""
+
+    _exits: Deque[float]
+    """Times of the unexpected exits of the workers"""
+
+    _next_spawn: float
+    _should_exit: threading.Event
+    _exit_code: int
+
+    def __init__(
+        self, config: uvicorn.Config, sock: socket.socket, workers: int
+    ):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+
+        self._pids = {}
+        self._exits = deque()
+        self._next_spawn = 0.0
+        self._should_exit = threading.Event()
+        self._exit_code = 0
+
+    def _spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, signal.SIG_DFL)
+            gc.enable()
+            os._exit(_run_worker(self.config, self.sock, index))
+
+        log.info(f"started worker {pid}")
+        self._pids[pid] = index
+
+    def _spawn_missing(self) -> None:
+        if time.monotonic() < self._next_spawn:
+            return
+        indices = set(self._pids.values())
+        for index in range(self.workers):
+            if index not in indices:
+                self._spawn(index)
+
+    def _on_unexpected_exit(self, pid: int, code: int) -> None:
+        now = time.monotonic()
+        self._exits.append(now)
+        while self._exits[0] <= now - SERVER_RESTART_PERIOD:
+            self._exits.popleft()
+
+        if len(self._exits) > SERVER_RESTART_LIMIT:
+            log.error(
+                f"worker {pid} exited with code {code}, "
+                f"the workers exited {len(self._exits)} times "
+                f"in {SERVER_RESTART_PERIOD} seconds, stopping the server"
+            )
+            self._exit_code = 1
+            self._should_exit.set()
+            return
+
+        delay = min(
+            _RESTART_MAX_DELAY,
+            _RESTART_MIN_DELAY * 2 ** (len(self._exits) - 1),
+        )
+        self._next_spawn = max(self._next_spawn, now + delay)
+        log.warning(
+            f"worker {pid} exited with code {code}, "
+            f"restarting in {delay:.1f} seconds"
+        )
+
+    def _handle_exit(self, sig: int, frame) -> None:
+        self._should_exit.set()
+
+    def _reap(self) -> None:
+        while self._pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+
+            self._pids.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if self._should_exit.is_set():
+                continue
+
+            if code == STARTUP_FAILURE:
+                log.error(f"worker {pid} failed to start")
+                self._exit_code = code
+                self._should_exit.set()
+            else:
+                self._on_unexpected_exit(pid, code)
+
+    def run(self) -> int:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_exit)
+
+        while not self._should_exit.is_set():
+            self._spawn_missing()
+            self._should_exit.wait(_WORKERS_CHECK_PERIOD)
+            self._reap()
+
+        for pid in self._pids:
+            os.kill(pid, signal.SIGTERM)
+        for pid in list(self._pids):
+            os.waitpid(pid, 0)
+            log.info(f"stopped worker {pid}")
+        self._pids.clear()
+
+        return self._exit_code
+
+
+def main() -> int:
+    if SERVER_GC_FREEZE:
+        gc.disable()
+
+    if WEB_CONCURRENCY > 1:
+        defer_telemetry()
+
+    config = create_config()
+    config.load()
+    sock = config.bind_socket()
+
+    if SERVER_GC_FREEZE:
+        gc.freeze()
+
+    if WEB_CONCURRENCY == 1:
+        gc.enable()
+        return _run_worker(config, sock)
+
+    try:
+        return Supervisor(config, sock, WEB_CONCURRENCY).run()
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+"""
+Telemetry of the adapter server.
+
+DIAL SDK initializes the telemetry when the app is created.
+The production server creates the app in the master process and forks
+the workers from it, while the Prometheus exporter serves the metrics from
+a thread which doesn't survive the fork.
+
+So when the workers are forked, the initialization is deferred until
+a worker is started, and each worker exports its metrics to Prometheus
+on its own port: `OTEL_EXPORTER_PROMETHEUS_PORT` + the worker index.
+"""
+
+from typing import Optional
+
+from aidial_sdk import DIALApp
+from aidial_sdk.telemetry.types import TelemetryConfig
+
+from aidial_adapter_bedrock.utils.log_config import configure_loggers
+
+_deferred = False
+
+
+def defer_telemetry() -> None:
+    """Must be called before the app is created"""
+    global _deferred
+    _deferred = True
+
+
+def get_telemetry_config() -> Optional[TelemetryConfig]:
+    return None if _deferred else TelemetryConfig()
+
+
+def init_worker_telemetry(app: DIALApp, worker_index: int) -> None:
+    """Must be called before the worker starts serving the app"""
+    if not _deferred:
+        return
+
+    config = TelemetryConfig()
+    if config.metrics is not None:
+        config.metrics.port += worker_index
+
+    app.configure_telemetry(config)
+
+    # The telemetry may have configured the root logger on its own
+    configure_loggers()
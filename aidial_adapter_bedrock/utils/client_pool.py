@@ -0,0 +1,94 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+from aidial_adapter_bedrock.utils.lru_cache import CacheStats, LRUCache
+from aidial_adapter_bedrock.utils.metrics import observe_cache_stats
+
+T = TypeVar("T")
+
+_pools: List["ClientPool"] = []
+
+
+class ClientPool(Generic[T]):
+    """
+    Process-wide LRU pool of API clients.
+
+    Concurrent requests for a missing key share a single client creation.
+
+    The evicted clients aren't closed explicitly, since they may still
+    be used by in-flight requests. They are released once garbage collected.
+    The clients remaining in the pool are closed on the server shutdown.
+    """
+
+    name: str
+    _clients: LRUCache[str, T]
+    _pending: Dict[str, "asyncio.Future[T]"]
+    _close: Optional[Callable[[T], Awaitable[None]]]
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        close: Optional[Callable[[T], Awaitable[None]]] = None,
+    ):
+        self.name = name
+        self._clients = LRUCache(max_size)
+        self._pending = {}
+        self._close = close
+        observe_cache_stats(name, self._clients.stats)
+        _pools.append(self)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._clients.stats
+
+    async def get(self, key: str, create: Callable[[], Awaitable[T]]) -> T:
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        future = self._pending.get(key)
+        if future is None:
+            future = self._pending[key] = asyncio.ensure_future(create())
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        client = await asyncio.shield(future)
+        self._clients.put(key, client)
+        return client
+
+    def clients(self) -> List[T]:
+        return self._clients.values()
+
+    def clear(self) -> None:
+        self._clients.clear()
+        self._pending.clear()
+
+    async def aclose(self) -> None:
+        clients = self._clients.values()
+        self._clients.clear()
+
+        if self._close is None:
+            return
+
+        for client in clients:
+            try:
+                await self._close(client)
+            except Exception:
+                log.exception(f"failed to close a client of {self.name}")
+
+
+async def close_client_pools() -> None:
+    for pool in _pools:
+        await pool.aclose()
+
+
+def _clear_client_pools() -> None:
+    # The connections of the clients must not be shared
+    # between the parent and the forked processes
+    for pool in _pools:
+        pool.clear()
+
+
+os.register_at_fork(after_in_child=_clear_client_pools)
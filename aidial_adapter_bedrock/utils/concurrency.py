@@ -1,34 +1,242 @@
 import asyncio
+import os
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from typing import (
+    Any,
     AsyncIterator,
+    Awaitable,
     Callable,
     Iterator,
+    List,
     Optional,
     Tuple,
     TypeVar,
     cast,
 )
 
+from aidial_adapter_bedrock.utils.metrics import observe_gauge
+
 T = TypeVar("T")
 
+# Blocking calls (e.g. non-streaming boto3 requests) may occupy a thread
+# for the whole duration of the model invocation, so the pool is large.
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "256"))
+
+# Maximum number of items read ahead of a slow consumer of a stream
+STREAM_READ_AHEAD = int(os.getenv("STREAM_READ_AHEAD", "64"))
+
+
+class BlockingCallExecutor:
+    """
+    Process-wide thread pool which runs blocking calls
+    on behalf of the event loop.
+    """
+
+    max_workers: int
+    _executor: Optional[ThreadPoolExecutor]
+    _active: int
+    _lock: threading.Lock
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = None
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """
+        Forgets the threads of the pool.
+        The forked process doesn't inherit the threads of its parent,
+        so it must start the threads of its own.
+        """
+        self._executor = None
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily, so that no threads are started at import time
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="blocking-call",
+            )
+        return self._executor
+
+    @property
+    def active(self) -> int:
+        """Number of calls being executed"""
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a free thread"""
+        if self._executor is None:
+            return 0
+        return self._executor._work_queue.qsize()
+
+    @property
+    def saturation(self) -> float:
+        return self._active / self.max_workers
+
+    def _track(self, func: Callable[[], T]) -> Callable[[], T]:
+        def _func() -> T:
+            with self._lock:
+                self._active += 1
+            try:
+                return func()
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+        return _func
+
+    async def run(self, func: Callable[[], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), self._track(func)
+        )
+
+
+blocking_call_executor = BlockingCallExecutor(THREAD_POOL_SIZE)
+os.register_at_fork(after_in_child=blocking_call_executor.reset)
+
+observe_gauge(
+    "blocking_call_executor.active",
+    lambda: blocking_call_executor.active,
+)
+observe_gauge(
+    "blocking_call_executor.queue_depth",
+    lambda: blocking_call_executor.queue_depth,
+)
+observe_gauge(
+    "blocking_call_executor.saturation",
+    lambda: blocking_call_executor.saturation,
+)
+
 
 async def make_async(func: Callable[[], T]) -> T:
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(executor, func)
+    return await blocking_call_executor.run(func)
 
 
-async def to_async_iterator(iter: Iterator[T]) -> AsyncIterator[T]:
-    def _next() -> Tuple[bool, Optional[T]]:
-        try:
-            return False, next(iter)
-        except StopIteration:
-            return True, None
-
-    while True:
-        is_end, item = await make_async(lambda: _next())
-        if is_end:
-            break
+async def gather_bounded(
+    funcs: List[Callable[[], Awaitable[T]]],
+    limit: int,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> List[T]:
+    """
+    Makes the calls concurrently, no more than `limit` at a time
+    and no more than the shared `semaphore` allows,
+    and returns the results in the order of the calls.
+
+    Once a call fails, the calls in progress are cancelled,
+    the remaining ones aren't made and the error is raised.
+    """
+
+    if not funcs:
+        return []
+
+    results: List[Optional[T]] = [None] * len(funcs)
+    indices = iter(range(len(funcs)))
+
+    async def _call(index: int) -> None:
+        if semaphore is None:
+            results[index] = await funcs[index]()
         else:
-            yield cast(T, item)
+            async with semaphore:
+                results[index] = await funcs[index]()
+
+    async def _worker() -> None:
+        for index in indices:
+            await _call(index)
+
+    workers = [
+        asyncio.create_task(_worker())
+        for _ in range(min(max(limit, 1), len(funcs)))
+    ]
+    try:
+        done, _pending = await asyncio.wait(
+            workers, return_when=asyncio.FIRST_EXCEPTION
+        )
+        for worker in done:
+            if (error := worker.exception()) is not None:
+                raise error
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return cast(List[T], results)
+
+
+_END = object()
+
+
+async def to_async_batches(
+    iter: Iterator[T],
+    *,
+    close: Optional[Callable[[], Any]] = None,
+    read_ahead: int = STREAM_READ_AHEAD,
+) -> AsyncIterator[List[T]]:
+    """
+    Drains the blocking iterator in a dedicated reader thread.
+
+    The thread reads no more than `read_ahead` items which weren't yet
+    consumed, so a slow consumer slows down the reading.
+    All the items available at the moment are yielded in a single batch.
+
+    `close` is called when the consumer stops before the iterator is
+    exhausted in order to interrupt the reader thread blocked on reading.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Tuple[Any, Optional[BaseException]]] = asyncio.Queue()
+    slots = threading.Semaphore(read_ahead)
+    stopped = threading.Event()
+
+    def _put(item: Any, error: Optional[BaseException] = None) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # The event loop is closed
+            stopped.set()
+
+    def _read() -> None:
+        try:
+            for item in iter:
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                _put(item)
+            _put(_END)
+        except BaseException as e:
+            _put(_END, None if stopped.is_set() else e)
+
+    threading.Thread(target=_read, name="stream-reader", daemon=True).start()
+
+    is_end = False
+    try:
+        while not is_end:
+            batch: List[T] = []
+            entry = await queue.get()
+            while True:
+                item, error = entry
+                if item is _END:
+                    is_end = True
+                    break
+                batch.append(cast(T, item))
+                slots.release()
+                if queue.empty():
+                    break
+                entry = queue.get_nowait()
+            if batch:
+                yield batch
+            if error is not None:
+                raise error
+    finally:
+        if not is_end:
+            stopped.set()
+            # Waking up the reader waiting for a free slot
+            slots.release()
+            if close is not None:
+                close()
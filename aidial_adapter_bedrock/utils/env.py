@@ -1,5 +1,5 @@
 import os
-from typing import Optional
+from typing import List, Optional
 
 from aidial_adapter_bedrock.utils.log_config import app_logger as log
 
@@ -13,6 +13,20 @@ def get_env(name: str, err_msg: Optional[str] = None) -> str:
     raise Exception(err_msg or f"{name} env variable is not set")
 
 
+def get_env_bool(name: str, default: bool = False) -> bool:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_env_list(name: str, default: List[str]) -> List[str]:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return [item.strip() for item in val.split(",") if item.strip()]
+
+
 def get_aws_default_region() -> str:
     region = os.getenv("DEFAULT_REGION")
     if region is not None:
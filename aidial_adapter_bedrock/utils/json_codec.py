@@ -0,0 +1,110 @@
+"""
+JSON codec of the payloads exchanged with Bedrock and DIAL.
+
+The bodies of the requests to Bedrock may contain megabytes of base64 images
+and the streaming responses are parsed chunk by chunk,
+so the codec works with bytes: the payloads are serialized directly to UTF-8
+and parsed without decoding them to str first.
+
+Both codecs serialize numpy arrays as lists, so the matrices of the embeddings
+are serialized directly from their buffers by orjson.
+
+The codec is chosen by JSON_CODEC env variable:
+"auto" picks orjson, which is a dependency of the adapter,
+and falls back to the standard library when orjson isn't installed
+(e.g. when the package is installed without the locked dependencies).
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+
+
+class JSONCodec(ABC):
+    name: str
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes: ...
+
+    @abstractmethod
+    def loads(self, data: bytes | str) -> Any: ...
+
+
+def _array_to_list(obj: Any) -> Any:
+    # numpy is imported by the models on their first use
+    import numpy as np
+
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == np.float32:
+            # The shortest representation of the float32 values as orjson
+            # writes them, e.g. 0.1 rather than 0.10000000149011612
+            return obj.astype(str).astype(np.float64).tolist()
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class StdlibJSONCodec(JSONCodec):
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        # ASCII-only output is valid UTF-8 whatever the strings contain
+        return json.dumps(
+            obj, separators=(",", ":"), default=_array_to_list
+        ).encode()
+
+    def loads(self, data: bytes | str) -> Any:
+        # Faster than the detection of the encoding by json.loads
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    _fallback: JSONCodec = StdlibJSONCodec()
+
+    def __init__(self):
+        if orjson is None:
+            raise ValueError(
+                "orjson JSON codec requires orjson package to be installed"
+            )
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_SERIALIZE_NUMPY  # type: ignore
+            )
+        except TypeError:
+            # orjson is stricter than the standard library:
+            # it rejects e.g. lone surrogates and non-string keys
+            return self._fallback.dumps(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)  # type: ignore
+
+
+def get_json_codec(name: str) -> JSONCodec:
+    match name:
+        case "auto":
+            return OrjsonCodec() if orjson is not None else StdlibJSONCodec()
+        case "orjson":
+            return OrjsonCodec()
+        case "json":
+            return StdlibJSONCodec()
+        case _:
+            raise ValueError(
+                f"Unknown JSON codec: {name!r}. "
+                "Expected 'auto', 'orjson' or 'json'."
+            )
+
+
+json_codec: JSONCodec = get_json_codec(JSON_CODEC)
@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class LRUCache(Generic[K, V]):
+    """
+    A size-bounded mapping which evicts the least recently used entry
+    once the number of entries exceeds `max_size`.
+    An entry put with `ttl` expires in the given number of seconds.
+    """
+
+    max_size: int
+    stats: CacheStats
+    _entries: OrderedDict[K, Tuple[V, Optional[float]]]
+    """Values with their expiration time"""
+
+    def __init__(self, max_size: int):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+
+        self.max_size = max_size
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        if key not in self._entries:
+            self.stats.misses += 1
+            return None
+
+        value, expires_at = self._entries[key]
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V, ttl: Optional[float] = None) -> List[V]:
+        """
+        Returns the list of evicted values.
+        """
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        evicted: List[V] = []
+        while len(self._entries) > self.max_size:
+            _key, (old_value, _expires_at) = self._entries.popitem(last=False)
+            evicted.append(old_value)
+            self.stats.evictions += 1
+
+        return evicted
+
+    def values(self) -> List[V]:
+        return [value for value, _expires_at in self._entries.values()]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        if key not in self._entries:
+            return False
+        _value, expires_at = self._entries[key]
+        return expires_at is None or expires_at > time.monotonic()
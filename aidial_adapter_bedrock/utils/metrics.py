@@ -0,0 +1,64 @@
+"""
+Adapter metrics.
+
+The instruments are created via the global OpenTelemetry meter provider,
+which is configured by the DIAL SDK telemetry (see `OTEL_METRICS_EXPORTER`).
+When the metrics export isn't configured, the instruments are no-op.
+"""
+
+from typing import Callable, Dict, Iterable, Tuple
+
+from opentelemetry.metrics import CallbackOptions, Observation, get_meter
+
+from aidial_adapter_bedrock.utils.lru_cache import CacheStats
+
+meter = get_meter("aidial_adapter_bedrock")
+
+
+def _callback(
+    get_value: Callable[[], int | float]
+) -> Callable[[CallbackOptions], Iterable[Observation]]:
+    def callback(_options: CallbackOptions) -> Iterable[Observation]:
+        return [Observation(get_value())]
+
+    return callback
+
+
+def observe_counter(
+    name: str, get_value: Callable[[], int | float], description: str = ""
+) -> None:
+    meter.create_observable_counter(
+        name, callbacks=[_callback(get_value)], description=description
+    )
+
+
+def observe_gauge(
+    name: str, get_value: Callable[[], int | float], description: str = ""
+) -> None:
+    meter.create_observable_gauge(
+        name, callbacks=[_callback(get_value)], description=description
+    )
+
+
+def observe_gauges(
+    name: str,
+    get_values: Callable[[], Iterable[Tuple[int | float, Dict[str, str]]]],
+    description: str = "",
+) -> None:
+    """
+    Gauge with a value per set of attributes, e.g. per model and region
+    """
+
+    def callback(_options: CallbackOptions) -> Iterable[Observation]:
+        return [Observation(value, attrs) for value, attrs in get_values()]
+
+    meter.create_observable_gauge(
+        name, callbacks=[callback], description=description
+    )
+
+
+def observe_cache_stats(name: str, stats: CacheStats) -> None:
+    observe_counter(f"{name}.hits", lambda: stats.hits)
+    observe_counter(f"{name}.misses", lambda: stats.misses)
+    observe_counter(f"{name}.evictions", lambda: stats.evictions)
+    observe_counter(f"{name}.expirations", lambda: stats.expirations)
@@ -0,0 +1,128 @@
+"""
+Optional warm-up of the adapter at the server startup.
+
+The first requests after a deploy pay for loading the tokenizers,
+creation of the boto3 clients (which loads the service models)
+and TLS handshakes with Bedrock and DIAL.
+The connections to Bedrock are opened by the clients of the native transport
+and the Anthropic clients, since boto3 doesn't provide a public API for it.
+The warm-up does all of it before the server starts accepting requests.
+"""
+
+import asyncio
+import os
+import time
+from fnmatch import fnmatchcase
+from typing import List
+
+import aidial_adapter_bedrock.dial_api.storage as storage
+from aidial_adapter_bedrock.aws_client_config import (
+    AWSClientConfig,
+    AWSClientConfigFactory,
+    UpstreamConfig,
+)
+from aidial_adapter_bedrock.deployments import (
+    ChatCompletionDeployment,
+    EmbeddingsDeployment,
+)
+from aidial_adapter_bedrock.llm.model.adapter import (
+    create_clients,
+    get_bedrock_adapter,
+    get_embeddings_model,
+    is_cached_per_api_key,
+)
+from aidial_adapter_bedrock.utils.env import (
+    get_aws_default_region,
+    get_env_bool,
+    get_env_list,
+)
+from aidial_adapter_bedrock.utils.log_config import app_logger as log
+
+WARM_UP = get_env_bool("WARM_UP")
+
+# Regions for which the clients are created
+WARM_UP_REGIONS = get_env_list("WARM_UP_REGIONS", [get_aws_default_region()])
+
+# Glob patterns of the deployments for which the adapters are created
+WARM_UP_DEPLOYMENTS = get_env_list("WARM_UP_DEPLOYMENTS", ["*"])
+
+# Number of keep-alive connections opened by each client
+WARM_UP_CONNECTIONS = int(os.getenv("WARM_UP_CONNECTIONS", "2"))
+
+WARM_UP_TIMEOUT = float(os.getenv("WARM_UP_TIMEOUT", "60"))
+
+
+def _is_warmed_up(deployment_id: str) -> bool:
+    return any(
+        fnmatchcase(deployment_id, pattern) for pattern in WARM_UP_DEPLOYMENTS
+    )
+
+
+async def _create_adapter(
+    deployment: ChatCompletionDeployment | EmbeddingsDeployment,
+    aws_client_config: AWSClientConfig,
+) -> None:
+    # The adapters working with DIAL storage are cached per API key,
+    # so for them only the clients are created.
+    if is_cached_per_api_key(deployment):
+        await create_clients(deployment, aws_client_config)
+    elif isinstance(deployment, ChatCompletionDeployment):
+        await get_bedrock_adapter(deployment, "", aws_client_config)
+    else:
+        await get_embeddings_model(deployment, "", aws_client_config)
+
+
+async def _create_adapters(region: str) -> None:
+    aws_client_config = await AWSClientConfigFactory(
+        upstream_config=UpstreamConfig(region=region)
+    ).get_client_config()
+
+    deployments = [*ChatCompletionDeployment, *EmbeddingsDeployment]
+    creations = [
+        _create_adapter(deployment, aws_client_config)
+        for deployment in deployments
+        if _is_warmed_up(deployment.deployment_id)
+    ]
+
+    for result in await asyncio.gather(*creations, return_exceptions=True):
+        if isinstance(result, Exception):
+            log.warning(f"failed to create an adapter in {region}: {result}")
+
+
+async def _warm_up(regions: List[str], connections: int) -> None:
+    from anthropic._tokenizers import async_get_tokenizer
+
+    import aidial_adapter_bedrock.bedrock as bedrock
+    import aidial_adapter_bedrock.llm.model.claude.v3.adapter as claude_v3
+
+    await async_get_tokenizer()
+
+    await asyncio.gather(*(_create_adapters(region) for region in regions))
+
+    await asyncio.gather(
+        bedrock.warm_up_connections(connections),
+        claude_v3.warm_up_connections(connections),
+        storage.warm_up_connections(connections),
+    )
+
+
+async def warm_up() -> None:
+    """
+    Never fails, since the adapter is functional without the warm-up.
+    """
+    if not WARM_UP:
+        return
+
+    log.info(f"warm-up of the regions: {WARM_UP_REGIONS}")
+    start = time.perf_counter()
+
+    try:
+        await asyncio.wait_for(
+            _warm_up(WARM_UP_REGIONS, WARM_UP_CONNECTIONS), WARM_UP_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        log.warning(f"warm-up didn't finish in {WARM_UP_TIMEOUT} seconds")
+    except Exception:
+        log.exception("warm-up failed")
+
+    log.info(f"warm-up took {time.perf_counter() - start:.2f} seconds")
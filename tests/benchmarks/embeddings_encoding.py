@@ -0,0 +1,101 @@
+"""
+Compares the post-processing of the embeddings response
+which parsed and encoded the vectors one by one
+with the vectorized post-processing of the whole batch:
+
+    AWS_DEFAULT_REGION=us-east-1 python -m tests.benchmarks.embeddings_encoding --vectors 1000 10000
+
+Both start from the JSON response body parsed into Python lists
+and produce the vectors of the DIAL response.
+"""
+
+import argparse
+import time
+from typing import Callable, List, Literal
+
+import numpy as np
+from pydantic import BaseModel
+
+from aidial_adapter_bedrock.embedding.cohere.response import CohereResponse
+from aidial_adapter_bedrock.embedding.encoding import (
+    encode_vectors,
+    vector_to_base64,
+)
+
+EncodingFormat = Literal["float", "base64"]
+
+
+class LegacyResponse(BaseModel):
+    embeddings: List[List[float]]
+
+
+def legacy_process(
+    body: dict, encoding_format: EncodingFormat
+) -> List[List[float] | str]:
+    """The implementation which validated and encoded the vectors one by one"""
+    embeddings = LegacyResponse.parse_obj(body).embeddings
+    result: List[List[float] | str] = []
+    for vector in embeddings:
+        if encoding_format == "base64":
+            result.append(vector_to_base64(vector))
+        else:
+            result.append(np.array(vector, dtype="float32").tolist())
+    return result
+
+
+def vectorized_process(
+    body: dict, encoding_format: EncodingFormat
+) -> List[List[float]] | List[str]:
+    embeddings = CohereResponse.parse_obj(body).embeddings
+    return encode_vectors(list(embeddings), encoding_format)
+
+
+def _measure(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    encoding_formats: List[EncodingFormat] = ["base64", "float"]
+
+    for count in args.vectors:
+        vectors = rng.standard_normal((count, args.dimensions), dtype="float32")
+        body = {
+            "id": "id",
+            "response_type": "embeddings_floats",
+            "embeddings": vectors.tolist(),
+            "texts": [""] * count,
+        }
+
+        for encoding_format in encoding_formats:
+            assert legacy_process(body, encoding_format) == vectorized_process(
+                body, encoding_format
+            )
+
+            legacy = _measure(
+                lambda: legacy_process(body, encoding_format), args.repeat
+            )
+            vectorized = _measure(
+                lambda: vectorized_process(body, encoding_format), args.repeat
+            )
+            print(
+                f"{count} x {args.dimensions} {encoding_format}: "
+                f"legacy {legacy * 1000:.1f} ms, "
+                f"vectorized {vectorized * 1000:.1f} ms, "
+                f"speedup {legacy / vectorized:.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Compares the serialization of the embeddings response by the DIAL SDK
+endpoint (validated pydantic objects, `dict()` and the standard JSON encoder)
+with the fast serialization of the adapter endpoint
+from the lists of floats and from the matrix of the vectors:
+
+    AWS_DEFAULT_REGION=us-east-1 python -m tests.benchmarks.embeddings_serialization --vectors 1000 10000
+
+All start from the float32 matrix of the vectors and produce the response body.
+"""
+
+import argparse
+import gzip
+import json
+import time
+from typing import Callable, List, Literal
+
+import numpy as np
+from aidial_sdk.embeddings import Embedding
+from aidial_sdk.embeddings import Response as EmbeddingsResponse
+from aidial_sdk.embeddings import Usage
+from fastapi.responses import JSONResponse
+
+from aidial_adapter_bedrock.dial_api.response import (
+    make_embeddings_response,
+    serialize_embeddings_response,
+)
+from aidial_adapter_bedrock.embedding.encoding import encode_vectors
+from aidial_adapter_bedrock.utils.json_codec import json_codec
+
+EncodingFormat = Literal["float", "base64"]
+
+
+def _encode_lists(
+    matrix: np.ndarray, encoding_format: EncodingFormat
+) -> List[List[float]] | List[str]:
+    """The float vectors were converted to Python lists before serialization"""
+    vectors = encode_vectors(list(matrix), encoding_format)
+    return vectors.tolist() if isinstance(vectors, np.ndarray) else vectors
+
+
+def sdk_serialize(matrix: np.ndarray, encoding_format: EncodingFormat) -> bytes:
+    response = EmbeddingsResponse(
+        model="model",
+        data=[
+            Embedding(index=index, embedding=vector)
+            for index, vector in enumerate(
+                _encode_lists(matrix, encoding_format)
+            )
+        ],
+        usage=Usage(prompt_tokens=1, total_tokens=1),
+    )
+    return JSONResponse(content=response.dict()).body
+
+
+def lists_serialize(
+    matrix: np.ndarray, encoding_format: EncodingFormat
+) -> bytes:
+    response = make_embeddings_response(
+        model="model",
+        vectors=_encode_lists(matrix, encoding_format),
+        usage=Usage(prompt_tokens=1, total_tokens=1),
+    )
+    return serialize_embeddings_response(response)
+
+
+def fast_serialize(
+    matrix: np.ndarray, encoding_format: EncodingFormat
+) -> bytes:
+    response = make_embeddings_response(
+        model="model",
+        vectors=encode_vectors(list(matrix), encoding_format),
+        usage=Usage(prompt_tokens=1, total_tokens=1),
+    )
+    return serialize_embeddings_response(response)
+
+
+def _get_vectors(body: bytes) -> List[np.ndarray | str]:
+    # The floats of a float32 matrix are written in the shortest form
+    # which is parsed back to the same float32 value
+    return [
+        (
+            data["embedding"]
+            if isinstance(data["embedding"], str)
+            else np.array(data["embedding"], dtype="float32")
+        )
+        for data in json.loads(body)["data"]
+    ]
+
+
+def _measure(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _throughput(size: int, seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms ({size / seconds / 2**20:.0f} MiB/s)"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"JSON codec: {json_codec.name}")
+
+    rng = np.random.default_rng(0)
+    encoding_formats: List[EncodingFormat] = ["base64", "float"]
+
+    for count in args.vectors:
+        matrix = rng.standard_normal((count, args.dimensions), dtype="float32")
+
+        for encoding_format in encoding_formats:
+            body = fast_serialize(matrix, encoding_format)
+            for expected, actual in zip(
+                _get_vectors(sdk_serialize(matrix, encoding_format)),
+                _get_vectors(body),
+                strict=True,
+            ):
+                assert np.array_equal(expected, actual)
+
+            sdk = _measure(
+                lambda: sdk_serialize(matrix, encoding_format), args.repeat
+            )
+            lists = _measure(
+                lambda: lists_serialize(matrix, encoding_format), args.repeat
+            )
+            fast = _measure(
+                lambda: fast_serialize(matrix, encoding_format), args.repeat
+            )
+            compression = _measure(
+                lambda: gzip.compress(body, compresslevel=1), args.repeat
+            )
+            compressed = len(gzip.compress(body, compresslevel=1))
+
+            print(
+                f"{count} x {args.dimensions} {encoding_format}, "
+                f"{len(body) / 2**20:.1f} MiB: "
+                f"sdk {_throughput(len(body), sdk)}, "
+                f"lists {_throughput(len(body), lists)}, "
+                f"matrix {_throughput(len(body), fast)}, "
+                f"speedup {sdk / fast:.1f}x; "
+                f"gzip {_throughput(len(body), compression)}, "
+                f"{compressed / len(body):.0%} of the size"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Compares the throughput and streaming latency of the default server runtime
+(a single uvicorn worker with asyncio and h11) and the production runtime
+(`aidial_adapter_bedrock.server.runtime`) against the local Bedrock stand-in:
+
+    python -m tests.benchmarks.runtime --workers 4 --concurrency 200
+
+Both servers call the stand-in via the native transport,
+so the benchmark doesn't need AWS credentials.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from aidial_adapter_bedrock.deployments import ChatCompletionDeployment
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.server import wait_for_server
+
+_APP = "aidial_adapter_bedrock.app:app"
+_DEPLOYMENT = ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1.deployment_id
+
+# (time to the first chunk, total time) in seconds
+Latency = Tuple[float, float]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _run_stand_in(port: int, chunks: int, chunk_delay: float) -> None:
+    stand_in = BedrockStandIn(
+        stream_chunks=[{"generation": f"token{i} "} for i in range(chunks)],
+        chunk_delay=chunk_delay,
+    )
+    web.run_app(stand_in.create_app(), host="127.0.0.1", port=port, print=None)
+
+
+def _runtimes(workers: int) -> Dict[str, Tuple[List[str], Dict[str, str]]]:
+    return {
+        "default": (
+            [sys.executable, "-m", "uvicorn", _APP]
+            + ["--loop", "asyncio", "--http", "h11"],
+            {},
+        ),
+        "production": (
+            [sys.executable, "-m", "aidial_adapter_bedrock.server.runtime"],
+            {"WEB_CONCURRENCY": str(workers)},
+        ),
+    }
+
+
+async def _stream(session: aiohttp.ClientSession, url: str) -> Latency | None:
+    start = time.perf_counter()
+    first_chunk = None
+    async with session.post(
+        url,
+        json={"messages": [{"role": "user", "content": "Hi"}], "stream": True},
+        headers={"Api-Key": "dummy"},
+    ) as response:
+        if response.status != 200:
+            await response.read()
+            return None
+        async for _ in response.content:
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+    return first_chunk or 0.0, time.perf_counter() - start
+
+
+async def _load(
+    url: str, concurrency: int, duration: float
+) -> Tuple[List[Latency], int]:
+    latencies: List[Latency] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def user(session: aiohttp.ClientSession) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            try:
+                latency = await _stream(session, url)
+            except aiohttp.ClientError:
+                latency = None
+            if latency is None:
+                errors += 1
+            else:
+                latencies.append(latency)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(user(session) for _ in range(concurrency)))
+
+    return latencies, errors
+
+
+def _run_client(args: Tuple[str, int, float]) -> Tuple[List[Latency], int]:
+    return asyncio.run(_load(*args))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _benchmark(
+    name: str,
+    cmd: List[str],
+    env: Dict[str, str],
+    args: argparse.Namespace,
+) -> None:
+    port = _free_port()
+    server = subprocess.Popen(
+        cmd,
+        env={
+            **env,
+            "UVICORN_HOST": "127.0.0.1",
+            "UVICORN_PORT": str(port),
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(port),
+        },
+        # Access logs
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    url = f"{base_url}/openai/deployments/{_DEPLOYMENT}/chat/completions"
+
+    try:
+        wait_for_server(f"{base_url}/health", timeout=60)
+
+        # Warming up the server
+        _run_client((url, args.concurrency, 1.0))
+
+        per_client = max(1, args.concurrency // args.clients)
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.map(
+                _run_client,
+                [(url, per_client, args.duration)] * args.clients,
+            )
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+    latencies = [latency for result in results for latency in result[0]]
+    errors = sum(result[1] for result in results)
+    first_chunk = [latency[0] for latency in latencies]
+    total = [latency[1] for latency in latencies]
+
+    print(
+        f"{name:<12}"
+        f"{len(latencies) / args.duration:>10.1f} req/s"
+        f"{_percentile(first_chunk, 0.5) * 1000:>10.1f} ms"
+        f"{_percentile(first_chunk, 0.99) * 1000:>10.1f} ms"
+        f"{_percentile(total, 0.99) * 1000:>10.1f} ms"
+        f"{errors:>8}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    stand_in_port = _free_port()
+    stand_in = multiprocessing.Process(
+        target=_run_stand_in,
+        args=(stand_in_port, args.chunks, args.chunk_delay),
+        daemon=True,
+    )
+    stand_in.start()
+
+    env = {
+        **os.environ,
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "AWS_ACCESS_KEY_ID": "key_id",
+        "AWS_SECRET_ACCESS_KEY": "key",
+        "LOG_LEVEL": "WARNING",
+        "DEPLOYMENTS_CONFIG": json.dumps(
+            {
+                "*": {
+                    "transport": "native",
+                    "endpoint_url": f"http://127.0.0.1:{stand_in_port}",
+                }
+            }
+        ),
+    }
+
+    print(
+        f"{'runtime':<12}{'throughput':>16}"
+        f"{'p50 TTFB':>13}{'p99 TTFB':>13}{'p99 total':>13}{'errors':>8}"
+    )
+    try:
+        for name, (cmd, runtime_env) in _runtimes(args.workers).items():
+            _benchmark(name, cmd, {**env, **runtime_env}, args)
+    finally:
+        stand_in.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
+import asyncio
+import time
 from dataclasses import dataclass
 from unittest import mock
 
 import pytest
 
 from aidial_adapter_bedrock.aws_client_config import (
+    AssumedRoleCredentialsCache,
     AWSClientConfigFactory,
     AWSClientCredentials,
+    TemporaryCredentials,
 )
 
+_MODULE = "aidial_adapter_bedrock.aws_client_config"
+
 
 @dataclass
 class FakeRequest:
@@ -81,3 +87,66 @@ class TestAWSClientConfigFactory:
         assert client_config.credentials.aws_access_key_id == "key_id"
         assert client_config.credentials.aws_secret_access_key == "key"
         assert client_config.credentials.aws_session_token == "session_token"
+
+
+def _temporary_credentials(key_id: str, expires_in: float):
+    return TemporaryCredentials(
+        credentials=AWSClientCredentials(
+            aws_access_key_id=key_id,
+            aws_secret_access_key="key",
+            aws_session_token="session_token",
+        ),
+        expiration=time.time() + expires_in,
+    )
+
+
+@pytest.mark.asyncio
+class TestAssumedRoleCredentialsCache:
+    @staticmethod
+    def _mock_assume_role(*expires_in: float) -> mock.MagicMock:
+        def assume_role(role_arn: str, region: str, session_name: str):
+            idx = assume_role_mock.call_count - 1
+            time.sleep(0.01)
+            return _temporary_credentials(f"key_id_{idx}", expires_in[idx])
+
+        assume_role_mock = mock.MagicMock(side_effect=assume_role)
+        return assume_role_mock
+
+    async def test_concurrent_requests_share_sts_call(self):
+        cache = AssumedRoleCredentialsCache(session_name="session")
+        assume_role = self._mock_assume_role(3600)
+
+        with mock.patch(f"{_MODULE}._assume_role", assume_role):
+            credentials = await asyncio.gather(
+                *(cache.get("arn", "us-east-1") for _ in range(10))
+            )
+            credentials.append(await cache.get("arn", "us-east-1"))
+
+        assert assume_role.call_count == 1
+        assert {c.aws_access_key_id for c in credentials} == {"key_id_0"}
+
+    async def test_stale_credentials_are_refreshed_in_background(self):
+        cache = AssumedRoleCredentialsCache(session_name="session")
+        assume_role = self._mock_assume_role(120, 3600)
+
+        with mock.patch(f"{_MODULE}._assume_role", assume_role):
+            first = await cache.get("arn", "us-east-1")
+            stale = await cache.get("arn", "us-east-1")
+            await asyncio.sleep(0.05)
+            fresh = await cache.get("arn", "us-east-1")
+
+        assert assume_role.call_count == 2
+        assert first.aws_access_key_id == "key_id_0"
+        assert stale.aws_access_key_id == "key_id_0"
+        assert fresh.aws_access_key_id == "key_id_1"
+
+    async def test_expired_credentials_are_not_used(self):
+        cache = AssumedRoleCredentialsCache(session_name="session")
+        assume_role = self._mock_assume_role(10, 3600)
+
+        with mock.patch(f"{_MODULE}._assume_role", assume_role):
+            first = await cache.get("arn", "us-east-1")
+            second = await cache.get("arn", "us-east-1")
+
+        assert first.aws_access_key_id == "key_id_0"
+        assert second.aws_access_key_id == "key_id_1"
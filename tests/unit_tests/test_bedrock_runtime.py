@@ -0,0 +1,237 @@
+import datetime
+import json
+import uuid
+from unittest import mock
+
+import pytest
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials as BotocoreCredentials
+from botocore.exceptions import ClientError
+
+from aidial_adapter_bedrock.aws_client_config import (
+    AWSClientConfig,
+    AWSClientCredentials,
+)
+from aidial_adapter_bedrock.bedrock import Bedrock, NativeBedrock
+from aidial_adapter_bedrock.bedrock_runtime import sigv4
+from aidial_adapter_bedrock.bedrock_runtime.eventstream import (
+    EventStreamDecoder,
+    EventStreamError,
+)
+from aidial_adapter_bedrock.bedrock_runtime.sigv4 import (
+    Credentials,
+    SigV4Signer,
+)
+from tests.utils.bedrock_server import (
+    BedrockStandIn,
+    encode_chunk,
+    encode_message,
+)
+from tests.utils.deployments import bedrock_deployments
+
+_NOW = datetime.datetime(2024, 7, 1, 12, 30, 45)
+
+_CREDENTIALS = Credentials(
+    access_key="AKIDEXAMPLE",
+    secret_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+    token="session-token",
+)
+
+_AWS_CLIENT_CONFIG = AWSClientConfig(
+    region="us-east-1",
+    credentials=AWSClientCredentials(
+        aws_access_key_id=_CREDENTIALS.access_key,
+        aws_secret_access_key=_CREDENTIALS.secret_key,
+    ),
+)
+
+_DEPLOYMENT_ID = "test-native-deployment"
+_DEPLOYMENTS: dict = {_DEPLOYMENT_ID: {}}
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://bedrock-runtime.us-east-1.amazonaws.com/model/amazon.titan-tg1-large/invoke",
+        "https://bedrock-runtime.us-east-1.amazonaws.com/model/anthropic.claude-v2%3A1/invoke-with-response-stream",
+        "http://localhost:8080/model/meta.llama3-8b-instruct-v1%3A0/invoke?a=2&b=1",
+    ],
+)
+def test_sigv4_matches_botocore(url: str):
+    body = json.dumps({"prompt": "Hello"}).encode()
+    headers = {
+        "Content-Type": "application/json",
+        "X-Amzn-Bedrock-Accept": "application/json",
+        "User-Agent": "test",
+    }
+
+    signed = SigV4Signer("us-east-1").sign(
+        "POST",
+        url,
+        headers,
+        body,
+        _CREDENTIALS,
+        now=_NOW.replace(tzinfo=datetime.timezone.utc),
+    )
+
+    request = AWSRequest(method="POST", url=url, data=body, headers=headers)
+    auth = SigV4Auth(
+        BotocoreCredentials(
+            _CREDENTIALS.access_key, _CREDENTIALS.secret_key, _CREDENTIALS.token
+        ),
+        "bedrock",
+        "us-east-1",
+    )
+    with mock.patch("botocore.auth.datetime") as botocore_datetime:
+        botocore_datetime.datetime.utcnow.return_value = _NOW
+        auth.add_auth(request)
+
+    assert signed["Authorization"] == request.headers["Authorization"]
+    assert signed["X-Amz-Date"] == request.headers["X-Amz-Date"]
+    assert signed["X-Amz-Security-Token"] == _CREDENTIALS.token
+
+
+def test_sigv4_signing_key_is_cached():
+    sigv4._signing_key.cache_clear()
+    signer = SigV4Signer("us-east-1")
+
+    for _ in range(3):
+        signer.sign(
+            "POST", "https://host/model/m/invoke", {}, b"", _CREDENTIALS
+        )
+
+    assert sigv4._signing_key.cache_info().misses == 1
+
+
+def test_eventstream_decoder_incremental():
+    data = encode_chunk({"index": 0}) + encode_chunk({"index": 1})
+
+    decoder = EventStreamDecoder()
+    messages = []
+    for i in range(len(data)):
+        messages.extend(decoder.feed(data[i : i + 1]))
+
+    assert decoder.pending == 0
+    assert [m.headers[":event-type"] for m in messages] == ["chunk", "chunk"]
+    assert json.loads(messages[1].payload)["bytes"]
+
+
+def test_eventstream_decoder_header_types():
+    value = uuid.uuid4()
+    headers = (
+        b"\x01a\x00"
+        + b"\x01b\x01"
+        + b"\x01c\x02\xff"
+        + b"\x01d\x03\x00\x02"
+        + b"\x01e\x04\x00\x00\x00\x03"
+        + b"\x01f\x05" + (4).to_bytes(8, "big")
+        + b"\x01g\x06\x00\x02ab"
+        + b"\x01h\x07\x00\x02cd"
+        + b"\x01i\x08" + (5).to_bytes(8, "big")
+        + b"\x01j\x09" + value.bytes
+    )  # fmt: skip
+    prelude = (12 + len(headers) + 4).to_bytes(4, "big")
+    prelude += len(headers).to_bytes(4, "big")
+
+    with mock.patch(
+        "tests.utils.bedrock_server.encode_headers", return_value=headers
+    ):
+        data = encode_message({}, b"")
+    assert data.startswith(prelude)
+
+    (message,) = EventStreamDecoder().feed(data)
+    assert message.headers == {
+        "a": True,
+        "b": False,
+        "c": -1,
+        "d": 2,
+        "e": 3,
+        "f": 4,
+        "g": b"ab",
+        "h": "cd",
+        "i": 5,
+        "j": value,
+    }
+
+
+def test_eventstream_decoder_checksum_mismatch():
+    data = bytearray(encode_chunk({"index": 0}))
+    data[-1] ^= 0xFF
+
+    with pytest.raises(EventStreamError, match="checksum"):
+        EventStreamDecoder().feed(bytes(data))
+
+
+@pytest.mark.asyncio
+async def test_native_transport_non_streaming():
+    async with bedrock_deployments(_DEPLOYMENTS):
+        client = await Bedrock.acreate(_AWS_CLIENT_CONFIG, _DEPLOYMENT_ID)
+        assert isinstance(client, NativeBedrock)
+
+        body, headers = await client.ainvoke_non_streaming(
+            "anthropic.claude-v2:1", {"prompt": "Hello"}
+        )
+        await client.client.close()
+
+    assert body == {
+        "model_id": "anthropic.claude-v2:1",
+        "echo": {"prompt": "Hello"},
+    }
+    assert headers["x-amzn-bedrock-input-token-count"] == "3"
+
+
+@pytest.mark.asyncio
+async def test_native_transport_streaming():
+    chunks = [{"index": i} for i in range(100)]
+
+    async with bedrock_deployments(_DEPLOYMENTS):
+        client = await Bedrock.acreate(_AWS_CLIENT_CONFIG, _DEPLOYMENT_ID)
+        received = [
+            chunk
+            async for chunk in client.ainvoke_streaming(
+                "model", {"chunks": chunks}
+            )
+        ]
+        await client.client.close()
+
+    assert received == chunks
+
+
+@pytest.mark.asyncio
+async def test_native_transport_error_response():
+    stand_in = BedrockStandIn()
+    error = {"status": 429, "type": "ThrottlingException", "message": "Slow"}
+
+    async with bedrock_deployments(_DEPLOYMENTS, stand_in):
+        client = await Bedrock.acreate(_AWS_CLIENT_CONFIG, _DEPLOYMENT_ID)
+        with pytest.raises(ClientError) as exc_info:
+            await client.ainvoke_non_streaming("model", {"error": error})
+        await client.client.close()
+
+    response = exc_info.value.response
+    assert response["Error"] == {
+        "Code": "ThrottlingException",
+        "Message": "Slow",
+    }
+    assert response["ResponseMetadata"]["HTTPStatusCode"] == 429
+    assert len(stand_in.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_native_transport_stream_exception():
+    body = {
+        "chunks": [{"index": 0}],
+        "exception": {"type": "throttlingException", "message": "Slow"},
+    }
+
+    received = []
+    async with bedrock_deployments(_DEPLOYMENTS):
+        client = await Bedrock.acreate(_AWS_CLIENT_CONFIG, _DEPLOYMENT_ID)
+        with pytest.raises(ClientError) as exc_info:
+            async for chunk in client.ainvoke_streaming("model", body):
+                received.append(chunk)
+        await client.client.close()
+
+    assert received == [{"index": 0}]
+    assert exc_info.value.response["Error"]["Code"] == "throttlingException"
@@ -19,7 +19,11 @@ from tests.utils.messages import ai, sys, to_sdk_messages, user, user_with_image
 
 _DEPLOYMENT = ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_OPUS
 
-_MODEL = Claude_V3.create(_DEPLOYMENT, "-", AWSClientConfig(region="us-east-1"))
+
+async def get_model() -> Claude_V3:
+    return await Claude_V3.create(
+        _DEPLOYMENT, "-", AWSClientConfig(region="us-east-1")
+    )
 
 
 async def tokenize(
@@ -27,7 +31,7 @@ async def tokenize(
     tool_config: ToolsConfig | None = None,
 ) -> int:
     params = ModelParameters(tool_config=tool_config)
-    return await _MODEL.count_prompt_tokens(params, messages)
+    return await (await get_model()).count_prompt_tokens(params, messages)
 
 
 async def compute_discarded_messages(
@@ -40,7 +44,8 @@ async def compute_discarded_messages(
     )
 
     try:
-        return await _MODEL.compute_discarded_messages(params, messages) or []
+        model = await get_model()
+        return await model.compute_discarded_messages(params, messages) or []
     except DialException as e:
         return e.message
 
@@ -0,0 +1,150 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from aidial_adapter_bedrock.aws_client_config import (
+    AWSClientConfig,
+    AWSClientCredentials,
+)
+from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployments import (
+    ChatCompletionDeployment,
+    EmbeddingsDeployment,
+)
+from aidial_adapter_bedrock.dial_api.storage import get_session
+from aidial_adapter_bedrock.llm.model.adapter import (
+    get_bedrock_adapter,
+    get_embeddings_model,
+)
+from aidial_adapter_bedrock.llm.model.claude.v3.adapter import (
+    get_anthropic_client,
+)
+from aidial_adapter_bedrock.utils.client_pool import (
+    ClientPool,
+    close_client_pools,
+)
+from aidial_adapter_bedrock.utils.lru_cache import LRUCache
+
+_DEPLOYMENT_ID = ChatCompletionDeployment.AMAZON_TITAN_TG1_LARGE.deployment_id
+
+
+def test_lru_cache_eviction():
+    cache: LRUCache[str, int] = LRUCache(max_size=2)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    assert cache.put("c", 3) == [2]
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_client_pool_single_creation():
+    pool: ClientPool[object] = ClientPool("test_pool", max_size=4)
+    created = 0
+
+    async def create() -> object:
+        nonlocal created
+        created += 1
+        await asyncio.sleep(0.01)
+        return object()
+
+    clients = await asyncio.gather(*(pool.get("key", create) for _ in range(5)))
+
+    assert created == 1
+    assert all(client is clients[0] for client in clients)
+    assert await pool.get("key", create) is clients[0]
+    assert pool.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_bedrock_clients_are_shared():
+    config = AWSClientConfig(region="us-east-1")
+    other_credentials = AWSClientConfig(
+        region="us-east-1",
+        credentials=AWSClientCredentials(
+            aws_access_key_id="key_id", aws_secret_access_key="key"
+        ),
+    )
+    other_region = AWSClientConfig(region="eu-west-1")
+
+    client = (await Bedrock.acreate(config, _DEPLOYMENT_ID)).client
+
+    assert (await Bedrock.acreate(config, _DEPLOYMENT_ID)).client is client
+    assert (
+        await Bedrock.acreate(other_credentials, _DEPLOYMENT_ID)
+    ).client is not client
+    assert (
+        await Bedrock.acreate(other_region, _DEPLOYMENT_ID)
+    ).client is not client
+
+
+@pytest.mark.asyncio
+async def test_anthropic_clients_are_shared():
+    deployment = ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_HAIKU
+    config = AWSClientConfig(region="us-east-1")
+
+    client = await get_anthropic_client(deployment, config)
+
+    assert await get_anthropic_client(deployment, config) is client
+    assert (
+        await get_anthropic_client(
+            deployment, AWSClientConfig(region="eu-west-1")
+        )
+        is not client
+    )
+
+
+@pytest.mark.asyncio
+async def test_adapters_are_cached():
+    config = AWSClientConfig(region="us-east-1")
+    deployment = ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1
+
+    adapter = await get_bedrock_adapter(deployment, "key1", config)
+
+    assert await get_bedrock_adapter(deployment, "key2", config) is adapter
+    assert (
+        await get_bedrock_adapter(
+            deployment, "key1", AWSClientConfig(region="eu-west-1")
+        )
+        is not adapter
+    )
+    assert (
+        await get_bedrock_adapter(
+            ChatCompletionDeployment.META_LLAMA3_70B_INSTRUCT_V1,
+            "key1",
+            config,
+        )
+        is not adapter
+    )
+
+
+@pytest.mark.asyncio
+@mock.patch("aidial_adapter_bedrock.dial_api.storage.DIAL_URL", "http://dial")
+async def test_adapters_with_storage_are_cached_per_api_key():
+    config = AWSClientConfig(region="us-east-1")
+    deployment = EmbeddingsDeployment.AMAZON_TITAN_EMBED_IMAGE_V1
+
+    adapter = await get_embeddings_model(deployment, "key1", config)
+
+    assert await get_embeddings_model(deployment, "key1", config) is adapter
+    assert await get_embeddings_model(deployment, "key2", config) is not adapter
+
+
+@pytest.mark.asyncio
+async def test_dial_session_doesnt_keep_cookies():
+    await close_client_pools()
+    session = await get_session()
+
+    # The session is shared by the requests of different users
+    session.cookie_jar.update_cookies({"session": "user1"})
+    assert len(session.cookie_jar) == 0
+
+    await close_client_pools()
@@ -0,0 +1,234 @@
+import asyncio
+import json
+from typing import List
+from unittest import mock
+
+import pytest
+from aidial_sdk.chat_completion import Request
+from starlette.requests import Request as StarletteRequest
+
+from aidial_adapter_bedrock.coalescing import coalesce
+from aidial_adapter_bedrock.deployments import ChatCompletionDeployment
+from aidial_adapter_bedrock.dial_api.request import get_request_digest
+from aidial_adapter_bedrock.dial_api.token_usage import TokenUsage
+from aidial_adapter_bedrock.llm.consumer import Consumer
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.deployments import adapter_client, bedrock_deployments
+
+_KEY = "key"
+
+
+class Generator:
+    calls: int
+    release: asyncio.Event
+    error: BaseException | None
+
+    def __init__(self, error: BaseException | None = None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def __call__(self, consumer: Consumer) -> None:
+        self.calls += 1
+        consumer.append_content("Hello")
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        consumer.append_content(" world")
+        consumer.add_usage(TokenUsage(prompt_tokens=1, completion_tokens=2))
+        consumer.close_content()
+
+
+def create_consumer() -> mock.Mock:
+    return mock.Mock(spec=Consumer)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_the_call():
+    generate = Generator()
+    consumers = [create_consumer() for _ in range(3)]
+
+    tasks = [
+        asyncio.create_task(coalesce(_KEY, consumer, generate))
+        for consumer in consumers
+    ]
+    await asyncio.sleep(0.01)
+
+    # The content generated so far is streamed to all the consumers
+    for consumer in consumers:
+        consumer.append_content.assert_called_once_with("Hello")
+
+    generate.release.set()
+    await asyncio.gather(*tasks)
+
+    assert generate.calls == 1
+    for consumer in consumers:
+        assert consumer.mock_calls == consumers[0].mock_calls
+    assert len(consumers[0].mock_calls) == 4
+
+    # The finished call isn't shared with the subsequent requests
+    await coalesce(_KEY, create_consumer(), generate)
+    assert generate.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_without_key_arent_coalesced():
+    generate = Generator()
+    generate.release.set()
+
+    await asyncio.gather(
+        *(coalesce(None, create_consumer(), generate) for _ in range(3))
+    )
+
+    assert generate.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_error_is_shared():
+    generate = Generator(error=ValueError("failed"))
+    tasks = [
+        asyncio.create_task(coalesce(_KEY, create_consumer(), generate))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0.01)
+    generate.release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert generate.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader():
+    generate = Generator()
+    follower_consumer = create_consumer()
+
+    leader = asyncio.create_task(coalesce(_KEY, create_consumer(), generate))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(coalesce(_KEY, follower_consumer, generate))
+    await asyncio.sleep(0.01)
+
+    leader.cancel()
+    await asyncio.sleep(0.01)
+
+    # The call isn't owned by the request which started it
+    generate.release.set()
+    await follower
+
+    assert generate.calls == 1
+    assert len(follower_consumer.mock_calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_call_is_cancelled_with_the_last_request():
+    cancelled = asyncio.Event()
+
+    async def generate(consumer: Consumer) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    tasks = [
+        asyncio.create_task(coalesce(_KEY, create_consumer(), generate))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0.01)
+
+    tasks[0].cancel()
+    await asyncio.sleep(0.01)
+    assert not cancelled.is_set()
+
+    tasks[1].cancel()
+    await asyncio.sleep(0.01)
+    assert cancelled.is_set()
+
+    # The cancelled call isn't shared with the subsequent requests
+    generate_anew = Generator()
+    generate_anew.release.set()
+    await coalesce(_KEY, create_consumer(), generate_anew)
+    assert generate_anew.calls == 1
+
+
+def collect_contents(sse: str, n: int) -> List[str]:
+    contents = [""] * n
+    for line in sse.splitlines():
+        if not line.startswith("data: {"):
+            continue
+        for choice in json.loads(line[len("data: ") :])["choices"]:
+            delta = choice.get("delta", {})
+            contents[choice["index"]] += delta.get("content") or ""
+    return contents
+
+
+def create_request(**kwargs) -> Request:
+    return Request(
+        **{
+            "messages": [{"role": "user", "content": "Hi"}],
+            "temperature": 0,
+            "deployment_id": "deployment",
+            "api_key_secret": "key",
+            "headers": {},
+            "original_request": mock.Mock(spec=StarletteRequest),
+            **kwargs,
+        }
+    )
+
+
+def test_request_digest():
+    digest = get_request_digest(create_request())
+
+    assert digest == get_request_digest(
+        create_request(stream=True, n=2, user="user", api_key_secret="other")
+    )
+    assert digest != get_request_digest(create_request(max_tokens=10))
+    assert digest != get_request_digest(create_request(deployment_id="other"))
+    assert digest != get_request_digest(
+        create_request(messages=[{"role": "user", "content": "Hello"}])
+    )
+    assert digest != get_request_digest(create_request(), scope="key")
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_requests_are_coalesced():
+    deployment = ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1
+    stand_in = BedrockStandIn(
+        stream_chunks=[{"generation": "Hello"}, {"generation": " world"}],
+        chunk_delay=0.05,
+    )
+    deployments = {
+        "meta.*": {
+            "request_coalescing": True,
+            # Only the calls to the model take the quota
+            "rate_limit": {"requests_per_minute": 3, "max_wait": 0.0},
+        },
+    }
+
+    async with bedrock_deployments(deployments, stand_in):
+        async with adapter_client() as client:
+
+            async def chat(temperature: float, n: int = 1) -> List[str]:
+                response = await client.post(
+                    f"/openai/deployments/{deployment.value}/chat/completions",
+                    json={
+                        "messages": [{"role": "user", "content": "Hi"}],
+                        "temperature": temperature,
+                        "n": n,
+                        "stream": True,
+                    },
+                    headers={"Api-Key": "dummy"},
+                )
+                assert response.status_code == 200
+                return collect_contents(response.text, n)
+
+            deterministic = await asyncio.gather(chat(0), chat(0, n=2))
+            requests_made = len(stand_in.requests)
+
+            await asyncio.gather(chat(1), chat(1))
+
+    assert requests_made == 1
+    assert len(stand_in.requests) == 3
+
+    assert deterministic == [["Hello world"], ["Hello world"] * 2]
@@ -0,0 +1,257 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+from unittest import mock
+
+import pytest
+
+from aidial_adapter_bedrock.utils.concurrency import (
+    BlockingCallExecutor,
+    gather_bounded,
+    make_async,
+    to_async_batches,
+)
+
+T = TypeVar("T")
+
+_CHUNKS = 2000
+
+
+async def legacy_make_async(func: Callable[[], T]) -> T:
+    """The implementation which created a thread pool per call"""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, func)
+
+
+async def legacy_to_async_iterator(iter: Iterator[T]) -> AsyncIterator[T]:
+    sentinel = object()
+    while True:
+        item = await legacy_make_async(lambda: next(iter, sentinel))
+        if item is sentinel:
+            break
+        yield item  # type: ignore
+
+
+async def shared_to_async_iterator(iter: Iterator[T]) -> AsyncIterator[T]:
+    """The same iteration with the calls made by the shared executor"""
+    sentinel = object()
+    while True:
+        item = await make_async(lambda: next(iter, sentinel))
+        if item is sentinel:
+            break
+        yield item  # type: ignore
+
+
+async def consume(stream: AsyncIterator[int]) -> int:
+    count = 0
+    async for _ in stream:
+        count += 1
+    return count
+
+
+async def measure(
+    to_stream: Callable[[Iterator[int]], AsyncIterator[int]]
+) -> tuple[int, float]:
+    """
+    Returns the number of started threads and
+    the per-chunk overhead in microseconds.
+    """
+
+    started_threads = 0
+    original_start = threading.Thread.start
+
+    def start(thread: threading.Thread):
+        nonlocal started_threads
+        started_threads += 1
+        original_start(thread)
+
+    with mock.patch.object(threading.Thread, "start", start):
+        start_time = time.perf_counter()
+        count = await consume(to_stream(iter(range(_CHUNKS))))
+        elapsed = time.perf_counter() - start_time
+
+    assert count == _CHUNKS
+    return started_threads, elapsed / _CHUNKS * 1e6
+
+
+@pytest.mark.asyncio
+async def test_stream_thread_churn_benchmark():
+    legacy_threads, legacy_overhead = await measure(legacy_to_async_iterator)
+    threads, overhead = await measure(shared_to_async_iterator)
+
+    assert legacy_threads > _CHUNKS
+    assert threads <= 2
+    assert overhead < legacy_overhead
+
+
+@pytest.mark.asyncio
+async def test_executor_metrics():
+    executor = BlockingCallExecutor(max_workers=2)
+    release = threading.Event()
+
+    tasks = [
+        asyncio.create_task(executor.run(lambda: release.wait(5)))
+        for _ in range(5)
+    ]
+
+    for _ in range(100):
+        if executor.active == 2:
+            break
+        await asyncio.sleep(0.01)
+
+    assert executor.active == 2
+    assert executor.saturation == 1.0
+    assert executor.queue_depth == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert executor.active == 0
+    assert executor.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_make_async_propagates_exceptions():
+    def fail():
+        raise ValueError("error")
+
+    with pytest.raises(ValueError, match="error"):
+        await make_async(fail)
+
+
+@pytest.mark.asyncio
+async def test_to_async_batches_preserves_order():
+    def slow_iterator() -> Iterator[int]:
+        for i in range(100):
+            if i % 10 == 0:
+                time.sleep(0.001)
+            yield i
+
+    items: list[int] = []
+    async for batch in to_async_batches(slow_iterator(), read_ahead=8):
+        assert 0 < len(batch) <= 8
+        items.extend(batch)
+
+    assert items == list(range(100))
+
+
+@pytest.mark.asyncio
+async def test_to_async_batches_batches_queued_items():
+    batches: list[list[int]] = []
+    async for batch in to_async_batches(iter(range(10)), read_ahead=16):
+        await asyncio.sleep(0.05)
+        batches.append(batch)
+
+    assert sum(batches, []) == list(range(10))
+    assert len(batches) < 10
+
+
+@pytest.mark.asyncio
+async def test_to_async_batches_propagates_exceptions():
+    def failing_iterator() -> Iterator[int]:
+        yield 1
+        raise ValueError("error")
+
+    items: list[int] = []
+    with pytest.raises(ValueError, match="error"):
+        async for batch in to_async_batches(failing_iterator()):
+            items.extend(batch)
+
+    assert items == [1]
+
+
+@pytest.mark.asyncio
+async def test_to_async_batches_stops_reader_on_early_exit():
+    read = 0
+    closed = threading.Event()
+
+    def infinite_iterator() -> Iterator[int]:
+        nonlocal read
+        while not closed.is_set():
+            read += 1
+            yield read
+
+    stream = to_async_batches(
+        infinite_iterator(), close=closed.set, read_ahead=4
+    )
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    assert closed.is_set()
+    assert read <= 8
+
+
+class Call:
+    active: int
+    max_active: int
+    calls: int
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    async def __call__(self, value: int) -> int:
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            # The later calls finish earlier
+            await asyncio.sleep(0.01 / (abs(value) + 1))
+            if value < 0:
+                raise ValueError("failed")
+            return value
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded():
+    call = Call()
+
+    results = await gather_bounded(
+        [functools.partial(call, value) for value in range(20)], limit=4
+    )
+
+    assert results == list(range(20))
+    assert call.max_active == 4
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_with_shared_semaphore():
+    call = Call()
+    semaphore = asyncio.Semaphore(3)
+
+    await asyncio.gather(
+        *(
+            gather_bounded(
+                [functools.partial(call, value) for value in range(10)],
+                limit=2,
+                semaphore=semaphore,
+            )
+            for _ in range(3)
+        )
+    )
+
+    assert call.calls == 30
+    assert call.max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_failure():
+    call = Call()
+    values = [0, 1, -1, *range(2, 20)]
+
+    with pytest.raises(ValueError):
+        await gather_bounded(
+            [functools.partial(call, value) for value in values], limit=2
+        )
+
+    # The calls in progress are cancelled, the rest aren't made
+    assert call.active == 0
+    assert call.calls < len(values)
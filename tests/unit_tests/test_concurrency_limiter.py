@@ -0,0 +1,193 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from aidial_adapter_bedrock.aws_client_config import (
+    AWSClientConfig,
+    AWSClientCredentials,
+)
+from aidial_adapter_bedrock.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+    _limiters,
+    limit_concurrency,
+)
+from aidial_adapter_bedrock.deployment_config import (
+    ConcurrencyLimiterConfig,
+    get_deployment_config,
+)
+
+_THROTTLING = ClientError(
+    {"Error": {"Code": "ThrottlingException", "Message": "Slow down"}},
+    "InvokeModel",
+)
+
+
+def create_limiter(**kwargs) -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter(
+        ConcurrencyLimiterConfig(enabled=True, **kwargs), {}
+    )
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_additively_on_success():
+    limiter = create_limiter(initial_limit=4, increase=1.0)
+
+    for _ in range(4):
+        async with limiter.slot():
+            pass
+
+    assert 4.9 < limiter.limit < 5.0
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_limit_shrinks_multiplicatively_on_throttling():
+    limiter = create_limiter(initial_limit=10, decrease_factor=0.5)
+    started = asyncio.Event()
+
+    async def throttled_request():
+        async with limiter.slot():
+            await started.wait()
+            raise _THROTTLING
+
+    tasks = [asyncio.create_task(throttled_request()) for _ in range(3)]
+    await asyncio.sleep(0)
+    started.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, ClientError) for result in results)
+
+    # The concurrent requests decrease the limit once
+    assert limiter.limit == 5.0
+
+    with pytest.raises(ClientError):
+        async with limiter.slot():
+            raise _THROTTLING
+    assert limiter.limit == 2.5
+
+
+@pytest.mark.asyncio
+async def test_limit_is_bounded():
+    limiter = create_limiter(initial_limit=2, min_limit=1, max_limit=2)
+
+    async with limiter.slot():
+        pass
+    assert limiter.limit == 2.0
+
+    for _ in range(5):
+        with pytest.raises(ClientError):
+            async with limiter.slot():
+                raise _THROTTLING
+    assert limiter.limit == 1.0
+
+
+@pytest.mark.asyncio
+async def test_excess_requests_are_queued():
+    limiter = create_limiter(initial_limit=1, increase=0.0)
+    release = asyncio.Event()
+    order = []
+
+    async def request(i: int):
+        async with limiter.slot():
+            order.append(i)
+            await release.wait()
+
+    tasks = [asyncio.create_task(request(i)) for i in range(3)]
+    await asyncio.sleep(0.01)
+
+    assert order == [0]
+    assert limiter.inflight == 1
+    assert limiter.queue_size == 2
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert order == [0, 1, 2]
+    assert limiter.inflight == 0
+    assert limiter.queue_size == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout():
+    limiter = create_limiter(initial_limit=1, queue_timeout=0.01)
+
+    async with limiter.slot():
+        with pytest.raises(ConcurrencyLimitExceeded) as exc_info:
+            async with limiter.slot():
+                pass
+
+    assert exc_info.value.status_code == 429
+    assert limiter.inflight == 0
+    assert limiter.queue_size == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_size_limit():
+    limiter = create_limiter(initial_limit=1, max_queue_size=0)
+
+    async with limiter.slot():
+        with pytest.raises(ConcurrencyLimitExceeded):
+            async with limiter.slot():
+                pass
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_doesnt_leak_slot():
+    limiter = create_limiter(initial_limit=1)
+
+    async with limiter.slot():
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    assert limiter.inflight == 0
+
+    async with limiter.slot():
+        assert limiter.inflight == 1
+
+
+@pytest.mark.asyncio
+async def test_limiters_per_model_region_and_account():
+    deployment_id = "amazon.titan-tg1-large"
+    account = AWSClientCredentials(
+        aws_access_key_id="key_id", aws_secret_access_key="key"
+    )
+    configs = [
+        AWSClientConfig(region="us-east-1"),
+        AWSClientConfig(region="us-east-1"),
+        AWSClientConfig(region="eu-west-1"),
+        AWSClientConfig(region="us-east-1", credentials=account),
+    ]
+
+    _limiters.clear()
+    get_deployment_config.cache_clear()
+
+    with mock.patch(
+        "aidial_adapter_bedrock.deployment_config.DEPLOYMENTS_CONFIG",
+        {deployment_id: {"concurrency_limiter": {"enabled": True}}},
+    ):
+        for config in configs:
+            async with limit_concurrency(deployment_id, "model", config):
+                pass
+
+        async with limit_concurrency(
+            "amazon.titan-embed-text-v1", "model", configs[0]
+        ):
+            pass
+
+    get_deployment_config.cache_clear()
+
+    assert sorted(
+        (limiter.attributes["region"], limiter.attributes["account"])
+        for limiter in _limiters.clients()
+    ) == [
+        ("eu-west-1", "default"),
+        ("us-east-1", "dbae733c"),
+        ("us-east-1", "default"),
+    ]
+    _limiters.clear()
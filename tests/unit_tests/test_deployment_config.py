@@ -0,0 +1,81 @@
+from unittest import mock
+
+import pytest
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import (
+    AnthropicClientConfig,
+    DeploymentConfig,
+    get_deployment_config,
+)
+
+_DEPLOYMENTS_CONFIG = {
+    "*": {"anthropic_client": {"max_connections": 10, "read_timeout": 30}},
+    "anthropic.claude-3-haiku*": {"anthropic_client": {"read_timeout": 5}},
+}
+
+
+@mock.patch(
+    "aidial_adapter_bedrock.deployment_config.DEPLOYMENTS_CONFIG",
+    _DEPLOYMENTS_CONFIG,
+)
+def test_deployment_config_merge():
+    get_deployment_config.cache_clear()
+
+    haiku = get_deployment_config("anthropic.claude-3-haiku-20240307-v1:0")
+    assert haiku.anthropic_client.max_connections == 10
+    assert haiku.anthropic_client.read_timeout == 5
+
+    opus = get_deployment_config("anthropic.claude-3-opus-20240229-v1:0")
+    assert opus.anthropic_client.max_connections == 10
+    assert opus.anthropic_client.read_timeout == 30
+
+    get_deployment_config.cache_clear()
+
+
+def test_deployment_config_defaults():
+    get_deployment_config.cache_clear()
+    assert get_deployment_config("amazon.titan-tg1-large") == DeploymentConfig(
+        anthropic_client=AnthropicClientConfig()
+    )
+
+
+@pytest.mark.asyncio
+async def test_botocore_client_config():
+    deployments_config = {
+        "meta.llama3-1-405b*": {
+            "botocore_client": {
+                "max_pool_connections": 64,
+                "read_timeout": 300,
+                "retry_mode": "adaptive",
+            }
+        },
+    }
+    aws_client_config = AWSClientConfig(region="us-east-1")
+
+    get_deployment_config.cache_clear()
+    with mock.patch(
+        "aidial_adapter_bedrock.deployment_config.DEPLOYMENTS_CONFIG",
+        deployments_config,
+    ):
+        llama = await Bedrock.acreate(
+            aws_client_config, "meta.llama3-1-405b-instruct-v1:0"
+        )
+        titan = await Bedrock.acreate(
+            aws_client_config, "amazon.titan-embed-text-v1"
+        )
+    get_deployment_config.cache_clear()
+
+    assert llama.client is not titan.client
+
+    llama_config = llama.client.meta.config
+    assert llama_config.max_pool_connections == 64
+    assert llama_config.read_timeout == 300
+    assert llama_config.tcp_keepalive is True
+    assert llama_config.retries == {"mode": "adaptive", "total_max_attempts": 3}
+
+    titan_config = titan.client.meta.config
+    assert titan_config.max_pool_connections == 100
+    assert titan_config.read_timeout == 60
+    assert titan_config.retries["mode"] == "standard"
@@ -1,13 +1,19 @@
 import base64
-from typing import List
+import json
+from typing import List, Literal
 
 import numpy as np
 import pytest
 
+from aidial_adapter_bedrock.embedding.amazon.response import AmazonResponse
+from aidial_adapter_bedrock.embedding.cohere.response import CohereResponse
 from aidial_adapter_bedrock.embedding.encoding import (
     base64_to_vector,
+    encode_vectors,
+    matrix_to_base64,
     vector_to_base64,
 )
+from aidial_adapter_bedrock.utils.json_codec import get_json_codec
 
 vectors = [
     [],
@@ -40,3 +46,56 @@ def test_to_vector_and_back(vector: List[float]):
     actual_str = vector_to_base64(base64_to_vector(str))
 
     assert str == actual_str, f"Expected: {str}, Actual: {actual_str}"
+
+
+@pytest.mark.parametrize("dimensions", [0, 1, 2, 3, 4, 5, 256, 1024])
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_matrix_to_base64(dimensions: int, count: int):
+    matrix = np.random.default_rng(0).standard_normal(
+        (count, dimensions), dtype="float32"
+    )
+
+    assert matrix_to_base64(matrix) == [vector_to_base64(row) for row in matrix]
+
+
+@pytest.mark.parametrize("encoding_format", ["float", "base64"])
+def test_encode_vectors(encoding_format: Literal["float", "base64"]):
+    vectors = [
+        np.array(vector, dtype="float32") for vector in [[1.5, -2.0]] * 3
+    ]
+
+    actual = encode_vectors(vectors, encoding_format)
+
+    if encoding_format == "base64":
+        assert actual == [vector_to_base64([1.5, -2.0])] * 3
+    else:
+        assert isinstance(actual, np.ndarray)
+        assert actual.tolist() == [[1.5, -2.0]] * 3
+
+
+@pytest.mark.parametrize("codec", ["orjson", "json"])
+def test_float_format_keeps_the_values_of_the_response(codec: str):
+    json_codec = get_json_codec(codec)
+    # The models return float32 values
+    vector = [0.1, -0.2, 0.33333334]
+    amazon = AmazonResponse.parse_obj(
+        {"inputTextTokenCount": 1, "embedding": vector}
+    )
+    cohere = CohereResponse.parse_obj(
+        {
+            "id": "id",
+            "response_type": "embeddings_floats",
+            "embeddings": [vector, vector],
+            "texts": ["a", "b"],
+        }
+    )
+
+    def serialize(vectors: List[np.ndarray]) -> List[List[float]]:
+        return json.loads(json_codec.dumps(encode_vectors(vectors, "float")))
+
+    assert serialize([amazon.embedding]) == [vector]
+    assert serialize(list(cohere.embeddings)) == [vector] * 2
+    assert (
+        encode_vectors(list(cohere.embeddings), "base64")
+        == [vector_to_base64(vector)] * 2
+    )
@@ -0,0 +1,183 @@
+import asyncio
+import base64
+from typing import List
+from unittest import mock
+
+import pytest
+from aidial_sdk.embeddings.request import EmbeddingsRequest
+
+from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import (
+    EmbeddingsBatchingConfig,
+    EmbeddingsCacheConfig,
+)
+from aidial_adapter_bedrock.dial_api.storage import FileStorage
+from aidial_adapter_bedrock.embedding.amazon.titan_image import (
+    AmazonTitanImageEmbeddings,
+)
+from aidial_adapter_bedrock.embedding.batching import (
+    AdaptiveBatchSize,
+    create_batches,
+)
+from aidial_adapter_bedrock.embedding.cohere.embed_text import (
+    CohereTextEmbeddings,
+)
+
+
+@pytest.mark.parametrize(
+    "texts, max_texts, max_bytes, expected",
+    [
+        ([], 2, 10, []),
+        (["a", "b", "c"], 2, 10, [[0, 1], [2]]),
+        (["aaaa", "bbbb", "cc", "d"], 10, 6, [[0], [1, 2], [3]]),
+        (["a", "b" * 20, "c"], 10, 10, [[0], [1], [2]]),
+        (["ä", "ö", "ü"], 10, 4, [[0, 1], [2]]),
+    ],
+)
+def test_create_batches(
+    texts: List[str],
+    max_texts: int,
+    max_bytes: int,
+    expected: List[List[int]],
+):
+    assert create_batches(texts, max_texts, max_bytes) == expected
+
+
+def test_adaptive_batch_size():
+    batch_size = AdaptiveBatchSize(
+        EmbeddingsBatchingConfig(max_texts=64, min_texts=8, target_latency=1.0)
+    )
+
+    # The concurrent slow batches halve the size once
+    batch_size.observe(64, 2.0)
+    batch_size.observe(64, 2.0)
+    assert batch_size.value == 32
+
+    # The smaller batches don't increase the size
+    batch_size.observe(10, 0.5)
+    assert batch_size.value == 32
+
+    batch_size.observe(32, 0.5)
+    assert batch_size.value == 33
+
+    for _ in range(10):
+        batch_size.observe(batch_size.value, 5.0)
+    assert batch_size.value == 8
+
+    for _ in range(100):
+        batch_size.observe(batch_size.value, 0.5)
+    assert batch_size.value == 64
+
+
+def test_fixed_batch_size():
+    batch_size = AdaptiveBatchSize(
+        EmbeddingsBatchingConfig(max_texts=64, target_latency=None)
+    )
+    batch_size.observe(64, 100.0)
+    assert batch_size.value == 64
+
+
+@pytest.mark.asyncio
+async def test_cohere_batches():
+    batches: List[List[str]] = []
+    active = 0
+    max_active = 0
+
+    async def invoke(model: str, body: dict):
+        nonlocal active, max_active
+        batches.append(body["texts"])
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        response = {
+            "id": "id",
+            "response_type": "embeddings_floats",
+            "embeddings": [[float(text)] for text in body["texts"]],
+            "texts": body["texts"],
+        }
+        headers = {"x-amzn-bedrock-input-token-count": str(len(body["texts"]))}
+        return response, headers
+
+    client = mock.Mock(spec=Bedrock)
+    client.ainvoke_non_streaming = mock.AsyncMock(side_effect=invoke)
+    adapter = CohereTextEmbeddings(
+        client=client,
+        model="model",
+        cache=EmbeddingsCacheConfig(),
+        concurrency=2,
+        batch_size=AdaptiveBatchSize(EmbeddingsBatchingConfig()),
+    )
+
+    texts = [str(i) for i in range(250)]
+    response = await adapter.embeddings(
+        EmbeddingsRequest(
+            input=texts, custom_fields={"type": "search_document"}
+        )
+    )
+
+    assert [len(batch) for batch in batches] == [96, 96, 58]
+    assert max_active == 2
+    assert [list(data.embedding) for data in response.data] == [
+        [float(text)] for text in texts
+    ]
+    assert response.usage.total_tokens == 250
+
+
+@pytest.mark.asyncio
+async def test_titan_image_pipeline():
+    events: List[str] = []
+    active = {"download": 0, "embed": 0}
+    max_active = {"download": 0, "embed": 0}
+
+    async def track(stage: str, delay: float) -> None:
+        events.append(stage)
+        active[stage] += 1
+        max_active[stage] = max(max_active[stage], active[stage])
+        await asyncio.sleep(delay)
+        active[stage] -= 1
+
+    async def download_file(self, url: str) -> bytes:
+        await track("download", 0.01)
+        return url.encode()
+
+    async def invoke(model: str, body: dict):
+        await track("embed", 0.02)
+        value = float(base64.b64decode(body["inputImage"]).decode()[-5])
+        return {"embedding": [value], "inputTextTokenCount": 0}, {}
+
+    storage = FileStorage(dial_url="http://dial", api_key="key")
+    client = mock.Mock(spec=Bedrock)
+    client.ainvoke_non_streaming = mock.AsyncMock(side_effect=invoke)
+    adapter = AmazonTitanImageEmbeddings(
+        client=client,
+        model="model",
+        storage=storage,
+        cache=EmbeddingsCacheConfig(),
+        concurrency=2,
+    )
+
+    indices = [1, 2, 3, 4, 5, 6, 7, 8, 1]
+    with mock.patch.object(FileStorage, "download_file", download_file):
+        response = await adapter.embeddings(
+            EmbeddingsRequest(
+                input=[],
+                custom_input=[
+                    {"type": "image/png", "url": f"files/images/{index}.png"}
+                    for index in indices
+                ],
+            )
+        )
+
+    assert [list(data.embedding) for data in response.data] == [
+        [float(index)] for index in indices
+    ]
+
+    # The duplicate image is embedded once
+    assert events.count("download") == 9
+    assert events.count("embed") == 8
+
+    # The embedding calls start before all the images are downloaded
+    assert events.index("embed") < len(events) - events[::-1].index("download")
+    assert max_active == {"download": 2, "embed": 2}
+    assert response.usage.total_tokens == 75 * 9
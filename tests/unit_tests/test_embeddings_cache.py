@@ -0,0 +1,208 @@
+import asyncio
+from typing import List
+from unittest import mock
+
+import numpy as np
+import pytest
+from aidial_sdk.embeddings.request import EmbeddingsRequest
+
+from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import (
+    EmbeddingsBatchingConfig,
+    EmbeddingsCacheConfig,
+)
+from aidial_adapter_bedrock.embedding.amazon.titan_text import (
+    AmazonTitanTextEmbeddings,
+)
+from aidial_adapter_bedrock.embedding.batching import AdaptiveBatchSize
+from aidial_adapter_bedrock.embedding.cache import (
+    EmbeddingResult,
+    _cache,
+    clear_embeddings_cache,
+    get_embedding_key,
+    get_embeddings,
+)
+from aidial_adapter_bedrock.embedding.cohere.embed_text import (
+    CohereTextEmbeddings,
+    split_tokens,
+)
+
+_ENABLED = EmbeddingsCacheConfig(enabled=True)
+_DISABLED = EmbeddingsCacheConfig()
+
+
+class Embedder:
+    calls: List[List[int]]
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, indices: List[int]) -> List[EmbeddingResult]:
+        self.calls.append(indices)
+        return [
+            EmbeddingResult(np.array([index], dtype="float32"), 1)
+            for index in indices
+        ]
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_embedded_once():
+    clear_embeddings_cache()
+    embed = Embedder()
+
+    results = await get_embeddings(_DISABLED, ["a", "b", "a", "c", "b"], embed)
+
+    assert embed.calls == [[0, 1, 3]]
+    assert [result.vector.tolist() for result in results] == [
+        [0.0],
+        [1.0],
+        [0.0],
+        [3.0],
+        [1.0],
+    ]
+    assert len(_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings():
+    clear_embeddings_cache()
+    embed = Embedder()
+
+    await get_embeddings(_ENABLED, ["a", "b"], embed)
+    results = await get_embeddings(_ENABLED, ["c", "b", "a"], embed)
+
+    assert embed.calls == [[0, 1], [0]]
+    assert [result.vector.tolist() for result in results] == [
+        [0.0],
+        [1.0],
+        [0.0],
+    ]
+    assert _cache.stats.hits == 2
+
+
+def test_embedding_key():
+    key = get_embedding_key("model", "text", None, None)
+
+    assert key == get_embedding_key("model", "text", None, None)
+    assert key != get_embedding_key("other", "text", None, None)
+    assert key != get_embedding_key("model", "text", 256, None)
+    assert key != get_embedding_key("model", "text", None, "search_query")
+
+
+@pytest.mark.parametrize(
+    "tokens, texts, expected",
+    [
+        (10, ["a"], [10]),
+        (10, ["aaaa", "a"], [8, 2]),
+        (3, ["a", "a", "a", "a"], [1, 1, 1, 0]),
+        (5, ["", "aaaa"], [1, 4]),
+    ],
+)
+def test_split_tokens(tokens: int, texts: List[str], expected: List[int]):
+    assert split_tokens(tokens, texts) == expected
+
+
+def create_client(*responses) -> mock.Mock:
+    client = mock.Mock(spec=Bedrock)
+    client.ainvoke_non_streaming = mock.AsyncMock(
+        side_effect=[(response, headers) for response, headers in responses]
+    )
+    return client
+
+
+@pytest.mark.asyncio
+async def test_titan_text_embeddings():
+    clear_embeddings_cache()
+    client = create_client(
+        ({"embedding": [1.0, 0.5], "inputTextTokenCount": 3}, {}),
+        ({"embedding": [0.25, 2.0], "inputTextTokenCount": 4}, {}),
+    )
+    adapter = AmazonTitanTextEmbeddings(
+        client=client,
+        model="model",
+        supports_dimensions=True,
+        cache=_ENABLED,
+        concurrency=4,
+    )
+
+    request = EmbeddingsRequest(input=["foo", "bar", "foo"])
+    response = await adapter.embeddings(request)
+    cached_response = await adapter.embeddings(request)
+
+    assert client.ainvoke_non_streaming.call_count == 2
+    for resp in [response, cached_response]:
+        assert [list(data.embedding) for data in resp.data] == [
+            [1.0, 0.5],
+            [0.25, 2.0],
+            [1.0, 0.5],
+        ]
+        assert resp.usage.total_tokens == 10
+
+
+@pytest.mark.asyncio
+async def test_cohere_embeddings():
+    clear_embeddings_cache()
+    response = {
+        "id": "id",
+        "response_type": "embeddings_floats",
+        "embeddings": [[1.0], [2.0]],
+        "texts": ["foo", "barbaz"],
+    }
+    client = create_client(
+        (response, {"x-amzn-bedrock-input-token-count": "6"})
+    )
+    adapter = CohereTextEmbeddings(
+        client=client,
+        model="model",
+        cache=_ENABLED,
+        concurrency=4,
+        batch_size=AdaptiveBatchSize(EmbeddingsBatchingConfig()),
+    )
+
+    request = EmbeddingsRequest(
+        input=["foo", "barbaz", "foo"],
+        custom_fields={"type": "search_document"},
+    )
+    resp = await adapter.embeddings(request)
+
+    client.ainvoke_non_streaming.assert_called_once()
+    assert client.ainvoke_non_streaming.call_args.args[1]["texts"] == [
+        "foo",
+        "barbaz",
+    ]
+    assert [list(data.embedding) for data in resp.data] == [[1.0], [2.0], [1.0]]
+    assert resp.usage.total_tokens == 8
+
+
+@pytest.mark.asyncio
+async def test_titan_text_embeddings_fan_out():
+    clear_embeddings_cache()
+    active = 0
+    max_active = 0
+
+    async def invoke(model: str, body: dict):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        value = float(body["inputText"])
+        return {"embedding": [value], "inputTextTokenCount": 1}, {}
+
+    client = mock.Mock(spec=Bedrock)
+    client.ainvoke_non_streaming = mock.AsyncMock(side_effect=invoke)
+    adapter = AmazonTitanTextEmbeddings(
+        client=client,
+        model="model",
+        supports_dimensions=True,
+        cache=_DISABLED,
+        concurrency=3,
+    )
+
+    texts = [str(i) for i in range(10)]
+    response = await adapter.embeddings(EmbeddingsRequest(input=texts))
+
+    assert max_active == 3
+    assert [list(data.embedding) for data in response.data] == [
+        [float(text)] for text in texts
+    ]
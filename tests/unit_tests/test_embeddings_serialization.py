@@ -0,0 +1,90 @@
+import json
+from typing import List
+from unittest import mock
+
+import numpy as np
+import pytest
+from aidial_sdk.embeddings import Usage
+
+import aidial_adapter_bedrock.dial_api.response as dial_api_response
+from aidial_adapter_bedrock.deployments import EmbeddingsDeployment
+from aidial_adapter_bedrock.dial_api.response import (
+    make_embeddings_response,
+    serialize_embeddings_response,
+)
+from aidial_adapter_bedrock.utils.json_codec import get_json_codec
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.deployments import adapter_client, bedrock_deployments
+
+_VECTORS: List[List[List[float] | str]] = [
+    [],
+    [[0.5, -1.25, 1e-8], [0.0, 3.0, 0.1]],
+    ["AAAAPwAAoL8=", "AACAPw=="],
+]
+
+
+@pytest.mark.parametrize("vectors", _VECTORS)
+@pytest.mark.parametrize("codec", [None, "orjson", "json"])
+def test_serialize_embeddings_response(
+    vectors: List[List[float] | str], codec: str | None
+):
+    response = make_embeddings_response(
+        model="model",
+        vectors=vectors,
+        usage=Usage(prompt_tokens=3, total_tokens=3),
+    )
+    # The float vectors are kept as the rows of a matrix
+    matrix_response = make_embeddings_response(
+        model="model",
+        vectors=(
+            np.array(vectors)
+            if vectors and not isinstance(vectors[0], str)
+            else vectors
+        ),
+        usage=Usage(prompt_tokens=3, total_tokens=3),
+    )
+
+    # None stands for the codec the adapter picks by default
+    json_codec = (
+        get_json_codec(codec) if codec else dial_api_response.json_codec
+    )
+    with mock.patch.object(dial_api_response, "json_codec", json_codec):
+        body = serialize_embeddings_response(response)
+        matrix_body = serialize_embeddings_response(matrix_response)
+
+    expected = json.loads(json.dumps(response.dict()))
+    assert json.loads(body) == expected
+    assert json.loads(matrix_body) == expected
+
+
+def test_embeddings_are_serialized_with_orjson():
+    assert dial_api_response.json_codec.name == "orjson"
+
+
+@pytest.mark.parametrize("gzip_min_size", [None, 0])
+@pytest.mark.asyncio
+async def test_embeddings_endpoint(gzip_min_size: int | None):
+    deployment = EmbeddingsDeployment.AMAZON_TITAN_EMBED_TEXT_V2
+    stand_in = BedrockStandIn()
+
+    async with bedrock_deployments({"amazon.*": {}}, stand_in):
+        with mock.patch(
+            "aidial_adapter_bedrock.server.embeddings.EMBEDDINGS_GZIP_MIN_SIZE",
+            gzip_min_size,
+        ):
+            async with adapter_client() as client:
+                response = await client.post(
+                    f"/openai/deployments/{deployment.value}/embeddings",
+                    json={"input": ["foo", "bar baz"], "dimensions": 4},
+                    headers={"Api-Key": "dummy", "Accept-Encoding": "gzip"},
+                )
+
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == (
+        "gzip" if gzip_min_size is not None else None
+    )
+
+    body = response.json()
+    assert [len(data["embedding"]) for data in body["data"]] == [4, 4]
+    assert [data["index"] for data in body["data"]] == [0, 1]
+    assert body["usage"] == {"prompt_tokens": 3, "total_tokens": 3}
@@ -0,0 +1,271 @@
+import asyncio
+import time
+from unittest import mock
+
+import pytest
+from aidial_sdk.chat_completion import Message as DialMessage
+from aidial_sdk.chat_completion import Role
+from anthropic.types import Message, TextBlock, Usage
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import (
+    HedgingConfig,
+    get_deployment_config,
+    validate_deployments_config,
+)
+from aidial_adapter_bedrock.deployments import ChatCompletionDeployment
+from aidial_adapter_bedrock.dial_api.request import ModelParameters
+from aidial_adapter_bedrock.hedging import (
+    HedgingPolicy,
+    get_hedging_policy,
+    hedging_stats,
+)
+from aidial_adapter_bedrock.llm.consumer_recording import (
+    ConsumerRecording,
+    RecordingConsumer,
+)
+from aidial_adapter_bedrock.llm.model.claude.v3.adapter import (
+    Adapter as Claude_V3,
+)
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.deployments import bedrock_deployments
+
+_DEPLOYMENT_ID = "test-hedging-deployment"
+_AWS_CLIENT_CONFIG = AWSClientConfig(region="us-east-1")
+
+_HEDGING = {"enabled": True, "min_samples": 5, "min_delay": 0.05}
+
+
+async def invoke_sequentially(
+    stand_in: BedrockStandIn, hedging: dict, calls: int, samples: int = 5
+) -> float:
+    """Returns the latency of the slowest call"""
+    latencies = []
+    async with bedrock_deployments(
+        {_DEPLOYMENT_ID: {"hedging": hedging}}, stand_in
+    ):
+        client = await Bedrock.acreate(_AWS_CLIENT_CONFIG, _DEPLOYMENT_ID)
+        for _ in range(samples):
+            client.hedging_policy.get_latency("").record(0.01)
+
+        for _ in range(calls):
+            start = time.monotonic()
+            body, _headers = await client.ainvoke_non_streaming(
+                "model", {"prompt": "Hi"}
+            )
+            latencies.append(time.monotonic() - start)
+            assert body["echo"]["prompt"] == "Hi"
+
+        await client.client.close()
+    return max(latencies)
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged():
+    stand_in = BedrockStandIn(faults=[{"delay": 0.5}])
+    wins = hedging_stats.hedge_wins
+
+    latency = await invoke_sequentially(stand_in, _HEDGING, calls=1)
+
+    assert latency < 0.4
+    assert len(stand_in.requests) == 2
+    assert hedging_stats.hedge_wins == wins + 1
+
+
+@pytest.mark.asyncio
+async def test_fast_call_isnt_hedged():
+    stand_in = BedrockStandIn()
+
+    await invoke_sequentially(stand_in, _HEDGING, calls=3)
+
+    assert len(stand_in.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_hedging_is_disabled_by_default():
+    stand_in = BedrockStandIn(faults=[{"delay": 0.2}])
+
+    latency = await invoke_sequentially(stand_in, {}, calls=1)
+
+    assert latency >= 0.2
+    assert len(stand_in.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedging_waits_for_samples():
+    stand_in = BedrockStandIn(faults=[{"delay": 0.2}])
+
+    await invoke_sequentially(stand_in, _HEDGING, calls=1, samples=4)
+
+    assert len(stand_in.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_is_capped():
+    stand_in = BedrockStandIn(faults=[{"delay": 0.2}, {}, {"delay": 0.2}])
+    hedging = {**_HEDGING, "max_rate": 0.0, "budget_capacity": 1.0}
+
+    latency = await invoke_sequentially(stand_in, hedging, calls=2)
+
+    # The first call is hedged, the second one exceeds the budget
+    assert latency >= 0.2
+    assert len(stand_in.requests) == 3
+
+
+def create_policy() -> HedgingPolicy:
+    policy = HedgingPolicy(HedgingConfig(**_HEDGING))
+    for _ in range(5):
+        policy.get_latency("").record(0.01)
+    return policy
+
+
+@pytest.mark.asyncio
+async def test_failed_hedge_doesnt_fail_the_call():
+    policy = create_policy()
+    calls = 0
+
+    async def func() -> str:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.2)
+            return "slow"
+        raise RuntimeError("hedge failed")
+
+    assert await policy.call(func) == "slow"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancellation_cancels_all_calls():
+    policy = create_policy()
+    cancelled = 0
+
+    async def func() -> None:
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled += 1
+            raise
+
+    task = asyncio.create_task(policy.call(func))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+
+    assert cancelled == 2
+
+
+def test_latency_percentile():
+    policy = HedgingPolicy(
+        HedgingConfig(enabled=True, percentile=0.9, min_samples=10)
+    )
+    for i in range(100):
+        policy.get_latency("").record(i / 100)
+
+    assert policy.get_latency("").get() == 0.9
+
+
+@pytest.mark.asyncio
+async def test_latency_classes_are_tracked_separately():
+    policy = create_policy()
+    calls = 0
+
+    async def func() -> None:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+
+    # The long completions aren't hedged by the latency of the short ones
+    await policy.call(func, latency_class="non-stream/4096")
+    assert calls == 1
+    assert len(policy.get_latency("non-stream/4096").samples) == 1
+
+    await policy.call(func)
+    assert calls == 3
+
+
+def validate_config(deployments_config: dict) -> None:
+    with mock.patch(
+        "aidial_adapter_bedrock.deployment_config.DEPLOYMENTS_CONFIG",
+        deployments_config,
+    ):
+        get_deployment_config.cache_clear()
+        try:
+            validate_deployments_config()
+        finally:
+            get_deployment_config.cache_clear()
+
+
+def test_hedging_requires_native_transport():
+    deployment_id = ChatCompletionDeployment.AMAZON_TITAN_TG1_LARGE.value
+
+    with pytest.raises(ValueError, match="native transport"):
+        validate_config({deployment_id: {"hedging": {"enabled": True}}})
+
+    validate_config(
+        {
+            deployment_id: {
+                "transport": "native",
+                "hedging": {"enabled": True},
+            }
+        }
+    )
+
+
+def test_claude3_hedging_doesnt_require_native_transport():
+    validate_config({"anthropic.claude-3*": {"hedging": {"enabled": True}}})
+
+
+@pytest.mark.asyncio
+async def test_claude3_latency_classes_are_tracked_separately():
+    deployment = ChatCompletionDeployment.ANTHROPIC_CLAUDE_V3_HAIKU
+    message = Message(
+        id="id",
+        type="message",
+        role="assistant",
+        model=deployment.model_id,
+        content=[TextBlock(type="text", text="Hello")],
+        stop_reason="end_turn",
+        stop_sequence=None,
+        usage=Usage(input_tokens=1, output_tokens=1),
+    )
+
+    async with bedrock_deployments(
+        {deployment.deployment_id: {"hedging": _HEDGING}}
+    ):
+        model = await Claude_V3.create(
+            deployment, "-", AWSClientConfig(region="us-east-1")
+        )
+        with mock.patch.object(
+            model.client.messages,
+            "create",
+            new_callable=mock.AsyncMock,
+            return_value=message,
+        ):
+            await model.chat(
+                RecordingConsumer(None, ConsumerRecording()),
+                ModelParameters(max_tokens=100),
+                [DialMessage(role=Role.USER, content="Hi")],
+            )
+
+        policy = get_hedging_policy(deployment.deployment_id)
+        assert len(policy.get_latency("non-stream/128").samples) == 1
+        assert len(policy.get_latency("").samples) == 0
+
+
+@pytest.mark.parametrize(
+    "params, latency_class",
+    [
+        (ModelParameters(), "non-stream"),
+        (ModelParameters(stream=True, max_tokens=1), "stream/1"),
+        (ModelParameters(max_tokens=100), "non-stream/128"),
+        (ModelParameters(max_tokens=128), "non-stream/128"),
+    ],
+)
+def test_latency_class(params: ModelParameters, latency_class: str):
+    assert params.latency_class == latency_class
@@ -0,0 +1,84 @@
+"""
+Cold start benchmark of the adapter measured by `python -X importtime`.
+
+The import time of the DIAL SDK and the telemetry dependencies
+is out of the adapter's control, so only the time spent on the import
+of the adapter modules and the libraries they bring in is budgeted.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+_APP_MODULE = "aidial_adapter_bedrock.app"
+_PACKAGE = "aidial_adapter_bedrock"
+
+# Budget of the adapter import time in milliseconds.
+# The adapter takes ~70 ms to import, whereas the eager import
+# of the model families and heavy libraries takes ~350 ms.
+IMPORT_TIME_BUDGET_MS = 150
+
+_RUNS = 3
+
+# The libraries which must not be imported on the server startup
+_LAZY_MODULES = ["boto3", "botocore", "anthropic", "tokenizers", "PIL", "numpy"]
+
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _parse_import_time(stderr: str) -> List[Tuple[int, int, str]]:
+    """
+    Returns (depth, cumulative time in us, module) for each imported module
+    """
+    ret: List[Tuple[int, int, str]] = []
+    for line in stderr.splitlines():
+        if match := _IMPORT_TIME_LINE.match(line):
+            _self, cumulative, indent, module = match.groups()
+            ret.append((len(indent) // 2, int(cumulative), module))
+    return ret
+
+
+def _import_app() -> List[Tuple[int, int, str]]:
+    env = dict(os.environ, AWS_DEFAULT_REGION="us-east-1")
+    env.pop("WARM_UP", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {_APP_MODULE}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return _parse_import_time(result.stderr)
+
+
+def _adapter_import_time_ms(modules: List[Tuple[int, int, str]]) -> float:
+    """
+    The import time of the app excluding the top-level imports
+    of the third-party packages.
+    """
+    children: Dict[str, int] = {}
+    for depth, cumulative, module in modules:
+        if module == _APP_MODULE:
+            return (cumulative - sum(children.values())) / 1000
+        if depth == 1 and not module.startswith(_PACKAGE):
+            children[module] = cumulative
+        elif depth == 0:
+            children.clear()
+    raise AssertionError(f"{_APP_MODULE} wasn't imported")
+
+
+def test_heavy_libraries_are_imported_lazily():
+    imported = {module for _, _, module in _import_app()}
+    assert [m for m in _LAZY_MODULES if m in imported] == []
+
+
+def test_import_time_budget():
+    # The best of several runs to reduce the noise
+    import_time = min(
+        _adapter_import_time_ms(_import_app()) for _ in range(_RUNS)
+    )
+    assert (
+        import_time < IMPORT_TIME_BUDGET_MS
+    ), f"the adapter import took {import_time:.0f} ms"
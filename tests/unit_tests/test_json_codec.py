@@ -0,0 +1,76 @@
+import json
+from typing import Any, List
+from unittest import mock
+
+import numpy as np
+import pytest
+
+import aidial_adapter_bedrock.utils.json_codec as json_codec_module
+from aidial_adapter_bedrock.utils.json_codec import (
+    OrjsonCodec,
+    StdlibJSONCodec,
+    get_json_codec,
+)
+
+_OBJECTS: List[Any] = [
+    {},
+    {"inputText": "Привет 👋", "dimensions": 256, "normalize": True},
+    {"images": ["iVBORw0KGgo=" * 1000], "texts": None, "scale": 0.5},
+    [1, -2.5, "a\nb", [None, False], {"nested": {"key": "value"}}],
+]
+
+
+@pytest.mark.parametrize("obj", _OBJECTS)
+@pytest.mark.parametrize("name", ["orjson", "json"])
+def test_round_trip(obj: Any, name: str):
+    codec = get_json_codec(name)
+    data = codec.dumps(obj)
+
+    assert isinstance(data, bytes)
+    assert json.loads(data) == obj
+    assert codec.loads(data) == obj
+    assert codec.loads(data.decode()) == obj
+
+
+@pytest.mark.parametrize("name", ["orjson", "json"])
+def test_invalid_json(name: str):
+    with pytest.raises(ValueError):
+        get_json_codec(name).loads(b'{"message": ')
+
+
+@pytest.mark.parametrize("name", ["orjson", "json"])
+def test_numpy_arrays(name: str):
+    obj = {
+        "float32": np.array([[0.1, -2.5], [1e-8, 0.33333334]], dtype="float32"),
+        "float64": np.array([0.1, 1 / 3]),
+        "int": np.array([1, 2]),
+    }
+
+    # The float32 values are written in the shortest form
+    assert json.loads(get_json_codec(name).dumps(obj)) == {
+        "float32": [[0.1, -2.5], [1e-8, 0.33333334]],
+        "float64": [0.1, 1 / 3],
+        "int": [1, 2],
+    }
+
+
+def test_orjson_is_picked_by_default():
+    assert get_json_codec("auto").name == "orjson"
+
+
+def test_orjson_falls_back_to_stdlib():
+    obj = {1: "\ud800"}
+
+    assert OrjsonCodec().dumps(obj) == StdlibJSONCodec().dumps(obj)
+
+
+def test_auto_codec_without_orjson():
+    with mock.patch.object(json_codec_module, "orjson", None):
+        assert get_json_codec("auto").name == "json"
+        with pytest.raises(ValueError):
+            get_json_codec("orjson")
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_json_codec("simdjson")
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from unittest import mock
+
+import pytest
+from aidial_sdk.chat_completion.request import ChatCompletionRequest
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.deployment_config import (
+    RateLimitConfig,
+    get_deployment_config,
+)
+from aidial_adapter_bedrock.deployments import ChatCompletionDeployment
+from aidial_adapter_bedrock.dial_api.request import estimate_prompt_tokens
+from aidial_adapter_bedrock.rate_limiter import (
+    RateLimiter,
+    RateLimitExceeded,
+    _limiters,
+    limit_rate,
+)
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.deployments import adapter_client, bedrock_deployments
+
+
+def create_limiter(**kwargs) -> RateLimiter:
+    return RateLimiter(RateLimitConfig(**kwargs))
+
+
+@pytest.mark.asyncio
+async def test_requests_per_minute():
+    limiter = create_limiter(requests_per_minute=3, max_wait=0.0)
+
+    for _ in range(3):
+        await limiter.acquire(0)
+
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await limiter.acquire(0)
+    assert exc_info.value.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_request_waits_for_the_quota():
+    limiter = create_limiter(requests_per_minute=600, max_wait=1.0)
+    assert limiter.requests is not None
+    limiter.requests.tokens = 0.0
+
+    start = time.monotonic()
+    await asyncio.gather(limiter.acquire(0), limiter.acquire(0))
+
+    # The second request queues up behind the first one
+    assert time.monotonic() - start >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_tokens_are_reconciled_with_usage():
+    limiter = create_limiter(tokens_per_minute=1000, max_wait=0.1)
+
+    await limiter.acquire(800)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire(300)
+
+    # The request used fewer tokens than estimated
+    limiter.reconcile(800, 100)
+    await limiter.acquire(300)
+
+    # The request used more tokens than estimated
+    limiter.reconcile(300, 900)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire(10)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_returns_the_quota():
+    limiter = create_limiter(
+        requests_per_minute=60, tokens_per_minute=600, max_wait=10.0
+    )
+    assert limiter.requests is not None and limiter.tokens is not None
+    limiter.requests.tokens = 0.0
+
+    task = asyncio.create_task(limiter.acquire(100))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert -0.1 < limiter.requests.tokens < 0.1
+    assert limiter.tokens.tokens > 599.0
+
+
+@pytest.mark.asyncio
+async def test_limit_rate_without_limits():
+    estimate = mock.AsyncMock(return_value=10)
+
+    _limiters.clear()
+    get_deployment_config.cache_clear()
+    async with limit_rate(
+        "amazon.titan-tg1-large",
+        "model",
+        AWSClientConfig(region="us-east-1"),
+        estimate,
+    ) as reservation:
+        reservation.reconcile(100)
+
+    assert reservation.limiter is None
+    assert list(_limiters.clients()) == []
+    estimate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_is_rejected_before_the_upstream_call():
+    deployment = ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1
+    stand_in = BedrockStandIn(stream_chunks=[{"generation": "Hello"}])
+    rate_limit = {"requests_per_minute": 1, "max_wait": 0.0}
+
+    async with bedrock_deployments(
+        {"meta.*": {"rate_limit": rate_limit}}, stand_in
+    ):
+        async with adapter_client() as client:
+            responses = [
+                await client.post(
+                    f"/openai/deployments/{deployment.value}/chat/completions",
+                    json={
+                        "messages": [{"role": "user", "content": "Hi"}],
+                        "stream": True,
+                    },
+                    headers={"Api-Key": "dummy"},
+                )
+                for _ in range(2)
+            ]
+
+            (limiter,) = _limiters.clients()
+
+    assert [response.status_code for response in responses] == [200, 429]
+    assert len(stand_in.requests) == 1
+
+    # The estimated prompt tokens aren't charged without the TPM limit
+    assert limiter.tokens is None
+
+
+def test_prompt_tokens_are_estimated_without_the_attachments():
+    request = ChatCompletionRequest.parse_obj(
+        {
+            "messages": [
+                {"role": "system", "content": "a" * 40},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "b" * 20},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": "http://example.com/a.png"},
+                        },
+                    ],
+                },
+                {
+                    "role": "user",
+                    "content": "Describe",
+                    "custom_content": {
+                        "attachments": [{"url": "http://example.com/b.png"}]
+                    },
+                },
+            ]
+        }
+    )
+
+    assert estimate_prompt_tokens(request) == (40 + 20 + 8) // 4 + 2 * 1600
@@ -0,0 +1,253 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from aidial_adapter_bedrock.deployment_config import ResponseCacheConfig
+from aidial_adapter_bedrock.deployments import ChatCompletionDeployment
+from aidial_adapter_bedrock.dial_api import storage
+from aidial_adapter_bedrock.dial_api.storage import FileStorage
+from aidial_adapter_bedrock.dial_api.token_usage import TokenUsage
+from aidial_adapter_bedrock.llm.consumer import Consumer
+from aidial_adapter_bedrock.response_cache import (
+    CachePolicy,
+    _cache,
+    cache_response,
+    clear_response_cache,
+    get_cached_response,
+)
+from aidial_adapter_bedrock.utils.lru_cache import LRUCache
+from tests.unit_tests.test_coalescing import collect_contents
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.deployments import adapter_client, bedrock_deployments
+
+_CONFIG = ResponseCacheConfig(enabled=True)
+_POLICY = CachePolicy(lookup=True, store=True, ttl=60.0)
+
+
+class Generator:
+    calls: int
+    error: Exception | None
+
+    def __init__(self, error: Exception | None = None):
+        self.calls = 0
+        self.error = error
+
+    async def __call__(self, consumer: Consumer) -> None:
+        self.calls += 1
+        consumer.append_content("Hello")
+        if self.error is not None:
+            raise self.error
+        consumer.add_usage(TokenUsage(prompt_tokens=1, completion_tokens=2))
+        consumer.close_content()
+
+
+def create_consumer() -> mock.Mock:
+    return mock.Mock(spec=Consumer)
+
+
+async def serve(
+    key: str, policy: CachePolicy, consumer: Consumer, generate: Generator
+) -> None:
+    """Serves the response the way the chat completion does"""
+    if (recording := get_cached_response(key, policy)) is not None:
+        await recording.replay(consumer)
+    else:
+        await cache_response(key, policy, consumer, generate)
+
+
+@pytest.mark.parametrize(
+    "headers, lookup, store",
+    [
+        ({}, True, True),
+        ({"Cache-Control": "no-cache"}, False, True),
+        ({"cache-control": "max-age=0, no-store"}, False, False),
+    ],
+)
+def test_cache_policy(headers: dict, lookup: bool, store: bool):
+    policy = CachePolicy.create(_CONFIG, headers)
+
+    assert policy is not None
+    assert (policy.lookup, policy.store) == (lookup, store)
+
+
+def test_cache_is_disabled_by_default():
+    assert CachePolicy.create(ResponseCacheConfig(), {}) is None
+
+
+@pytest.mark.asyncio
+async def test_response_is_replayed():
+    clear_response_cache()
+    generate = Generator()
+    consumers = [create_consumer() for _ in range(2)]
+
+    for consumer in consumers:
+        await serve("key", _POLICY, consumer, generate)
+
+    assert generate.calls == 1
+    assert consumers[0].mock_calls == consumers[1].mock_calls
+    assert len(consumers[1].mock_calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_bypass():
+    clear_response_cache()
+    generate = Generator()
+
+    no_store = CachePolicy(lookup=False, store=False, ttl=60.0)
+    await serve("key", no_store, create_consumer(), generate)
+    assert "key" not in _cache
+
+    no_cache = CachePolicy(lookup=False, store=True, ttl=60.0)
+    for _ in range(2):
+        await serve("key", no_cache, create_consumer(), generate)
+    assert generate.calls == 3
+
+    await serve("key", _POLICY, create_consumer(), generate)
+    assert generate.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_miss_is_counted_once():
+    clear_response_cache()
+    hits, misses = _cache.stats.hits, _cache.stats.misses
+
+    for _ in range(4):
+        await serve("key", _POLICY, create_consumer(), Generator())
+
+    assert _cache.stats.hits - hits == 3
+    assert _cache.stats.misses - misses == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_response_isnt_cached():
+    clear_response_cache()
+    generate = Generator(error=ValueError("failed"))
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await serve("key", _POLICY, create_consumer(), generate)
+
+    assert generate.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_with_ttl():
+    cache: LRUCache[str, int] = LRUCache(max_size=2)
+    cache.put("a", 1, ttl=0.05)
+    cache.put("b", 2)
+
+    assert cache.get("a") == 1
+    await asyncio.sleep(0.06)
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert cache.stats.expirations == 1
+
+    cache.put("c", 3)
+    cache.put("d", 4)
+    assert cache.values() == [3, 4]
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_is_replayed_from_cache():
+    deployment = ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1
+    stand_in = BedrockStandIn(
+        stream_chunks=[{"generation": "Hello"}, {"generation": " world"}],
+    )
+    deployments = {
+        "meta.*": {
+            "response_cache": {"enabled": True},
+            # The cached responses don't consume the quota
+            "rate_limit": {"requests_per_minute": 2, "max_wait": 0.0},
+        },
+    }
+
+    async with bedrock_deployments(deployments, stand_in):
+        hits, misses = _cache.stats.hits, _cache.stats.misses
+
+        async with adapter_client() as client:
+
+            async def chat(stream: bool, headers: dict = {}):
+                return await client.post(
+                    f"/openai/deployments/{deployment.value}/chat/completions",
+                    json={
+                        "messages": [{"role": "user", "content": "Hi"}],
+                        "temperature": 0,
+                        "stream": stream,
+                    },
+                    headers={"Api-Key": "dummy", **headers},
+                )
+
+            streamed = await chat(stream=True)
+            replayed = [await chat(stream=False) for _ in range(3)]
+            bypassed = await chat(
+                stream=True, headers={"Cache-Control": "no-cache"}
+            )
+
+    assert streamed.status_code == 200
+    assert collect_contents(streamed.text, 1) == ["Hello world"]
+
+    for response in replayed:
+        assert response.status_code == 200
+        body = response.json()
+        assert body["choices"][0]["message"]["content"] == "Hello world"
+        assert body["usage"] is not None
+
+    assert bypassed.status_code == 200
+    assert len(stand_in.requests) == 2
+
+    # The bypassed request doesn't look up the cache
+    assert _cache.stats.hits - hits == 3
+    assert _cache.stats.misses - misses == 1
+
+
+@pytest.mark.asyncio
+async def test_stability_response_is_cached_per_api_key():
+    deployment = ChatCompletionDeployment.STABILITY_STABLE_DIFFUSION_XL
+    image = {"seed": 0, "base64": "iVBORw0KGgo=", "finishReason": "SUCCESS"}
+    response = {"result": "success", "artifacts": [image]}
+    stand_in = BedrockStandIn(faults=[{"response": response}] * 2)
+
+    async def upload_file_as_base64(
+        storage: FileStorage, upload_dir: str, data: str, content_type: str
+    ) -> dict:
+        return {"url": f"files/{storage.api_key}/{upload_dir}/image.png"}
+
+    async with bedrock_deployments(
+        {"stability.*": {"response_cache": {"enabled": True}}}, stand_in
+    ):
+        with mock.patch.object(
+            storage, "DIAL_URL", "http://dial"
+        ), mock.patch.object(
+            FileStorage, "upload_file_as_base64", upload_file_as_base64
+        ):
+            async with adapter_client() as client:
+
+                async def chat(api_key: str):
+                    return await client.post(
+                        f"/openai/deployments/{deployment.value}/chat/completions",
+                        json={
+                            "messages": [{"role": "user", "content": "A cat"}],
+                            "temperature": 0,
+                        },
+                        headers={"Api-Key": api_key},
+                    )
+
+                responses = [
+                    await chat(api_key) for api_key in ["alice", "bob", "bob"]
+                ]
+
+    urls = []
+    for response in responses:
+        assert response.status_code == 200
+        message = response.json()["choices"][0]["message"]
+        urls.append(message["custom_content"]["attachments"][0]["url"])
+
+    assert urls == [
+        "files/alice/images/image.png",
+        "files/bob/images/image.png",
+        "files/bob/images/image.png",
+    ]
+    # Each caller uploads the image to its own bucket
+    assert len(stand_in.requests) == 2
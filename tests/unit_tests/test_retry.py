@@ -0,0 +1,199 @@
+import random
+from typing import AsyncIterator, List
+
+import pytest
+from botocore.exceptions import ClientError
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.bedrock import Bedrock
+from aidial_adapter_bedrock.deployment_config import RetryConfig
+from aidial_adapter_bedrock.llm.errors import ValidationError
+from aidial_adapter_bedrock.retry import RetryPolicy
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.deployments import bedrock_deployments
+
+_DEPLOYMENT_ID = "test-retry-deployment"
+_AWS_CLIENT_CONFIG = AWSClientConfig(region="us-east-1")
+
+_THROTTLING = {"status": 429, "type": "ThrottlingException", "message": "Slow"}
+_UNAVAILABLE = {"status": 503, "type": "ServiceUnavailable", "message": "Down"}
+_INVALID = {"status": 400, "type": "ValidationException", "message": "Bad"}
+
+_RETRY = {"enabled": True, "base_delay": 0.001, "max_delay": 0.01}
+
+
+async def invoke(stand_in: BedrockStandIn, retry: dict, stream: bool):
+    async with bedrock_deployments(
+        {_DEPLOYMENT_ID: {"retry": retry}}, stand_in
+    ):
+        client = await Bedrock.acreate(_AWS_CLIENT_CONFIG, _DEPLOYMENT_ID)
+        try:
+            if stream:
+                return [
+                    chunk
+                    async for chunk in client.ainvoke_streaming(
+                        "model", {"prompt": "Hi"}
+                    )
+                ]
+            body, _headers = await client.ainvoke_non_streaming(
+                "model", {"prompt": "Hi"}
+            )
+            return body
+        finally:
+            await client.client.close()
+
+
+@pytest.mark.asyncio
+async def test_upstream_failures_are_retried():
+    stand_in = BedrockStandIn(
+        faults=[{"error": _THROTTLING}, {"error": _UNAVAILABLE}]
+    )
+
+    body = await invoke(stand_in, _RETRY, stream=False)
+
+    assert body["echo"] == {"prompt": "Hi"}
+    assert len(stand_in.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_are_disabled_by_default():
+    stand_in = BedrockStandIn(faults=[{"error": _THROTTLING}])
+
+    with pytest.raises(ClientError):
+        await invoke(stand_in, {}, stream=False)
+
+    assert len(stand_in.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_requests_are_not_retried():
+    stand_in = BedrockStandIn(faults=[{"error": _INVALID}])
+
+    with pytest.raises(ClientError):
+        await invoke(stand_in, _RETRY, stream=False)
+
+    assert len(stand_in.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_attempts_are_limited():
+    stand_in = BedrockStandIn(faults=[{"error": _UNAVAILABLE}] * 5)
+
+    with pytest.raises(ClientError):
+        await invoke(stand_in, {**_RETRY, "max_attempts": 3}, stream=False)
+
+    assert len(stand_in.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_is_retried_before_the_first_chunk():
+    exception = {"type": "throttlingException", "message": "Slow"}
+    stand_in = BedrockStandIn(
+        stream_chunks=[{"index": 0}, {"index": 1}],
+        faults=[{"error": _THROTTLING}, {"chunks": [], "exception": exception}],
+    )
+
+    chunks = await invoke(stand_in, _RETRY, stream=True)
+
+    assert chunks == [{"index": 0}, {"index": 1}]
+    assert len(stand_in.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_is_not_retried_after_the_first_chunk():
+    exception = {"type": "throttlingException", "message": "Slow"}
+    stand_in = BedrockStandIn(
+        stream_chunks=[{"index": 0}, {"index": 1}],
+        faults=[{"exception": exception}],
+    )
+
+    with pytest.raises(ClientError) as exc_info:
+        await invoke(stand_in, _RETRY, stream=True)
+
+    assert exc_info.value.response["Error"]["Code"] == "throttlingException"
+    assert len(stand_in.requests) == 1
+
+
+class _Failing:
+    calls: int
+    failures: int
+
+    def __init__(self, failures: int):
+        self.calls = 0
+        self.failures = failures
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Slow"}},
+                "InvokeModel",
+            )
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_retry_budget():
+    policy = RetryPolicy(
+        RetryConfig(
+            **_RETRY, max_attempts=10, budget_ratio=0.5, budget_capacity=2.0
+        )
+    )
+
+    # The burst of retries is capped by the capacity
+    func = _Failing(failures=5)
+    with pytest.raises(ClientError):
+        await policy.call(func)
+    assert func.calls == 3
+
+    # The budget is replenished by the calls
+    for _ in range(2):
+        assert await policy.call(_Failing(failures=0)) == "ok"
+
+    for _ in range(2):
+        func = _Failing(failures=1)
+        assert await policy.call(func) == "ok"
+        assert func.calls == 2
+
+    func = _Failing(failures=1)
+    with pytest.raises(ClientError):
+        await policy.call(func)
+    assert func.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_adapter_errors_are_not_retried():
+    policy = RetryPolicy(RetryConfig(**_RETRY))
+    calls = 0
+
+    async def stream() -> AsyncIterator[int]:
+        nonlocal calls
+        calls += 1
+        raise ValidationError("invalid request")
+        yield 0
+
+    with pytest.raises(ValidationError):
+        async for _ in policy.stream(stream):
+            pass
+    assert calls == 1
+
+
+def test_decorrelated_jitter():
+    config = RetryConfig(enabled=True, base_delay=0.1, max_delay=5.0)
+    policy = RetryPolicy(config, rng=random.Random(0))
+    rng = random.Random(0)
+
+    delays: List[float] = [config.base_delay]
+    for _ in range(100):
+        delay = policy._next_delay(delays[-1])
+
+        low, high = config.base_delay, delays[-1] * 3
+        assert delay == min(config.max_delay, rng.uniform(low, high))
+        assert low <= delay <= min(config.max_delay, high)
+        delays.append(delay)
+
+    # The delays grow from the base delay until they are capped
+    assert delays[1] < 3 * config.base_delay
+    assert config.max_delay in delays
+    uncapped = [delay for delay in delays if delay < config.max_delay]
+    assert len(set(uncapped)) == len(uncapped)
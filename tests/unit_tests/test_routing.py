@@ -0,0 +1,150 @@
+from collections import Counter
+from typing import List
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from aidial_adapter_bedrock.deployment_config import (
+    RoutingConfig,
+    RoutingTarget,
+)
+from aidial_adapter_bedrock.deployments import ChatCompletionDeployment
+from aidial_adapter_bedrock.llm.errors import ValidationError
+from aidial_adapter_bedrock.routing import Router, get_router, route
+from tests.utils.bedrock_server import BedrockStandIn
+from tests.utils.deployments import adapter_client, bedrock_deployments
+
+_US = RoutingTarget(region="us-east-1")
+_EU = RoutingTarget(region="eu-west-1")
+
+_THROTTLING = ClientError(
+    {
+        "Error": {"Code": "ThrottlingException", "Message": "Slow down"},
+        "ResponseMetadata": {"HTTPStatusCode": 429},
+    },
+    "InvokeModel",
+)
+
+
+def create_router(targets: List[RoutingTarget], **kwargs) -> Router:
+    return Router(RoutingConfig(targets=targets, exploration=0.0, **kwargs))
+
+
+def record(router: Router, index: int, latency: float, failed: bool = False):
+    with mock.patch("time.monotonic", return_value=1000.0):
+        router._record(index, 1000.0 - latency, failed)
+
+
+def choose(router: Router, now: float = 1000.0) -> RoutingTarget:
+    with mock.patch("time.monotonic", return_value=now):
+        return router.config.targets[router._choose()]
+
+
+def test_targets_without_statistics_are_chosen_by_weight():
+    router = create_router(
+        [_US.copy(update={"weight": 3.0}), _EU.copy(update={"weight": 1.0})]
+    )
+
+    counts = Counter(choose(router).region for _ in range(4000))
+    assert 2700 < counts["us-east-1"] < 3300
+
+
+def test_faster_target_is_chosen():
+    router = create_router([_US, _EU])
+    record(router, 0, latency=2.0)
+    record(router, 1, latency=1.0)
+
+    assert choose(router) == _EU
+
+
+def test_inflight_requests_spread_the_load():
+    router = create_router([_US, _EU])
+    record(router, 0, latency=2.0)
+    record(router, 1, latency=1.0)
+
+    router.stats[1].inflight = 2
+    assert choose(router) == _US
+
+
+def test_failing_target_is_avoided_until_it_recovers():
+    router = create_router([_US, _EU], decay_time=10.0)
+    record(router, 0, latency=2.0)
+    record(router, 1, latency=1.0)
+    for _ in range(5):
+        record(router, 1, latency=0.01, failed=True)
+
+    # The fast failure doesn't make the target look faster
+    assert router.stats[1].latency is not None
+    assert router.stats[1].latency >= 1.0
+
+    assert choose(router) == _US
+    assert choose(router, now=1100.0) == _EU
+
+
+@pytest.mark.asyncio
+async def test_only_upstream_failures_are_recorded():
+    router = create_router([_US])
+
+    with pytest.raises(ValidationError):
+        async with router.route():
+            raise ValidationError("invalid request")
+    assert router.stats[0].updated_at is None
+
+    with pytest.raises(ClientError):
+        async with router.route():
+            raise _THROTTLING
+    assert router.stats[0].error_rate == 1.0
+
+    async with router.route():
+        pass
+    assert router.stats[0].error_rate < 1.0
+    assert router.stats[0].inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_is_routed():
+    deployment = ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1
+    target = ChatCompletionDeployment.META_LLAMA3_70B_INSTRUCT_V1
+
+    stand_in = BedrockStandIn(stream_chunks=[{"generation": "Hello"}])
+
+    deployments = {
+        deployment.deployment_id: {
+            "routing": {
+                "targets": [{"region": "eu-west-1", "deployment": target.value}]
+            }
+        },
+        target.deployment_id: {},
+    }
+
+    async with bedrock_deployments(deployments, stand_in):
+        async with adapter_client() as client:
+            response = await client.post(
+                f"/openai/deployments/{deployment.value}/chat/completions",
+                json={
+                    "messages": [{"role": "user", "content": "Hi"}],
+                    "stream": True,
+                },
+                headers={"Api-Key": "dummy"},
+            )
+
+        router = get_router(deployment.deployment_id)
+
+    assert response.status_code == 200
+    assert '"content":"Hello"' in response.text
+
+    assert [(r["region"], r["model_id"]) for r in stand_in.requests] == [
+        ("eu-west-1", target.model_id)
+    ]
+
+    assert router is not None
+    assert router.stats[0].error_rate == 0.0
+    assert router.stats[0].latency is not None
+
+
+@pytest.mark.asyncio
+async def test_route_without_routing_config():
+    get_router.cache_clear()
+    async with route("amazon.titan-tg1-large") as target:
+        assert target is None
@@ -0,0 +1,92 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+from unittest import mock
+
+import requests
+from aidial_sdk import DIALApp
+from aidial_sdk.telemetry.types import MetricsConfig, TelemetryConfig
+
+from aidial_adapter_bedrock.server.runtime import Supervisor
+from aidial_adapter_bedrock.server.telemetry import (
+    get_telemetry_config,
+    init_worker_telemetry,
+)
+from tests.utils.server import wait_for_server
+
+_RUNTIME = "aidial_adapter_bedrock.server.runtime"
+_TELEMETRY = "aidial_adapter_bedrock.server.telemetry"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_preloaded_workers():
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "aidial_adapter_bedrock.server.runtime"],
+        env={
+            **os.environ,
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(port),
+            "WEB_CONCURRENCY": "2",
+        },
+    )
+
+    try:
+        wait_for_server(f"http://127.0.0.1:{port}/health", timeout=30)
+        for _ in range(4):
+            response = requests.get(f"http://127.0.0.1:{port}/health")
+            assert response.status_code == 200
+    finally:
+        server.send_signal(signal.SIGTERM)
+        exit_code = server.wait(timeout=30)
+
+    assert exit_code == 0
+
+
+def test_worker_restarts_are_delayed_and_limited():
+    supervisor = Supervisor(mock.Mock(), mock.Mock(), workers=2)
+    now = 100.0
+
+    def exit_worker() -> float:
+        supervisor._on_unexpected_exit(pid=1, code=1)
+        return supervisor._next_spawn - now
+
+    with mock.patch(f"{_RUNTIME}.SERVER_RESTART_LIMIT", 3), mock.patch(
+        f"{_RUNTIME}.SERVER_RESTART_PERIOD", 60.0
+    ), mock.patch(f"{_RUNTIME}.time.monotonic", lambda: now):
+        assert [exit_worker() for _ in range(3)] == [0.5, 1.0, 2.0]
+        assert not supervisor._should_exit.is_set()
+
+        # The exits out of the period are forgotten
+        now += 60.0
+        assert exit_worker() == 0.5
+
+        for _ in range(3):
+            exit_worker()
+        assert supervisor._should_exit.is_set()
+        assert supervisor._exit_code == 1
+
+
+def test_worker_telemetry():
+    app = mock.Mock(spec=DIALApp)
+    config = TelemetryConfig(
+        metrics=MetricsConfig(prometheus_export=True, port=9464)
+    )
+
+    with mock.patch(f"{_TELEMETRY}._deferred", True), mock.patch(
+        f"{_TELEMETRY}.TelemetryConfig", lambda: config.copy(deep=True)
+    ):
+        assert get_telemetry_config() is None
+        init_worker_telemetry(app, worker_index=2)
+
+    # Each worker exports the metrics on its own port
+    (worker_config,) = app.configure_telemetry.call_args.args
+    assert worker_config.metrics.port == 9466
@@ -0,0 +1,116 @@
+import os
+from typing import List
+from unittest import mock
+
+import pytest
+
+from aidial_adapter_bedrock.aws_client_config import AWSClientConfig
+from aidial_adapter_bedrock.bedrock import _client_pool
+from aidial_adapter_bedrock.deployment_config import get_deployment_config
+from aidial_adapter_bedrock.deployments import (
+    ChatCompletionDeployment,
+    EmbeddingsDeployment,
+)
+from aidial_adapter_bedrock.llm.model.adapter import (
+    _chat_adapters,
+    _embeddings_adapters,
+)
+from aidial_adapter_bedrock.utils.client_pool import (
+    _clear_client_pools,
+    close_client_pools,
+)
+from aidial_adapter_bedrock.warm_up import warm_up
+from tests.utils.bedrock_server import BedrockStandIn, bedrock_server
+
+_MODULE = "aidial_adapter_bedrock.warm_up"
+
+_CHAT_DEPLOYMENT = ChatCompletionDeployment.META_LLAMA3_8B_INSTRUCT_V1
+_EMBEDDINGS_DEPLOYMENT = EmbeddingsDeployment.AMAZON_TITAN_EMBED_TEXT_V1
+
+
+def adapter_keys(deployment_id: str, regions: List[str]) -> List[str]:
+    return [
+        f"{deployment_id}/{AWSClientConfig(region=region).get_cache_key()}"
+        for region in regions
+    ]
+
+
+@pytest.mark.asyncio
+async def test_warm_up():
+    stand_in = BedrockStandIn()
+    regions = ["us-east-1", "eu-west-1"]
+    connections = 3
+
+    _clear_client_pools()
+    get_deployment_config.cache_clear()
+
+    async with bedrock_server(stand_in) as endpoint_url:
+        deployments_config = {
+            "*": {"endpoint_url": endpoint_url},
+            "meta.*": {"transport": "native"},
+        }
+        with mock.patch(f"{_MODULE}.WARM_UP", True), mock.patch(
+            f"{_MODULE}.WARM_UP_REGIONS", regions
+        ), mock.patch(
+            f"{_MODULE}.WARM_UP_DEPLOYMENTS",
+            [
+                _CHAT_DEPLOYMENT.deployment_id,
+                _EMBEDDINGS_DEPLOYMENT.deployment_id,
+            ],
+        ), mock.patch(
+            f"{_MODULE}.WARM_UP_CONNECTIONS", connections
+        ), mock.patch(
+            "aidial_adapter_bedrock.deployment_config.DEPLOYMENTS_CONFIG",
+            deployments_config,
+        ), mock.patch.dict(
+            os.environ,
+            {"AWS_ACCESS_KEY_ID": "key_id", "AWS_SECRET_ACCESS_KEY": "key"},
+        ):
+            await warm_up()
+
+        assert len(_chat_adapters.clients()) == len(regions)
+        for key in adapter_keys(_CHAT_DEPLOYMENT.deployment_id, regions):
+            assert key in _chat_adapters._clients
+
+        assert len(_embeddings_adapters.clients()) == len(regions)
+        for key in adapter_keys(_EMBEDDINGS_DEPLOYMENT.deployment_id, regions):
+            assert key in _embeddings_adapters._clients
+
+        await close_client_pools()
+
+    get_deployment_config.cache_clear()
+
+    # The connections are opened by the native clients only
+    assert stand_in.pings == len(regions) * connections
+    assert stand_in.requests == []
+
+
+@pytest.mark.asyncio
+async def test_warm_up_is_disabled_by_default():
+    with mock.patch(f"{_MODULE}._warm_up") as _warm_up:
+        await warm_up()
+    _warm_up.assert_not_called()
+
+
+@pytest.mark.asyncio
+@mock.patch("aidial_adapter_bedrock.dial_api.storage.DIAL_URL", "http://dial")
+async def test_adapters_cached_per_api_key_arent_warmed_up():
+    deployment = EmbeddingsDeployment.AMAZON_TITAN_EMBED_IMAGE_V1
+
+    _clear_client_pools()
+    get_deployment_config.cache_clear()
+
+    with mock.patch(f"{_MODULE}.WARM_UP", True), mock.patch(
+        f"{_MODULE}.WARM_UP_REGIONS", ["us-east-1"]
+    ), mock.patch(
+        f"{_MODULE}.WARM_UP_DEPLOYMENTS", [deployment.deployment_id]
+    ), mock.patch(
+        f"{_MODULE}.WARM_UP_CONNECTIONS", 0
+    ):
+        await warm_up()
+
+    # Only the client is created
+    assert _embeddings_adapters.clients() == []
+    assert len(_client_pool.clients()) == 1
+
+    await close_client_pools()
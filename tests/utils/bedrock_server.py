@@ -0,0 +1,201 @@
+"""
+Local stand-in of the Bedrock runtime API.
+
+The behaviour of the server is driven by the request body:
+
+- `{"error": {"status": 429, "type": "ThrottlingException", "message": "..."}}`
+    the error response;
+- `{"chunks": [...], "exception": {"type": "...", "message": "..."}}`
+    the chunks of the streaming response optionally followed by an exception;
+- any other body of the streaming request gets the `stream_chunks`
+    of the stand-in;
+- `{"inputText": "...", "dimensions": 1024}` the Titan text embedding
+    of the given size (8 by default) derived from the text;
+- `{"response": {...}}` the given non-streaming response;
+- any other body is echoed back in the non-streaming response;
+- `{"delay": 1.0}` delays the non-streaming response by the given seconds.
+
+The `faults` of the stand-in are merged into the bodies of
+the subsequent requests one by one, e.g. `[{"error": ...}]`
+fails the next request only.
+"""
+
+import asyncio
+import base64
+import json
+import struct
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+def encode_headers(headers: Dict[str, str]) -> bytes:
+    ret = b""
+    for name, value in headers.items():
+        name_bytes = name.encode()
+        value_bytes = value.encode()
+        ret += struct.pack(">B", len(name_bytes)) + name_bytes
+        ret += struct.pack(">BH", 7, len(value_bytes)) + value_bytes
+    return ret
+
+
+def encode_message(headers: Dict[str, str], payload: bytes) -> bytes:
+    headers_bytes = encode_headers(headers)
+    total_length = 12 + len(headers_bytes) + len(payload) + 4
+    prelude = struct.pack(">II", total_length, len(headers_bytes))
+    prelude += struct.pack(">I", zlib.crc32(prelude))
+    message = prelude + headers_bytes + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+def encode_chunk(chunk: dict) -> bytes:
+    payload = {"bytes": base64.b64encode(json.dumps(chunk).encode()).decode()}
+    return encode_message(
+        {
+            ":message-type": "event",
+            ":event-type": "chunk",
+            ":content-type": "application/json",
+        },
+        json.dumps(payload).encode(),
+    )
+
+
+def encode_exception(type: str, message: str) -> bytes:
+    return encode_message(
+        {
+            ":message-type": "exception",
+            ":exception-type": type,
+            ":content-type": "application/json",
+        },
+        json.dumps({"message": message}).encode(),
+    )
+
+
+class BedrockStandIn:
+    requests: List[dict]
+    pings: int
+    faults: List[dict]
+
+    stream_chunks: List[dict]
+    chunk_delay: float
+    """Delay before each chunk of the streaming response in seconds"""
+
+    def __init__(
+        self,
+        stream_chunks: List[dict] | None = None,
+        chunk_delay: float = 0.0,
+        faults: List[dict] | None = None,
+    ):
+        self.requests = []
+        self.pings = 0
+        self.faults = faults or []
+        self.stream_chunks = stream_chunks or []
+        self.chunk_delay = chunk_delay
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.ping)
+        app.router.add_post("/model/{model_id}/invoke", self.invoke)
+        app.router.add_post(
+            "/model/{model_id}/invoke-with-response-stream",
+            self.invoke_with_response_stream,
+        )
+        return app
+
+    async def _read_request(self, request: web.Request) -> dict:
+        assert request.headers["Authorization"].startswith("AWS4-HMAC-SHA256")
+        assert "X-Amz-Date" in request.headers
+
+        # Credential=<key id>/<date>/<region>/bedrock/aws4_request
+        scope = request.headers["Authorization"].split("Credential=")[1]
+        region = scope.split("/")[2]
+
+        body = await request.json()
+        self.requests.append(
+            {
+                "model_id": request.match_info["model_id"],
+                "region": region,
+                "body": body,
+            }
+        )
+
+        if self.faults:
+            body = {**body, **self.faults.pop(0)}
+        return body
+
+    async def ping(self, request: web.Request) -> web.Response:
+        self.pings += 1
+        return web.Response(status=404)
+
+    async def invoke(self, request: web.Request) -> web.Response:
+        body = await self._read_request(request)
+        if delay := body.get("delay"):
+            await asyncio.sleep(delay)
+        if error := body.get("error"):
+            return _error(error)
+        if (response := body.get("response")) is not None:
+            return web.json_response(response)
+        if (text := body.get("inputText")) is not None:
+            seed = zlib.crc32(text.encode())
+            size = body.get("dimensions") or 8
+            return web.json_response(
+                {
+                    "embedding": [
+                        ((seed + i) % 1000) / 1000 for i in range(size)
+                    ],
+                    "inputTextTokenCount": len(text.split()),
+                }
+            )
+        return web.json_response(
+            {"model_id": request.match_info["model_id"], "echo": body},
+            headers={"X-Amzn-Bedrock-Input-Token-Count": "3"},
+        )
+
+    async def invoke_with_response_stream(
+        self, request: web.Request
+    ) -> web.StreamResponse:
+        body = await self._read_request(request)
+        if error := body.get("error"):
+            return _error(error)
+
+        response = web.StreamResponse(
+            headers={"Content-Type": "application/vnd.amazon.eventstream"}
+        )
+        await response.prepare(request)
+
+        for chunk in body.get("chunks", self.stream_chunks):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            await response.write(encode_chunk(chunk))
+
+        if exception := body.get("exception"):
+            await response.write(
+                encode_exception(exception["type"], exception["message"])
+            )
+
+        await response.write_eof()
+        return response
+
+
+def _error(error: dict) -> web.Response:
+    return web.json_response(
+        {"message": error["message"]},
+        status=error["status"],
+        headers={"x-amzn-ErrorType": f"{error['type']}:http://internal/"},
+    )
+
+
+@asynccontextmanager
+async def bedrock_server(
+    stand_in: BedrockStandIn | None = None,
+) -> AsyncIterator[str]:
+    """Runs the stand-in server and yields its endpoint URL"""
+    server = TestServer((stand_in or BedrockStandIn()).create_app())
+    await server.start_server()
+    try:
+        yield str(server.make_url("")).rstrip("/")
+    finally:
+        await server.close()
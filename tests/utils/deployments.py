@@ -0,0 +1,83 @@
+"""
+The deployments of the adapter calling the local stand-in of Bedrock.
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from unittest import mock
+
+import httpx
+
+from aidial_adapter_bedrock.deployment_config import get_deployment_config
+from aidial_adapter_bedrock.embedding.cache import clear_embeddings_cache
+from aidial_adapter_bedrock.hedging import get_hedging_policy
+from aidial_adapter_bedrock.response_cache import clear_response_cache
+from aidial_adapter_bedrock.retry import get_retry_policy
+from aidial_adapter_bedrock.routing import get_router
+from aidial_adapter_bedrock.utils.client_pool import close_client_pools
+from tests.utils.bedrock_server import BedrockStandIn, bedrock_server
+
+_AWS_CREDENTIALS = {
+    "AWS_ACCESS_KEY_ID": "key_id",
+    "AWS_SECRET_ACCESS_KEY": "key",
+}
+
+
+async def _reset_state() -> None:
+    # The pools include the adapters, the clients and the limiters
+    await close_client_pools()
+    clear_response_cache()
+    clear_embeddings_cache()
+
+    get_deployment_config.cache_clear()
+    get_retry_policy.cache_clear()
+    get_hedging_policy.cache_clear()
+    get_router.cache_clear()
+
+
+@asynccontextmanager
+async def bedrock_deployments(
+    deployments: Dict[str, dict], stand_in: BedrockStandIn | None = None
+) -> AsyncIterator[str]:
+    """
+    Runs the stand-in server and configures the deployments
+    (the keys of `DEPLOYMENTS_CONFIG`) to call it with the native transport.
+    The cached configs, clients, limiters and responses are reset
+    before and after.
+    Yields the endpoint URL of the server.
+    """
+    async with bedrock_server(stand_in) as endpoint_url:
+        conf = {
+            deployment: {
+                "transport": "native",
+                "endpoint_url": endpoint_url,
+                **config,
+            }
+            for deployment, config in deployments.items()
+        }
+
+        await _reset_state()
+        try:
+            with mock.patch(
+                "aidial_adapter_bedrock.deployment_config.DEPLOYMENTS_CONFIG",
+                conf,
+            ), mock.patch.dict("os.environ", _AWS_CREDENTIALS):
+                yield endpoint_url
+        finally:
+            await _reset_state()
+
+
+@asynccontextmanager
+async def adapter_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    The client of the adapter app served in the same event loop.
+    The app is started and shut down with its lifespan,
+    which closes the pooled clients.
+    """
+    from aidial_adapter_bedrock.app import app
+
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),  # type: ignore
+        base_url="http://test",
+    ) as client:
+        yield client